@@ -0,0 +1,158 @@
+"""Admin dashboard KPIs.
+
+The table counts (users, active users, schedules, routes, bookmarks) live in
+``admin_counters`` and are kept current by triggers on
+those tables (``migrations/002_admin_metrics.sql``), so every write path,
+including bulk ones, updates them in the same transaction. A dashboard load
+reads a handful of primary-key rows instead of counting whole tables.
+
+Users active in the last 7 days and the ``admin_top_routes`` materialized
+view (routes ranked by the last 7 days of searches and bookmarks from the
+``route_demand_hourly`` rollup, see route_demand.py) depend on the clock
+and on aggregates across tables. A background thread started with the
+app recomputes them once they are ``refresh_seconds`` old, so dashboard
+loads only read; the dashboard shows when they were last recomputed. From
+cron::
+
+    python admin_metrics.py --refresh
+"""
+import argparse
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = (
+    'total_users', 'active_users', 'weekly_active', 'total_schedules', 'total_routes', 'total_bookmarks'
+)
+# Counters recomputed by refresh(); the rest are trigger-maintained
+PERIODIC_COUNTERS = ('weekly_active',)
+
+# Serializes refreshes across workers (pg_try_advisory_xact_lock key)
+REFRESH_LOCK_KEY = 74610019
+
+COUNTERS_SQL = text("SELECT name, value, updated_at FROM admin_counters")
+
+TOP_ROUTES_SQL = text("""
+    SELECT route_id, source, destination, transport_type, searches, bookmarks, schedule_count, seats_available
+    FROM admin_top_routes
+    ORDER BY searches DESC, bookmarks DESC, schedule_count DESC, seats_available DESC
+    LIMIT :limit
+""")
+
+_RECOUNT_SQL = {
+    'total_users': "SELECT COUNT(*) FROM users",
+    'active_users': "SELECT COUNT(*) FROM users WHERE is_active = TRUE",
+    'weekly_active': "SELECT COUNT(*) FROM users WHERE last_login >= NOW() - INTERVAL '7 days'",
+    'total_schedules': "SELECT COUNT(*) FROM schedules",
+    'total_routes': "SELECT COUNT(*) FROM routes",
+    'total_bookmarks': "SELECT COUNT(*) FROM bookmarks",
+}
+
+
+class AdminMetrics:
+    """Reads the maintained KPIs and keeps the periodic ones fresh."""
+
+    def __init__(self, refresh_seconds=300, top_routes=5):
+        self.refresh_seconds = refresh_seconds
+        self.top_routes = top_routes
+        self._thread = None
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.last_error = None
+
+    def snapshot(self, engine):
+        """Counts, top routes and ``refreshed_at`` (when the periodic figures were recomputed).
+
+        Only reads; the periodic figures are kept fresh by ``start()`` or cron.
+        """
+        counts, refreshed_at = self._read_counters(engine)
+        with engine.connect() as conn:
+            top_routes = conn.execute(TOP_ROUTES_SQL, {"limit": self.top_routes}).mappings().all()
+        return {"counts": counts, "top_routes": top_routes, "refreshed_at": refreshed_at}
+
+    def _read_counters(self, engine):
+        with engine.connect() as conn:
+            rows = conn.execute(COUNTERS_SQL).fetchall()
+        counts = {name: 0 for name in COUNTERS}
+        refreshed_at = None
+        for name, value, updated_at in rows:
+            counts[name] = int(value)
+            if name in PERIODIC_COUNTERS:
+                refreshed_at = updated_at if refreshed_at is None else min(refreshed_at, updated_at)
+        return counts, refreshed_at
+
+    def _stale(self, refreshed_at):
+        if refreshed_at is None:
+            return True
+        return bool(self.refresh_seconds) and \
+            datetime.now(timezone.utc) - refreshed_at >= timedelta(seconds=self.refresh_seconds)
+
+    def refresh(self, engine):
+        """Recompute the periodic figures; returns False if another worker is already at it."""
+        with engine.begin() as conn:
+            if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": REFRESH_LOCK_KEY}).scalar():
+                return False
+            for name in PERIODIC_COUNTERS:
+                conn.execute(text(
+                    f"UPDATE admin_counters SET value = ({_RECOUNT_SQL[name]}), updated_at = NOW() WHERE name = :name"
+                ), {"name": name})
+            conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY admin_top_routes"))
+        with self._lock:
+            self.refreshes += 1
+        logger.info("Admin metrics refreshed")
+        return True
+
+    def start(self, engine):
+        """Refresh the periodic figures whenever they go stale, on a daemon thread."""
+        with self._lock:
+            if self._thread is not None or not self.refresh_seconds:
+                return
+            self._thread = threading.Thread(target=self._run, args=(engine,), name="admin-metrics", daemon=True)
+        self._thread.start()
+
+    def _run(self, engine):
+        while True:
+            try:
+                # Another worker may have refreshed since the last check
+                if self._stale(self._read_counters(engine)[1]):
+                    self.refresh(engine)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Admin metrics refresh error: {e}")
+            time.sleep(self.refresh_seconds)
+
+    def stats(self):
+        with self._lock:
+            return {"refresh_seconds": self.refresh_seconds, "refreshes": self.refreshes, "last_error": self.last_error}
+
+    def rebuild(self, engine):
+        """Recount every counter from scratch, e.g. after a TRUNCATE or restore."""
+        with engine.begin() as conn:
+            for name in COUNTERS:
+                conn.execute(text(f"""
+                    INSERT INTO admin_counters (name, value, updated_at) VALUES (:name, ({_RECOUNT_SQL[name]}), NOW())
+                    ON CONFLICT (name) DO UPDATE SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at
+                """), {"name": name})
+        self.refresh(engine)
+
+
+if __name__ == "__main__":
+    from database import create_db_engine
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Admin dashboard metrics maintenance")
+    parser.add_argument("--refresh", action="store_true", help="recompute weekly activity and the top routes view")
+    parser.add_argument("--rebuild", action="store_true", help="recount every counter from the tables")
+    args = parser.parse_args()
+    if args.rebuild:
+        AdminMetrics().rebuild(create_db_engine())
+    elif args.refresh:
+        AdminMetrics().refresh(create_db_engine())
+    else:
+        parser.print_help()
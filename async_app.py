@@ -0,0 +1,590 @@
+"""Async enquiry service.
+
+ASGI variant of the read-only enquiry API (``/api/search``, ``/api/fare``,
+``/api/search/batch``, ``/api/nextbus``, ``/api/nexttrain``, ``/api/enquiry``,
+``/api/bookmarks``, ``/api/parse``, ``/api/ask``, ``/api/journey``) built on Quart and
+asyncpg. It serves the same response contracts as app.py (both use
+enquiry.py), but a single process keeps thousands of enquiries in flight
+instead of one per worker thread. Run it next to the Flask app and route the
+enquiry paths to it:
+
+    SECRET_KEY=... hypercorn async_app:app --bind 0.0.0.0:5001
+
+SECRET_KEY must match the Flask app so the login session cookie is accepted
+for ``/api/bookmarks``. The timetable cache, station index and journey
+planner here are per process; admin writes made through the Flask app reach
+them once TIMETABLE_CACHE_TTL / STATION_INDEX_REFRESH_SECONDS /
+JOURNEY_REFRESH_SECONDS expire.
+"""
+import asyncio
+import logging
+import os
+import secrets
+
+from quart import Quart, jsonify, request, session
+from sqlalchemy import text
+
+import enquiry
+import route_demand
+import tracing
+from bookmark_cache import create_bookmark_cache
+from database import create_async_db_engine, pool_metrics
+from enquiry import extract_date_from_text
+from journey_planner import CONNECTIONS_SQL, JourneyPlanner
+from station_resolver import ROUTE_PAIRS_SQL, STATIONS_SQL, StationResolver
+from timetable_cache import TimetableCache
+from voice_parser import QueryParser
+
+app = Quart(__name__)
+app.secret_key = os.environ.get("SECRET_KEY") or secrets.token_hex(32)
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATION_MATCH_LIMIT = int(os.environ.get("STATION_MATCH_LIMIT", 25))
+AVAILABILITY_WINDOW_DAYS = int(os.environ.get("AVAILABILITY_WINDOW_DAYS", 90))
+NEXT_DEPARTURE_MAX_COUNT = int(os.environ.get("NEXT_DEPARTURE_MAX_COUNT", 10))
+BATCH_SEARCH_MAX_ITEMS = int(os.environ.get("BATCH_SEARCH_MAX_ITEMS", 50))
+SEARCH_MAX_LIMIT = int(os.environ.get("SEARCH_MAX_LIMIT", 100))
+
+engine = None
+station_resolver = StationResolver(
+    refresh_seconds=int(os.environ.get("STATION_INDEX_REFRESH_SECONDS", 600))
+)
+timetable_cache = TimetableCache(
+    max_entries=int(os.environ.get("TIMETABLE_CACHE_SIZE", 4096)),
+    ttl_seconds=int(os.environ.get("TIMETABLE_CACHE_TTL", 300))
+)
+query_parser = QueryParser()
+_station_index_lock = asyncio.Lock()
+JOURNEY_MAX_TRANSFERS = int(os.environ.get("JOURNEY_MAX_TRANSFERS", 2))
+journey_planner = JourneyPlanner(
+    refresh_seconds=int(os.environ.get("JOURNEY_REFRESH_SECONDS", 600)),
+    min_connection_ms=int(os.environ.get("JOURNEY_MIN_CONNECTION_MS", 10 * 60 * 1000)),
+    max_transfers=JOURNEY_MAX_TRANSFERS
+)
+_journey_lock = asyncio.Lock()
+# Drained by flush_search_events_periodically() on the event loop
+search_events = route_demand.SearchEvents(
+    capacity=int(os.environ.get("SEARCH_EVENTS_CAPACITY", 10000)),
+    flush_seconds=int(os.environ.get("SEARCH_EVENTS_FLUSH_SECONDS", 30))
+)
+_search_events_task = None
+# Written through by the Flask bookmark endpoints, so only a shared BOOKMARK_CACHE_URL backend is kept here
+BOOKMARK_CACHE_URL = os.environ.get("BOOKMARK_CACHE_URL")
+bookmark_cache = create_bookmark_cache(
+    url=BOOKMARK_CACHE_URL, max_entries=0, ttl_seconds=int(os.environ.get("BOOKMARK_CACHE_TTL", 300))
+)
+
+
+@app.before_serving
+async def connect_database():
+    global engine, _search_events_task
+    try:
+        engine = create_async_db_engine()
+        tracing.instrument_engine(engine)
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        logger.info("Database connection successful")
+        _search_events_task = asyncio.create_task(flush_search_events_periodically())
+    except Exception as e:
+        logger.error(f"Database connection failed: {e}")
+        engine = None
+
+
+@app.after_serving
+async def close_database():
+    if _search_events_task is not None:
+        _search_events_task.cancel()
+    if engine is not None:
+        await flush_search_events()
+        await engine.dispose()
+
+
+async def flush_search_events():
+    """Async counterpart of app.flush_search_events."""
+    counts = search_events.drain()
+    if not counts:
+        return
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(route_demand.FLUSH_SQL, route_demand.flush_params(counts))
+        search_events.mark_flushed(counts)
+    except Exception as e:
+        logger.error(f"Search event flush error: {e}")
+        search_events.requeue(counts)
+
+
+async def flush_search_events_periodically():
+    while True:
+        await asyncio.sleep(search_events.flush_seconds)
+        await flush_search_events()
+
+
+@app.after_request
+async def allow_cors(response):
+    response.headers.setdefault("Access-Control-Allow-Origin", "*")
+    return response
+
+
+async def ensure_station_index():
+    """Load the station index (and transcript grammar) on first use and once stale."""
+    if station_resolver.needs_refresh():
+        async with _station_index_lock:
+            if station_resolver.needs_refresh():
+                async with engine.connect() as conn:
+                    rows = (await conn.execute(text(STATIONS_SQL))).fetchall()
+                    route_rows = (await conn.execute(text(ROUTE_PAIRS_SQL))).fetchall()
+                station_resolver.load_rows(rows, route_rows)
+    query_parser.sync(station_resolver)
+
+
+async def ensure_journey_timetable():
+    """Load the journey planner's connections on first use and once stale."""
+    if journey_planner.needs_refresh():
+        async with _journey_lock:
+            if journey_planner.needs_refresh():
+                async with engine.connect() as conn:
+                    rows = (await conn.execute(CONNECTIONS_SQL)).fetchall()
+                journey_planner.load_rows(rows)
+
+
+async def resolve_station_ids(name, limit=STATION_MATCH_LIMIT):
+    """Resolve free-text station name to ranked station_ids."""
+    await ensure_station_index()
+    return station_resolver.resolve(name, limit)
+
+
+async def load_timetables(src_ids, dst_ids, transport_types):
+    """Async counterpart of app.load_timetables."""
+    return await load_timetable_keys(
+        enquiry.timetable_keys(src_ids, dst_ids, transport_types, station_resolver.route_pairs())
+    )
+
+
+async def load_timetable_keys(keys):
+    """Async counterpart of app.load_timetable_keys."""
+    found, missing = timetable_cache.get_many(keys)
+    tracing.annotate(cache_keys=len(keys), cache_misses=len(missing))
+
+    if missing:
+        with tracing.span("db"):
+            async with engine.connect() as conn:
+                rows = (await conn.execute(
+                    enquiry.TIMETABLE_SQL, enquiry.timetable_params(missing, AVAILABILITY_WINDOW_DAYS)
+                )).fetchall()
+
+        for key, schedules in enquiry.group_timetable(rows, missing).items():
+            timetable_cache.put(key, schedules)
+            found[key] = schedules
+
+    return {key: found.get(key, []) for key in keys}
+
+
+async def load_availability_for_date(schedule_ids, travel_date):
+    """Seat inventory for one date outside the cached availability window."""
+    with tracing.span("db"):
+        async with engine.connect() as conn:
+            rows = (await conn.execute(
+                enquiry.AVAILABILITY_FOR_DATE_SQL, {"schedule_ids": schedule_ids, "d": travel_date}
+            )).fetchall()
+    return enquiry.seats_by_schedule(rows)
+
+
+async def load_availability_for_dates(pairs):
+    """Seat inventory for ``(schedule_id, travel_date)`` pairs outside the cached window."""
+    with tracing.span("db"):
+        async with engine.connect() as conn:
+            rows = (await conn.execute(enquiry.AVAILABILITY_FOR_DATES_SQL, {
+                "schedule_ids": [pair[0] for pair in pairs],
+                "dates": [pair[1] for pair in pairs]
+            })).fetchall()
+    return enquiry.seats_by_schedule_date(rows)
+
+
+@app.route('/api/health')
+async def health_check():
+    """Health check endpoint"""
+    if engine is None:
+        return jsonify({"status": "error", "message": "Database not connected"}), 500
+    return jsonify({
+        "status": "ok",
+        "message": "Async enquiry service is running",
+        "timetable_cache": timetable_cache.stats(),
+        "bookmark_cache": bookmark_cache.stats()
+    })
+
+
+@app.route('/api/metrics')
+async def metrics():
+    """Live connection pool statistics"""
+    if engine is None:
+        return jsonify({"status": "error", "message": "Database not connected"}), 500
+    return jsonify({"db_pool": pool_metrics(engine)})
+
+
+async def run_enquiry(source, destination, transport_type='', fields=('search',), travel_date='',
+                      after=None, count=1, today=None, cursor=None, limit=None, max_dates=None):
+    """Async counterpart of app.run_enquiry."""
+    try:
+        requested, error = enquiry.requested_date(travel_date)
+        if error:
+            return {"error": error}, 400
+
+        with tracing.span("resolve"):
+            src_ids = await resolve_station_ids(source)
+            dst_ids = await resolve_station_ids(destination)
+        loaded = {}
+        if src_ids and dst_ids:
+            loaded = await load_timetables(src_ids, dst_ids, enquiry.requested_types(transport_type))
+        timetables = list(loaded.values())
+        if 'search' in fields:
+            search_events.record(key for key, schedules in loaded.items() if schedules)
+        tracing.annotate(fields=",".join(fields), dated=bool(travel_date))
+
+        # One result per schedule with seats for that date
+        seats_for, schedule_ids = enquiry.enquiry_seats(
+            timetables, fields, requested, AVAILABILITY_WINDOW_DAYS, cursor, limit
+        )
+        if schedule_ids:
+            seats_for = await load_availability_for_date(schedule_ids, requested)
+
+        return enquiry.build_enquiry(
+            timetables, fields, travel_date, seats_for, after, count, today, cursor, limit, max_dates
+        ), 200
+
+    except Exception as e:
+        logger.error(f"Error in enquiry: {e}")
+        return {"error": "Database query failed"}, 500
+
+
+async def search_enquiry(source, destination, transport_type='', travel_date='', fields=('search',), after=None, count=1,
+                         today=None, cursor=None, limit=None, max_dates=None):
+    """Priced search results for a route (plus any extra ``fields``); returns ``(body, status)``."""
+    body, status = await run_enquiry(
+        source, destination, transport_type, fields, travel_date, after, count, today, cursor, limit, max_dates
+    )
+    return (enquiry.search_answer(body) if status == 200 else body), status
+
+
+@app.route('/api/search')
+@tracing.traced("search")
+async def search_transport():
+    """Search transport (bus/train) from source to destination with dynamic fare logic"""
+    if not engine:
+        return jsonify({"error": "Database not connected"}), 500
+
+    with tracing.span("parse"):
+        source = request.args.get('source', '').strip()
+        destination = request.args.get('destination', '').strip()
+        transport_type = request.args.get('type', '').strip().lower()
+        travel_date = request.args.get('date', '').strip()
+
+        # Extract date from destination if date field is empty but destination contains date info
+        if not travel_date and destination:
+            cleaned_destination, extracted_date = extract_date_from_text(destination)
+            if extracted_date:
+                destination = cleaned_destination
+                travel_date = extracted_date
+                tracing.annotate(extracted_date=extracted_date)
+
+    if not source or not destination:
+        return jsonify({"error": "Source and destination are required"}), 400
+    page_params, page_error = enquiry.search_page_params(request.args, SEARCH_MAX_LIMIT)
+    if page_error:
+        return jsonify({"error": page_error}), 400
+
+    body, status = await search_enquiry(source, destination, transport_type, travel_date, **page_params)
+    with tracing.span("serialize"):
+        return jsonify(body), status
+
+
+async def batch_search_enquiry(items):
+    """Async counterpart of app.batch_search_enquiry."""
+    try:
+        with tracing.span("resolve"):
+            stations = {name: await resolve_station_ids(name) for name in enquiry.batch_station_names(items)}
+        item_keys, distinct_keys = enquiry.batch_timetable_keys(items, stations, station_resolver.route_pairs())
+        timetables = await load_timetable_keys(distinct_keys)
+        tracing.annotate(batch_items=len(items), batch_keys=len(timetables))
+
+        for keys in item_keys:
+            search_events.record(key for key in keys if timetables[key])
+
+        enquiries, outside = enquiry.batch_enquiries(items, item_keys, timetables, AVAILABILITY_WINDOW_DAYS)
+        if outside:
+            enquiry.fill_batch_seats(enquiries, await load_availability_for_dates(outside))
+
+        return enquiry.batch_search_payload(items, enquiry.build_enquiries(enquiries)), 200
+
+    except Exception as e:
+        logger.error(f"Error in batch search: {e}")
+        return {"error": "Database query failed"}, 500
+
+
+@app.route('/api/search/batch', methods=['POST'])
+@tracing.traced("search_batch")
+async def search_batch():
+    """Search several route pairs in one round trip"""
+    if not engine:
+        return jsonify({"error": "Database not connected"}), 500
+
+    with tracing.span("parse"):
+        items, error = enquiry.batch_search_items(await request.get_json(silent=True), BATCH_SEARCH_MAX_ITEMS)
+    if error:
+        return jsonify({"error": error}), 400
+
+    body, status = await batch_search_enquiry(items)
+    with tracing.span("serialize"):
+        return jsonify(body), status
+
+
+@app.route('/api/enquiry')
+@tracing.traced("enquiry")
+async def unified_enquiry():
+    """Answer search, fare, next-departure and seat questions for a route in one call"""
+    if not engine:
+        return jsonify({"error": "Database not connected"}), 500
+
+    with tracing.span("parse"):
+        source = request.args.get('source', '').strip()
+        destination = request.args.get('destination', '').strip()
+        transport_type = request.args.get('type', '').strip().lower()
+        travel_date = request.args.get('date', '').strip()
+        fields, fields_error = enquiry.parse_fields(request.args.get('fields'))
+        departure_params, departure_error = enquiry.next_departure_params(request.args, NEXT_DEPARTURE_MAX_COUNT)
+        page_params, page_error = enquiry.search_page_params(request.args, SEARCH_MAX_LIMIT)
+
+        if not travel_date and destination:
+            cleaned_destination, extracted_date = extract_date_from_text(destination)
+            if extracted_date:
+                destination = cleaned_destination
+                travel_date = extracted_date
+                tracing.annotate(extracted_date=extracted_date)
+
+    if not source or not destination:
+        return jsonify({"error": "Source and destination are required"}), 400
+    if fields_error or departure_error or page_error:
+        return jsonify({"error": fields_error or departure_error or page_error}), 400
+
+    body, status = await run_enquiry(
+        source, destination, transport_type, fields, travel_date, **departure_params, **page_params
+    )
+    with tracing.span("serialize"):
+        return jsonify(body), status
+
+
+async def journey_enquiry(source, destination, transport_type, travel_date, after_ms, max_transfers, min_connection_ms):
+    """Direct and connecting journeys for a route; returns ``(body, status)``."""
+    try:
+        with tracing.span("resolve"):
+            src_ids = await resolve_station_ids(source)
+            dst_ids = await resolve_station_ids(destination)
+        if not src_ids or not dst_ids:
+            return {"message": "No journey found for given filters"}, 200
+
+        await ensure_journey_timetable()
+        with tracing.span("plan"):
+            journeys = journey_planner.plan(
+                src_ids, dst_ids, travel_date, after_ms,
+                transport_types=enquiry.requested_types(transport_type),
+                max_transfers=max_transfers,
+                min_connection_ms=min_connection_ms
+            )
+        tracing.annotate(connections=len(journey_planner), journeys=len(journeys))
+
+        if not journeys:
+            return {"message": "No journey found for given filters"}, 200
+        return {"journeys": enquiry.journey_payload(journeys, station_resolver.names())}, 200
+
+    except Exception as e:
+        logger.error(f"Error in journey: {e}")
+        return {"error": "Database query failed"}, 500
+
+
+@app.route('/api/journey')
+@tracing.traced("journey")
+async def journey():
+    """Plan direct and connecting journeys (up to JOURNEY_MAX_TRANSFERS changes)"""
+    if not engine:
+        return jsonify({"error": "Database not connected"}), 500
+
+    with tracing.span("parse"):
+        params, error = enquiry.journey_params(
+            request.args, JOURNEY_MAX_TRANSFERS, journey_planner.min_connection_ms
+        )
+    if error:
+        return jsonify({"error": error}), 400
+
+    body, status = await journey_enquiry(**params)
+    with tracing.span("serialize"):
+        return jsonify(body), status
+
+
+async def next_departure_enquiry(source, destination, transport_type, after, count=1, today=None):
+    """Next ``count`` departures after ``after``; returns ``(body, status)``.
+
+    An empty ``transport_type`` covers every type.
+    """
+    body, status = await run_enquiry(source, destination, transport_type, ('next',), after=after, count=count, today=today)
+    return (enquiry.next_departure_answer(body, transport_type) if status == 200 else body), status
+
+
+async def next_departure(transport_type):
+    """Shared implementation of /api/nextbus and /api/nexttrain."""
+    if not engine:
+        return jsonify({"error": "Database not connected"}), 500
+
+    with tracing.span("parse"):
+        source = request.args.get('source', '').strip()
+        destination = request.args.get('destination', '').strip()
+        params, error = enquiry.next_departure_params(request.args, NEXT_DEPARTURE_MAX_COUNT)
+
+    if not source or not destination:
+        return jsonify({"error": "Source and destination are required"}), 400
+    if error:
+        return jsonify({"error": error}), 400
+
+    body, status = await next_departure_enquiry(source, destination, transport_type, **params)
+    with tracing.span("serialize"):
+        return jsonify(body), status
+
+
+@app.route('/api/nextbus')
+@tracing.traced("nextbus")
+async def next_bus():
+    """Get next bus from source to destination"""
+    return await next_departure('bus')
+
+
+@app.route('/api/nexttrain')
+@tracing.traced("nexttrain")
+async def next_train():
+    """Get next train from source to destination"""
+    return await next_departure('train')
+
+
+async def fare_enquiry(source, destination, transport_type=''):
+    """Fares for every schedule on a route; returns ``(body, status)``."""
+    body, status = await run_enquiry(source, destination, transport_type, ('fare',))
+    return (enquiry.fare_answer(body) if status == 200 else body), status
+
+
+@app.route('/api/fare')
+@tracing.traced("fare")
+async def get_fare():
+    """Get fare information for a specific route"""
+    if not engine:
+        return jsonify({"error": "Database not connected"}), 500
+
+    with tracing.span("parse"):
+        source = request.args.get('source', '').strip()
+        destination = request.args.get('destination', '').strip()
+        transport_type = request.args.get('type', '').strip().lower()
+
+    if not source or not destination:
+        return jsonify({"error": "Source and destination are required"}), 400
+
+    body, status = await fare_enquiry(source, destination, transport_type)
+    with tracing.span("serialize"):
+        return jsonify(body), status
+
+
+async def request_field(name):
+    """``name`` from the JSON body of a POST, else from the query string."""
+    if request.method == 'POST':
+        data = await request.get_json(silent=True) or {}
+        value = data.get(name)
+        return '' if value is None else str(value).strip()
+    return request.args.get(name, '').strip()
+
+
+async def parse_query(transcript):
+    """Parse a transcript against the gazetteer of the current station index."""
+    if engine:
+        await ensure_station_index()
+    return query_parser.parse(transcript)
+
+
+@app.route('/api/parse', methods=['GET', 'POST'])
+@tracing.traced("parse")
+async def parse_voice_query():
+    """Parse a spoken query into source, destination, type, date and intent"""
+    transcript = await request_field('query')
+    if not transcript:
+        return jsonify({"error": "query is required"}), 400
+
+    try:
+        with tracing.span("parse"):
+            return jsonify(await parse_query(transcript))
+    except Exception as e:
+        logger.error(f"Error in parse_voice_query: {e}")
+        return jsonify({"error": "Could not parse query"}), 500
+
+
+@app.route('/api/ask', methods=['GET', 'POST'])
+@tracing.traced("ask")
+async def ask():
+    """Parse a spoken query and answer it in the same round trip"""
+    if not engine:
+        return jsonify({"error": "Database not connected"}), 500
+
+    transcript = await request_field('query')
+    if not transcript:
+        return jsonify({"error": "query is required"}), 400
+
+    try:
+        with tracing.span("parse"):
+            parsed = await parse_query(transcript)
+    except Exception as e:
+        logger.error(f"Error in ask: {e}")
+        return jsonify({"error": "Could not parse query"}), 500
+
+    tracing.annotate(intent=parsed["intent"])
+    plan, error = enquiry.ask_plan(
+        parsed, {name: await request_field(name) for name in enquiry.ASK_ARGS}, NEXT_DEPARTURE_MAX_COUNT, SEARCH_MAX_LIMIT
+    )
+    if error:
+        return jsonify({"query": parsed, "error": error}), 400
+
+    body, status = await run_enquiry(**plan["enquiry"])
+    if status == 200:
+        body = enquiry.ask_answer(plan, body)
+
+    with tracing.span("serialize"):
+        return jsonify({"query": parsed, **body}), status
+
+
+async def bookmark_cache_call(method, *args):
+    """Run a bookmark cache call off the event loop when it goes to Redis."""
+    if BOOKMARK_CACHE_URL:
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+
+@app.route('/api/bookmarks')
+@tracing.traced("bookmarks")
+async def get_bookmarks():
+    """Return all bookmarked schedules with stored fare."""
+    if 'user_id' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+
+    try:
+        cached = await bookmark_cache_call(bookmark_cache.get, session['user_id'])
+        if cached is None:
+            with tracing.span("db"):
+                async with engine.connect() as conn:
+                    result = (await conn.execute(enquiry.BOOKMARKS_SQL, {"user_id": session['user_id']})).fetchall()
+            cached = await bookmark_cache_call(bookmark_cache.put, session['user_id'], enquiry.bookmark_payload(result))
+
+        if request.if_none_match.contains(cached["etag"]):
+            response = app.response_class("", status=304)
+        else:
+            with tracing.span("serialize"):
+                response = jsonify({"bookmarks": cached["bookmarks"]})
+        response.set_etag(cached["etag"])
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
+    except Exception as e:
+        logger.error(f"Fetch bookmarks error: {e}")
+        return jsonify({"error": "Failed to load bookmarks"}), 500
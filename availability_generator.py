@@ -0,0 +1,184 @@
+"""Rolling seat inventory.
+
+Enquiries read seats from ``availability`` rows; a schedule without rows
+for a day used to be reported with made-up defaults. This job keeps real
+rows for every schedule on every day it runs (``days_mask`` plus
+``schedule_exceptions``) over the next ``window_days``, the same window the
+timetable query reads.
+
+Each pass walks the schedules in keyset batches and fills a batch with one
+``INSERT ... SELECT ... generate_series ... ON CONFLICT DO NOTHING``
+statement in its own short transaction, so existing rows (and their
+bookings) are never touched and a rerun only adds the days that rolled into
+the window. New seats copy the schedule's latest ``seats_total``, or
+``default_seats`` for a schedule that has none. Needs
+``migrations/005_availability_window.sql``.
+
+The Flask app runs a pass every ``interval_seconds`` and after admin
+schedule writes; one worker at a time runs a full pass. From cron::
+
+    python availability_generator.py --generate
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from schedule_calendar import ALL_DAYS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEATS_TOTAL = 40
+
+# Serializes full passes across workers (pg_try_advisory_lock key)
+GENERATE_LOCK_KEY = 74610023
+
+SCHEDULE_BATCH_SQL = text("""
+    SELECT schedule_id FROM schedules WHERE schedule_id > :after_id ORDER BY schedule_id LIMIT :limit
+""")
+
+# Capacity is looked up once per schedule (MATERIALIZED keeps it out of the date join), then expanded to running days
+GENERATE_SQL = text("""
+    WITH capacity AS MATERIALIZED (
+        SELECT s.schedule_id, s.days_mask, COALESCE(cap.seats_total, :default_seats) AS seats_total
+        FROM schedules s
+        LEFT JOIN LATERAL (
+            SELECT a.seats_total FROM availability a
+            WHERE a.schedule_id = s.schedule_id AND a.seats_total IS NOT NULL
+            ORDER BY a.travel_date DESC LIMIT 1
+        ) cap ON TRUE
+        WHERE s.schedule_id = ANY(CAST(:schedule_ids AS INTEGER[]))
+    )
+    INSERT INTO availability (schedule_id, travel_date, seats_total, seats_booked)
+    SELECT c.schedule_id, d.travel_date, c.seats_total, 0
+    FROM capacity c
+    CROSS JOIN (
+        SELECT CAST(day AS DATE) AS travel_date
+        FROM generate_series(CURRENT_DATE, CURRENT_DATE + CAST(:window_days AS INTEGER) - 1, INTERVAL '1 day') AS day
+    ) d
+    LEFT JOIN schedule_exceptions x ON x.schedule_id = c.schedule_id AND x.service_date = d.travel_date
+    WHERE COALESCE(
+        x.runs,
+        COALESCE(c.days_mask, :all_days) & (1 << (CAST(EXTRACT(ISODOW FROM d.travel_date) AS INTEGER) - 1)) <> 0
+    )
+    ON CONFLICT (schedule_id, travel_date) DO NOTHING
+""")
+
+
+class AvailabilityGenerator:
+    """Materializes availability rows over a rolling window, optionally on a timer."""
+
+    def __init__(self, window_days=90, batch_size=500, default_seats=DEFAULT_SEATS_TOTAL, interval_seconds=21600):
+        self.window_days = window_days
+        self.batch_size = batch_size
+        self.default_seats = default_seats
+        self.interval_seconds = interval_seconds
+        self._thread = None
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.rows_created = 0
+        self.last_run_at = None
+        self.last_error = None
+
+    def _fill(self, conn, schedule_ids):
+        with conn.begin():
+            return conn.execute(GENERATE_SQL, {
+                "schedule_ids": list(schedule_ids),
+                "window_days": self.window_days,
+                "default_seats": self.default_seats,
+                "all_days": ALL_DAYS
+            }).rowcount
+
+    def generate(self, engine, schedule_ids=None):
+        """Fill the window for ``schedule_ids``, or for every schedule; returns rows created.
+
+        A full pass is skipped (returns None) while another worker runs one.
+        """
+        created = 0
+        with engine.connect() as conn:
+            if schedule_ids is not None:
+                schedule_ids = sorted(set(schedule_ids))
+                for start in range(0, len(schedule_ids), self.batch_size):
+                    created += self._fill(conn, schedule_ids[start:start + self.batch_size])
+            else:
+                locked = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": GENERATE_LOCK_KEY}).scalar()
+                conn.commit()
+                if not locked:
+                    return None
+                try:
+                    after_id = 0
+                    while True:
+                        batch = conn.execute(
+                            SCHEDULE_BATCH_SQL, {"after_id": after_id, "limit": self.batch_size}
+                        ).scalars().all()
+                        conn.commit()
+                        if not batch:
+                            break
+                        created += self._fill(conn, batch)
+                        after_id = batch[-1]
+                finally:
+                    conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": GENERATE_LOCK_KEY})
+                    conn.commit()
+        with self._lock:
+            self.rows_created += created
+            if schedule_ids is None:
+                self.runs += 1
+                self.last_run_at = datetime.now(timezone.utc)
+        if schedule_ids is None:
+            logger.info(f"Availability generated: {created} rows over {self.window_days} days")
+        return created
+
+    def start(self, engine, on_generated=None):
+        """Run a full pass now and every ``interval_seconds`` on a daemon thread.
+
+        ``on_generated(rows_created)`` is called after each pass that added rows.
+        """
+        with self._lock:
+            if self._thread is not None or not self.interval_seconds:
+                return
+            self._thread = threading.Thread(
+                target=self._run, args=(engine, on_generated), name="availability-generator", daemon=True
+            )
+        self._thread.start()
+
+    def _run(self, engine, on_generated):
+        while True:
+            try:
+                created = self.generate(engine)
+                self.last_error = None
+                if created and on_generated is not None:
+                    on_generated(created)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Availability generator error: {e}")
+            time.sleep(self.interval_seconds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "window_days": self.window_days,
+                "runs": self.runs,
+                "rows_created": self.rows_created,
+                "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+                "last_error": self.last_error
+            }
+
+
+if __name__ == "__main__":
+    from database import create_db_engine
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Rolling availability maintenance")
+    parser.add_argument("--generate", action="store_true", help="create missing availability rows for the window")
+    parser.add_argument("--days", type=int, default=int(os.environ.get("AVAILABILITY_WINDOW_DAYS", 90)),
+                        help="window length in days (default: AVAILABILITY_WINDOW_DAYS or 90)")
+    args = parser.parse_args()
+    if args.generate:
+        created = AvailabilityGenerator(window_days=args.days).generate(create_db_engine())
+        print("Another worker is generating availability" if created is None else f"Created {created} availability rows")
+    else:
+        parser.print_help()
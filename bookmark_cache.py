@@ -0,0 +1,164 @@
+"""Per-user bookmark list cache.
+
+``/api/bookmarks`` joins five tables for every page open, yet a user's list
+only changes through ``POST /api/bookmark`` and ``DELETE /api/bookmark``.
+Both write paths re-read the list in their own transaction and store it
+here (write-through), so list reads are served from memory. Each entry
+carries an ETag over its contents; a request whose ``If-None-Match``
+matches gets a 304 without touching the database or serializing the list.
+
+Entries live in an in-process LRU by default. That is only coherent for a
+single process: with several workers, or async_app.py also serving
+``/api/bookmarks``, set ``BOOKMARK_CACHE_URL`` to a Redis URL (needs the
+``redis`` package) so every process reads and writes the same entries.
+Either way entries expire after ``ttl_seconds``, which bounds how long
+admin edits to a bookmarked schedule take to show.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def make_etag(bookmarks):
+    """Strong ETag for a bookmark list."""
+    return hashlib.sha1(json.dumps(bookmarks, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class LocalBackend:
+    """Thread-safe LRU + TTL store for one process."""
+
+    def __init__(self, max_entries=10000, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "local", "entries": len(self._entries), "evictions": self.evictions}
+
+
+class RedisBackend:
+    """Store shared by every worker, as JSON values with a TTL."""
+
+    def __init__(self, url, ttl_seconds=300, prefix="bookmarks:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(f"{self.prefix}{key}")
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(f"{self.prefix}{key}", json.dumps(value, default=str), ex=self.ttl_seconds)
+
+    def delete(self, key):
+        self.client.delete(f"{self.prefix}{key}")
+
+    def stats(self):
+        return {"backend": "redis"}
+
+
+class BookmarkCache:
+    """Bookmark lists and their ETags by user_id.
+
+    A failing backend never fails the request: reads fall back to the
+    database and a failed write-through drops the user's entry instead.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, user_id):
+        """``{"etag", "bookmarks"}`` for a user, or None when not cached."""
+        try:
+            entry = self.backend.get(user_id)
+        except Exception as e:
+            logger.error(f"Bookmark cache read error: {e}")
+            self._count("errors")
+            entry = None
+        self._count("hits" if entry is not None else "misses")
+        return entry
+
+    def put(self, user_id, bookmarks):
+        """Store a freshly loaded list; returns its entry."""
+        entry = {"etag": make_etag(bookmarks), "bookmarks": bookmarks}
+        try:
+            self.backend.set(user_id, entry)
+        except Exception as e:
+            logger.error(f"Bookmark cache write error: {e}")
+            self._count("errors")
+            self.invalidate(user_id)
+        return entry
+
+    def invalidate(self, user_id):
+        try:
+            self.backend.delete(user_id)
+        except Exception as e:
+            logger.error(f"Bookmark cache invalidate error: {e}")
+            self._count("errors")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            counters = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+        try:
+            counters.update(self.backend.stats())
+        except Exception as e:
+            logger.error(f"Bookmark cache stats error: {e}")
+        return counters
+
+
+def create_bookmark_cache(url=None, max_entries=10000, ttl_seconds=300):
+    """A Redis-backed cache for ``url``, otherwise an in-process LRU."""
+    if url:
+        return BookmarkCache(RedisBackend(url, ttl_seconds))
+    return BookmarkCache(LocalBackend(max_entries, ttl_seconds))
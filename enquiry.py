@@ -0,0 +1,912 @@
+"""Read-only enquiry queries and response shaping.
+
+Shared by the Flask app (app.py) and the async enquiry service
+(async_app.py) so both serve identical response contracts. Nothing here
+touches a connection: callers execute the SQL with their own driver and
+pass the rows back in.
+
+Every query is registered in ``QUERIES`` with bind parameters only, one
+variant per shape (dated / undated, typed / all types), so app.py can
+prepare them once per connection.
+"""
+import base64
+import bisect
+import heapq
+import re
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import JSON
+
+import fare_engine
+import journey_planner
+import schedule_calendar
+import tracing
+from query_registry import QueryRegistry
+
+TRANSPORT_TYPES = ('bus', 'train')
+
+QUERIES = QueryRegistry(prefix="enquiry_")
+
+# Open seats are always seats_total - seats_booked: holds, bookings, imports
+# and the availability generator only ever write those two columns
+TIMETABLE_SQL = QUERIES.define("timetable", """
+    SELECT
+        r.source_station_id,
+        r.destination_station_id,
+        LOWER(r.transport_type) AS transport_type,
+        s.schedule_id,
+        s.operator,
+        s.departure_time,
+        s.arrival_time,
+        r.distance_km,
+        COALESCE(av.available_dates, '[]'::json) AS available_dates,
+        s.days_mask,
+        ex.exceptions
+    FROM unnest(
+        CAST(:src_ids AS INTEGER[]), CAST(:dst_ids AS INTEGER[]), CAST(:types AS TEXT[])
+    ) AS k(source_station_id, destination_station_id, transport_type)
+    JOIN routes r ON r.source_station_id = k.source_station_id
+                 AND r.destination_station_id = k.destination_station_id
+                 AND LOWER(r.transport_type) = k.transport_type
+    JOIN schedules s ON s.route_id = r.route_id
+    LEFT JOIN LATERAL (
+        SELECT json_agg(json_build_object(
+            'date', a.travel_date,
+            'seats_total', a.seats_total,
+            'seats_booked', a.seats_booked,
+            'seats_available', a.seats_total - a.seats_booked
+        ) ORDER BY a.travel_date) AS available_dates
+        FROM (
+            SELECT DISTINCT ON (travel_date)
+                travel_date,
+                seats_total,
+                COALESCE(seats_booked, 0) AS seats_booked
+            FROM availability
+            WHERE schedule_id = s.schedule_id
+              AND travel_date >= CURRENT_DATE
+              AND travel_date < CURRENT_DATE + CAST(:window_days AS INTEGER)
+            ORDER BY travel_date
+        ) a
+    ) av ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT json_object_agg(x.service_date, x.runs) AS exceptions
+        FROM schedule_exceptions x
+        WHERE x.schedule_id = s.schedule_id AND x.service_date >= CURRENT_DATE
+    ) ex ON TRUE
+    ORDER BY s.departure_time, s.schedule_id
+""", columns={"available_dates": JSON, "exceptions": JSON})
+
+AVAILABILITY_FOR_DATE_SQL = QUERIES.define("availability_for_date", """
+    SELECT DISTINCT ON (schedule_id)
+        schedule_id, seats_total, COALESCE(seats_booked, 0), seats_total - COALESCE(seats_booked, 0)
+    FROM availability
+    WHERE schedule_id = ANY(:schedule_ids) AND travel_date = :d
+    ORDER BY schedule_id
+""")
+
+# Seats for (schedule_id, travel_date) pairs, for batches dated outside the cached window
+AVAILABILITY_FOR_DATES_SQL = QUERIES.define("availability_for_dates", """
+    SELECT DISTINCT ON (a.schedule_id, a.travel_date)
+        a.schedule_id, a.travel_date, a.seats_total,
+        COALESCE(a.seats_booked, 0), a.seats_total - COALESCE(a.seats_booked, 0)
+    FROM unnest(CAST(:schedule_ids AS INTEGER[]), CAST(:dates AS DATE[])) AS k(schedule_id, travel_date)
+    JOIN availability a ON a.schedule_id = k.schedule_id AND a.travel_date = k.travel_date
+    ORDER BY a.schedule_id, a.travel_date
+""")
+
+BOOKMARKS_SQL = QUERIES.define("bookmarks", """
+    SELECT
+        b.bookmark_id,
+        s.schedule_id,
+        s.operator,
+        s.departure_time,
+        s.arrival_time,
+        r.transport_type,
+        r.distance_km,
+        COALESCE(b.fare, 0) AS fare,
+        src.station_name AS source,
+        dst.station_name AS destination,
+        b.saved_on
+    FROM bookmarks b
+    JOIN schedules s ON b.schedule_id = s.schedule_id
+    JOIN routes r ON s.route_id = r.route_id
+    JOIN stations src ON r.source_station_id = src.station_id
+    JOIN stations dst ON r.destination_station_id = dst.station_id
+    WHERE b.user_id = :user_id
+    ORDER BY b.saved_on DESC
+""")
+
+
+def parse_time_string(value):
+    """Parse a HH:MM or HH:MM:SS string into a time object."""
+    if not value or not isinstance(value, str):
+        return None
+    value = value.strip()
+    for fmt in ("%H:%M", "%H:%M:%S"):
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_date_string(value):
+    """Parse YYYY-MM-DD date strings."""
+    if not value or not isinstance(value, str):
+        return None
+    value = value.strip()
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def extract_date_from_text(text):
+    """Extract date from text like 'delhi on 17th november' or 'दिल्ली 17 नवंबर को' and return (cleaned_text, date_string)"""
+    if not text:
+        return text, None
+
+    # Hindi month names
+    hindi_months = {
+        'जनवरी': 0, 'फरवरी': 1, 'मार्च': 2, 'अप्रैल': 3, 'मई': 4, 'जून': 5,
+        'जुलाई': 6, 'अगस्त': 7, 'सितंबर': 8, 'अक्टूबर': 9, 'नवंबर': 10, 'दिसंबर': 11
+    }
+    english_months = ["january", "february", "march", "april", "may", "june",
+                     "july", "august", "september", "october", "november", "december"]
+
+    # Pattern to match English: "on 17th november", "on 17 november", "on 1st january", etc.
+    # Handle ordinals: st, nd, rd, th
+    date_pattern = r'\s+on\s+(\d{1,2})(?:st|nd|rd|th)?\s+(january|february|march|april|may|june|july|august|september|october|november|december)'
+    match = re.search(date_pattern, text.lower())
+    month_index = -1
+
+    if match:
+        day = int(match.group(1))
+        month_name = match.group(2).lower()
+        try:
+            month_index = english_months.index(month_name)
+        except ValueError:
+            pass
+    else:
+        # Pattern to match Hindi: "17 नवंबर को", "15 जनवरी", etc.
+        hindi_date_pattern = r'(\d{1,2})(?:\s+तारीख|\s+को)?\s+([\u0900-\u097F]+)'
+        match = re.search(hindi_date_pattern, text)
+        if match:
+            day = int(match.group(1))
+            month_name = match.group(2).strip()
+            month_index = hindi_months.get(month_name, -1)
+            if month_index >= 0:
+                date_pattern = hindi_date_pattern
+
+    if match and month_index >= 0:
+        try:
+            year = datetime.now().year
+            date_obj = datetime(year, month_index + 1, day)
+            date_string = date_obj.strftime('%Y-%m-%d')
+
+            # Remove the date part from the text
+            cleaned_text = re.sub(date_pattern, '', text, flags=re.IGNORECASE).strip()
+            return cleaned_text, date_string
+        except (ValueError, IndexError):
+            pass
+
+    return text, None
+
+
+def requested_types(transport_type):
+    """Transport types covered by a ``type=`` filter ('' means all)."""
+    return [transport_type] if transport_type in TRANSPORT_TYPES else list(TRANSPORT_TYPES)
+
+
+def timetable_keys(src_ids, dst_ids, transport_types, route_pairs=None):
+    """Timetable cache keys for every candidate route pair.
+
+    With ``route_pairs`` (StationResolver.route_pairs) only the pairs that
+    have a route, so the station matches don't fan out into hundreds of
+    empty keys that would crowd real timetables out of the cache.
+    """
+    return [
+        (src, dst, ttype) for src in src_ids for dst in dst_ids for ttype in transport_types
+        if route_pairs is None or (src, dst, ttype) in route_pairs
+    ]
+
+
+def timetable_params(missing, window_days):
+    """Bind parameters for loading exactly the missing timetable keys in one query.
+
+    The keys travel as three parallel arrays that TIMETABLE_SQL unnests into
+    a key list and joins against ``routes``, so route pairs from unrelated
+    searches never multiply into a cross product.
+    """
+    keys = sorted(missing)
+    return {
+        "src_ids": [key[0] for key in keys],
+        "dst_ids": [key[1] for key in keys],
+        "types": [key[2] for key in keys],
+        "window_days": window_days
+    }
+
+
+def group_timetable(rows, missing):
+    """Group TIMETABLE_SQL rows into ``{key: [schedule, ...]}``.
+
+    Every missing key gets an entry, so pairs without routes are cached as
+    empty. Each list is sorted by departure time, so a cached timetable
+    doubles as the route pair's departure index.
+    """
+    loaded = {key: [] for key in missing}
+    for row in rows:
+        available_dates = row[8] or []
+        days_mask, exceptions = row[9], row[10] or {}
+        # Drop seat rows for days the service doesn't run
+        available_dates = [
+            entry for entry in available_dates
+            if schedule_calendar.runs_on(days_mask, exceptions, parse_date_string(entry["date"]))
+        ]
+        loaded.setdefault((row[0], row[1], row[2]), []).append({
+            "schedule_id": row[3],
+            "operator": row[4] or '',
+            "departure_time": str(row[5]),
+            "arrival_time": str(row[6]),
+            "distance_km": float(row[7]) if row[7] else 0,
+            "transport_type": row[2],
+            "available_dates": available_dates,
+            "availability": {entry["date"]: entry for entry in available_dates},
+            "days_mask": days_mask,
+            "exceptions": exceptions
+        })
+    return loaded
+
+
+def running_on(schedules, day):
+    """Timetable schedules that operate on ``day``."""
+    return [
+        sched for sched in schedules
+        if schedule_calendar.runs_on(sched["days_mask"], sched["exceptions"], day)
+    ]
+
+
+def date_in_window(requested, window_days, today=None):
+    """Whether a date's seats are already part of the cached timetable."""
+    today = today or datetime.now().date()
+    return today <= requested < today + timedelta(days=window_days)
+
+
+def requested_date(travel_date):
+    """The parsed ``date`` of an enquiry (None when undated); returns ``(date, error)``."""
+    if not travel_date:
+        return None, None
+    requested = parse_date_string(travel_date)
+    if not requested:
+        return None, "date must be YYYY-MM-DD"
+    return requested, None
+
+
+def window_seats(schedules, requested):
+    """Seats of each schedule on ``requested`` from its cached availability window."""
+    key = requested.isoformat()
+    return {sched["schedule_id"]: sched["availability"].get(key) for sched in schedules}
+
+
+def enquiry_seats(timetables, fields, requested, window_days, cursor=None, limit=None, today=None):
+    """Seats a dated enquiry needs; returns ``(seats_for, schedule_ids)``.
+
+    Inside the cached window ``seats_for`` comes straight from the
+    timetables. Outside it ``schedule_ids`` lists the schedules whose seats
+    the caller loads with AVAILABILITY_FOR_DATE_SQL: only the ones running
+    that day, and only the requested page unless every seat is wanted.
+    """
+    if not requested or not ('search' in fields or 'availability' in fields):
+        return None, []
+    if date_in_window(requested, window_days, today):
+        return window_seats((sched for timetable in timetables for sched in timetable), requested), []
+    schedules = search_schedules(timetables, requested)
+    if 'availability' not in fields:
+        schedules, _ = page_schedules(schedules, cursor, limit)
+    return None, [sched["schedule_id"] for sched in schedules]
+
+
+def seats_by_schedule(rows):
+    """Map AVAILABILITY_FOR_DATE_SQL rows by schedule_id."""
+    return {
+        row[0]: {"seats_total": row[1], "seats_booked": row[2], "seats_available": row[3]}
+        for row in rows
+    }
+
+
+def seats_by_schedule_date(rows):
+    """Map AVAILABILITY_FOR_DATES_SQL rows by ``(schedule_id, travel_date)``."""
+    return {
+        (row[0], row[1]): {"seats_total": row[2], "seats_booked": row[3], "seats_available": row[4]}
+        for row in rows
+    }
+
+
+ENQUIRY_FIELDS = ('search', 'fare', 'next', 'availability')
+
+
+def parse_fields(value):
+    """``fields=search,fare,next,availability`` as a tuple; ``(fields, error)``."""
+    fields = tuple(dict.fromkeys(
+        field.strip().lower() for field in str(value or 'search').split(',') if field.strip()
+    ))
+    unknown = [field for field in fields if field not in ENQUIRY_FIELDS]
+    if unknown or not fields:
+        return None, f"fields must be a comma-separated list of {', '.join(ENQUIRY_FIELDS)}"
+    return fields, None
+
+
+def encode_cursor(sched):
+    """Opaque keyset cursor pointing just past ``sched`` in (departure_time, schedule_id) order."""
+    raw = f"{sched['departure_time']}|{sched['schedule_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    """``(departure_time, schedule_id)`` from a cursor, or None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+        departure_time, schedule_id = raw.split('|')
+        if not parse_time_string(departure_time):
+            return None
+        return departure_time, int(schedule_id)
+    except ValueError:
+        return None
+
+
+def search_page_params(args, max_limit):
+    """Validated ``cursor`` / ``limit`` / ``max_dates`` for /api/search.
+
+    Returns ``(params, error)``. Without ``limit`` every result is returned
+    and without ``max_dates`` every upcoming date; ``max_dates=0`` leaves
+    ``available_dates`` out for a light payload.
+    """
+    params = {"cursor": None, "limit": None, "max_dates": None}
+    cursor = str(args.get('cursor', '') or '').strip()
+    if cursor:
+        params["cursor"] = decode_cursor(cursor)
+        if params["cursor"] is None:
+            return None, "cursor is invalid"
+    for name, low, high in (("limit", 1, max_limit), ("max_dates", 0, None)):
+        value = str(args.get(name, '') or '').strip()
+        if not value:
+            continue
+        try:
+            params[name] = int(value)
+        except ValueError:
+            return None, f"{name} must be an integer"
+        if params[name] < low or (high is not None and params[name] > high):
+            return None, f"{name} must be between {low} and {high}" if high is not None else f"{name} must be at least {low}"
+    return params, None
+
+
+def search_schedules(timetables, travel_date=None):
+    """Schedules of every timetable in (departure_time, schedule_id) order.
+
+    With ``travel_date`` (a date) only the schedules running that day.
+    """
+    schedules = sorted(
+        (sched for timetable in timetables for sched in timetable),
+        key=lambda sched: (sched["departure_time"], sched["schedule_id"])
+    )
+    return running_on(schedules, travel_date) if travel_date else schedules
+
+
+def page_schedules(schedules, cursor=None, limit=None):
+    """One keyset page of search_schedules output; returns ``(page, next_cursor)``.
+
+    The page starts just after ``cursor`` (found by binary search) and
+    ``next_cursor`` is None on the last page.
+    """
+    start = bisect.bisect_right(
+        schedules, cursor, key=lambda sched: (sched["departure_time"], sched["schedule_id"])
+    ) if cursor else 0
+    if limit is None:
+        return schedules[start:], None
+    page = schedules[start:start + limit]
+    return page, encode_cursor(page[-1]) if start + limit < len(schedules) else None
+
+
+def capped_dates(available_dates, max_dates):
+    """``available_dates`` cut to ``max_dates`` entries (None keeps them all)."""
+    return available_dates if max_dates is None else available_dates[:max_dates]
+
+
+def _search_rows(schedules, travel_date, seats_for, max_dates=None):
+    """Unpriced /api/search results.
+
+    With ``travel_date`` each schedule is reported for that date using
+    ``seats_for`` (schedule_id -> seats); without it the upcoming dates are
+    listed in ``available_dates``, capped to ``max_dates``. Seats with no
+    availability row are None rather than a made-up coach.
+    """
+    transport_list = []
+    if travel_date:
+        seats_for = seats_for or {}
+        for sched in schedules:
+            seats = seats_for.get(sched["schedule_id"]) or {}
+            transport_list.append({
+                "schedule_id": sched["schedule_id"],
+                "operator": sched["operator"],
+                "departure_time": sched["departure_time"],
+                "arrival_time": sched["arrival_time"],
+                "distance_km": sched["distance_km"],
+                "transport_type": sched["transport_type"],
+                "travel_date": travel_date,  # Use requested date
+                "seats_total": seats.get("seats_total"),
+                "seats_booked": seats.get("seats_booked"),
+                "seats_available": seats.get("seats_available")
+            })
+    else:
+        # Dates arrive already grouped and sorted by Postgres
+        for sched in schedules:
+            # The availability generator fills the window, so no dates means none are on sale
+            available_dates = sched["available_dates"]
+            first_date = available_dates[0] if available_dates else {}
+
+            result = {
+                "schedule_id": sched["schedule_id"],
+                "operator": sched["operator"],
+                "departure_time": sched["departure_time"],
+                "arrival_time": sched["arrival_time"],
+                "distance_km": sched["distance_km"],
+                "transport_type": sched["transport_type"],
+                "travel_date": first_date.get('date'),
+                "seats_total": first_date.get('seats_total'),
+                "seats_booked": first_date.get('seats_booked'),
+                "seats_available": first_date.get('seats_available')
+            }
+            if max_dates != 0:
+                result["available_dates"] = capped_dates(available_dates, max_dates)
+            transport_list.append(result)
+    return transport_list
+
+
+def _quote_row(sched, seats):
+    return {
+        "operator": sched["operator"],
+        "distance_km": sched["distance_km"],
+        "departure_time": sched["departure_time"],
+        **(seats or {})
+    }
+
+
+def _draft_enquiry(timetables, fields, travel_date, seats_for, after, count, today, quote_rows,
+                   cursor=None, limit=None, max_dates=None):
+    """Unpriced enquiry body; appends what needs a price to ``quote_rows``.
+
+    Returns ``(body, priced)`` where ``priced`` lists ``(items, start,
+    with_bus_type)``: the fares for ``items`` begin at ``quote_rows[start]``.
+    """
+    today = today or datetime.now().date()
+    schedules = search_schedules(timetables, parse_date_string(travel_date) if travel_date else None)
+    body = {}
+    priced = []
+
+    if 'search' in fields:
+        page, next_cursor = page_schedules(schedules, cursor, limit)
+        body["results"] = _search_rows(page, travel_date, seats_for, max_dates)
+        if limit is not None:
+            body["next_cursor"] = next_cursor
+        priced.append((body["results"], len(quote_rows), True))
+        quote_rows.extend(body["results"])
+
+    if 'fare' in fields:
+        by_distance = sorted(schedules, key=lambda sched: (sched["distance_km"], sched["schedule_id"]))
+        body["fares"] = [{
+            "schedule_id": sched["schedule_id"],
+            "transport_type": sched["transport_type"],
+            "operator": sched["operator"],
+            "distance_km": sched["distance_km"]
+        } for sched in by_distance]
+        priced.append((body["fares"], len(quote_rows), False))
+        quote_rows.extend(
+            _quote_row(sched, sched["available_dates"][0] if sched["available_dates"] else None)
+            for sched in by_distance
+        )
+
+    if 'next' in fields:
+        departures = next_departures(
+            [timetable for timetable in timetables if timetable], after or datetime.now().time(), count, today
+        )
+        body["departures"] = [{
+            "schedule_id": sched["schedule_id"],
+            "operator": sched["operator"],
+            "departure_time": sched["departure_time"],
+            "arrival_time": sched["arrival_time"],
+            "transport_type": sched["transport_type"],
+            "distance_km": sched["distance_km"],
+            "travel_date": day.isoformat()
+        } for sched, day in departures]
+        priced.append((body["departures"], len(quote_rows), False))
+        quote_rows.extend(_quote_row(sched, sched["availability"].get(day.isoformat())) for sched, day in departures)
+
+    if 'availability' in fields:
+        body["availability"] = [{
+            "schedule_id": sched["schedule_id"],
+            "operator": sched["operator"],
+            "departure_time": sched["departure_time"],
+            "transport_type": sched["transport_type"],
+            "available_dates": (
+                [dict((seats_for or {}).get(sched["schedule_id"]) or {}, date=travel_date)]
+                if travel_date else capped_dates(sched["available_dates"], max_dates)
+            )
+        } for sched in schedules]
+
+    return body, priced
+
+
+def build_enquiries(enquiries):
+    """Answer several enquiries with one fare pass over all of them.
+
+    ``enquiries`` are dicts of build_enquiry keyword arguments; the bodies
+    come back in the same order.
+    """
+    quote_rows = []
+    drafts = [
+        _draft_enquiry(
+            item["timetables"], item["fields"], item.get("travel_date"), item.get("seats_for"),
+            item.get("after"), item.get("count", 1), item.get("today"), quote_rows,
+            item.get("cursor"), item.get("limit"), item.get("max_dates")
+        )
+        for item in enquiries
+    ]
+
+    # One vectorized fare pass over everything that needs a price
+    with tracing.span("fare"):
+        fares, bus_types = fare_engine.quote(quote_rows)
+
+    for body, priced in drafts:
+        for items, start, with_bus_type in priced:
+            for offset, item in enumerate(items):
+                item["fare"] = fares[start + offset]
+                if with_bus_type:
+                    item["bus_type"] = bus_types[start + offset]
+        if "results" in body:
+            body["results"].sort(key=lambda x: x['departure_time'])
+    return [body for body, _ in drafts]
+
+
+def build_enquiry(timetables, fields, travel_date=None, seats_for=None, after=None, count=1, today=None,
+                  cursor=None, limit=None, max_dates=None):
+    """Answer every requested field from the cached timetables in one fare pass.
+
+    ``timetables`` are the departure-sorted schedule lists of each route
+    pair. ``search`` gives /api/search ``results`` (the keyset page after
+    ``cursor``, with a ``next_cursor`` when ``limit`` is set), ``fare`` the
+    /api/fare ``fares`` (seats of each schedule's next running day),
+    ``next`` the next ``count`` ``departures`` after ``after`` and
+    ``availability`` the seats per schedule (for ``travel_date``, or the
+    upcoming dates capped to ``max_dates``).
+    """
+    return build_enquiries([{
+        "timetables": timetables, "fields": fields, "travel_date": travel_date, "seats_for": seats_for,
+        "after": after, "count": count, "today": today, "cursor": cursor, "limit": limit, "max_dates": max_dates
+    }])[0]
+
+
+def batch_search_items(payload, max_items):
+    """Validated /api/search/batch items; returns ``(items, error)``.
+
+    ``payload`` is a list of ``{source, destination, type, date}`` objects
+    (or ``{"items": [...]}``). Invalid entries stay in place with an
+    ``error`` so each answer lines up with its request.
+    """
+    if isinstance(payload, dict):
+        payload = payload.get("items")
+    if not isinstance(payload, list) or not payload:
+        return None, "Request body must be a non-empty list of searches"
+    if len(payload) > max_items:
+        return None, f"At most {max_items} searches per batch"
+
+    items = []
+    for entry in payload:
+        if not isinstance(entry, dict):
+            items.append({"error": "Each search must be an object"})
+            continue
+        item = {
+            "source": str(entry.get("source") or '').strip(),
+            "destination": str(entry.get("destination") or '').strip(),
+            "type": str(entry.get("type") or '').strip().lower(),
+            "date": str(entry.get("date") or '').strip()
+        }
+        if not item["date"] and item["destination"]:
+            cleaned_destination, extracted_date = extract_date_from_text(item["destination"])
+            if extracted_date:
+                item["destination"], item["date"] = cleaned_destination, extracted_date
+        if not item["source"] or not item["destination"]:
+            item["error"] = "Source and destination are required"
+        elif item["date"] and not parse_date_string(item["date"]):
+            item["error"] = "date must be YYYY-MM-DD"
+        items.append(item)
+    return items, None
+
+
+def batch_station_names(items):
+    """Distinct station names of the valid batch items, to resolve once each."""
+    return list(dict.fromkeys(
+        name for item in items if "error" not in item for name in (item["source"], item["destination"])
+    ))
+
+
+def batch_timetable_keys(items, stations, route_pairs=None):
+    """Timetable keys of each valid batch item, and every distinct key to load.
+
+    ``stations`` maps each batch_station_names name to its station_ids.
+    Returns ``(item_keys, keys)``.
+    """
+    item_keys = [
+        timetable_keys(
+            stations[item["source"]], stations[item["destination"]], requested_types(item["type"]), route_pairs
+        )
+        for item in items if "error" not in item
+    ]
+    return item_keys, list(dict.fromkeys(key for keys in item_keys for key in keys))
+
+
+def batch_enquiries(items, item_keys, timetables, window_days, today=None):
+    """build_enquiries arguments for the valid batch items; returns ``(enquiries, pairs)``.
+
+    Dated items inside the cached window get their seats from the
+    timetables. ``pairs`` lists the ``(schedule_id, travel_date)`` seats
+    to load with AVAILABILITY_FOR_DATES_SQL for the rest; pass the result
+    to fill_batch_seats.
+    """
+    enquiries, pairs = [], []
+    for item, keys in zip((item for item in items if "error" not in item), item_keys):
+        schedules = [sched for key in keys for sched in timetables[key]]
+        requested = parse_date_string(item["date"]) if item["date"] else None
+        seats_for = None
+        if requested and date_in_window(requested, window_days, today):
+            seats_for = window_seats(schedules, requested)
+        elif requested:
+            pairs.extend((sched["schedule_id"], requested) for sched in schedules)
+        enquiries.append({
+            "timetables": [timetables[key] for key in keys], "fields": ('search',),
+            "travel_date": item["date"], "seats_for": seats_for, "requested": requested
+        })
+    return enquiries, list(dict.fromkeys(pairs))
+
+
+def fill_batch_seats(enquiries, seats):
+    """Give the out-of-window batch_enquiries their seats, keyed by ``(schedule_id, travel_date)``."""
+    for entry in enquiries:
+        if entry["requested"] and entry["seats_for"] is None:
+            entry["seats_for"] = {
+                sched["schedule_id"]: seats.get((sched["schedule_id"], entry["requested"]))
+                for timetable in entry["timetables"] for sched in timetable
+            }
+
+
+def batch_search_payload(items, bodies):
+    """Per-item /api/search/batch answers, in request order.
+
+    ``bodies`` holds a build_enquiry body for every item without an error.
+    """
+    bodies = iter(bodies)
+    answers = []
+    for item in items:
+        answer = dict(item)
+        if "error" not in item:
+            results = next(bodies)["results"]
+            if results:
+                answer["results"] = results
+            else:
+                answer["message"] = "No transport found for given filters"
+        answers.append(answer)
+    return {"results": answers}
+
+
+def journey_params(args, max_transfers_limit, default_min_connection_ms, now=None):
+    """Validated ``journey_enquiry`` keyword arguments from /api/journey query args.
+
+    Returns ``(params, error)``. Without ``date`` journeys start from now;
+    with one, from the start of that day unless ``after`` is given.
+    """
+    source = args.get('source', '').strip()
+    destination = args.get('destination', '').strip()
+    travel_date = args.get('date', '').strip()
+    after = args.get('after', '').strip()
+    if not source or not destination:
+        return None, "Source and destination are required"
+
+    now = now or datetime.now()
+    requested = parse_date_string(travel_date) if travel_date else now.date()
+    if not requested:
+        return None, "date must be YYYY-MM-DD"
+    if after:
+        after_time = parse_time_string(after)
+        if not after_time:
+            return None, "after must be HH:MM format"
+    else:
+        after_time = time.min if travel_date else now.time()
+    try:
+        max_transfers = int(args.get('max_transfers', max_transfers_limit))
+        min_connection_ms = int(args.get('min_connection_ms', default_min_connection_ms))
+    except ValueError:
+        return None, "max_transfers and min_connection_ms must be integers"
+    if not 0 <= max_transfers <= max_transfers_limit:
+        return None, f"max_transfers must be between 0 and {max_transfers_limit}"
+    if min_connection_ms < 0:
+        return None, "min_connection_ms must be non-negative"
+
+    return {
+        "source": source,
+        "destination": destination,
+        "transport_type": args.get('type', '').strip().lower(),
+        "travel_date": requested,
+        "after_ms": journey_planner.time_ms(after_time),
+        "max_transfers": max_transfers,
+        "min_connection_ms": min_connection_ms
+    }, None
+
+
+def next_departures(timetables, after, count=1, today=None, lookahead_days=7):
+    """The next ``count`` ``(schedule, date)`` departures after ``after`` today.
+
+    ``timetables`` are departure-sorted schedule lists (one per route pair).
+    Each is entered by binary search at ``after`` and the lists are merged
+    in time order; once today's services run out the search wraps to
+    tomorrow's first departure, skipping days a service doesn't run, for up
+    to ``lookahead_days`` days.
+    """
+    today = today or datetime.now().date()
+    found = []
+    for offset in range(lookahead_days + 1):
+        day = today + timedelta(days=offset)
+        start = after.strftime("%H:%M:%S") if offset == 0 else ""
+        merged = heapq.merge(*(
+            timetable[bisect.bisect_left(timetable, start, key=lambda sched: sched["departure_time"]):]
+            for timetable in timetables
+        ), key=lambda sched: sched["departure_time"])
+        for sched in merged:
+            if schedule_calendar.runs_on(sched["days_mask"], sched["exceptions"], day):
+                found.append((sched, day))
+                if len(found) == count:
+                    return found
+    return found
+
+
+def next_departure_params(args, max_count, now=None):
+    """Validated ``after`` / ``count`` for /api/nextbus and /api/nexttrain.
+
+    Returns ``(params, error)``; ``after`` defaults to now.
+    """
+    now = now or datetime.now()
+    after = str(args.get('after', '') or '').strip()
+    after_time = parse_time_string(after) if after else now.time()
+    if not after_time:
+        return None, "after must be HH:MM format"
+    try:
+        count = int(args.get('count', 1) or 1)
+    except (TypeError, ValueError):
+        return None, "count must be an integer"
+    if not 1 <= count <= max_count:
+        return None, f"count must be between 1 and {max_count}"
+    return {"after": after_time, "count": count, "today": now.date()}, None
+
+
+def search_answer(body):
+    """/api/search body: a message instead of an empty ``results``."""
+    if not body["results"]:
+        del body["results"]
+        body["message"] = "No transport found for given filters"
+    return body
+
+
+def fare_answer(body):
+    """/api/fare body."""
+    if not body["fares"]:
+        return {"message": "No fare information found for this route"}
+    return body
+
+
+def next_departure_answer(body, transport_type):
+    """/api/nextbus and /api/nexttrain body: the first departure, plus all of them."""
+    if body["departures"]:
+        return {**body["departures"][0], "departures": body["departures"]}
+    return {"message": f"No {transport_type or 'transport'} found for this route"}
+
+
+# Request fields /api/ask reads besides the transcript
+ASK_ARGS = ('intent', 'after', 'count', 'cursor', 'limit', 'max_dates')
+
+
+def ask_plan(parsed, args, max_count, max_limit):
+    """What /api/ask runs for a parsed transcript; returns ``(plan, error)``.
+
+    ``args`` holds the ASK_ARGS request fields. ``plan["enquiry"]`` are the
+    run_enquiry keyword arguments and ``plan["answer"]`` (``fare``, ``next``
+    or ``search``) picks how ask_answer shapes the body.
+    """
+    if not parsed["source"] or not parsed["destination"]:
+        return None, "Source and destination are required"
+    departure_params, error = next_departure_params(args, max_count)
+    if error:
+        return None, error
+    page_params, error = search_page_params(args, max_limit)
+    if error:
+        return None, error
+
+    route = {"source": parsed["source"], "destination": parsed["destination"]}
+    # Clients that phrase every answer from the priced search results pass intent=search
+    intent = str(args.get('intent') or '').lower() or parsed["intent"]
+    if intent == "fare":
+        return {"answer": "fare", "enquiry": {**route, "transport_type": parsed["type"] or '', "fields": ('fare',)}}, None
+    if intent == "next":
+        return {"answer": "next", "enquiry": {
+            **route, "transport_type": parsed["type"] or 'bus', "fields": ('next',), **departure_params
+        }}, None
+    # Search results start at midnight; spoken "next" questions also get the real next departures
+    return {"answer": "search", "enquiry": {
+        **route, "transport_type": parsed["type"] or '', "travel_date": parsed["date"] or '',
+        "fields": ('search', 'next') if parsed["intent"] == "next" else ('search',),
+        **departure_params, **page_params
+    }}, None
+
+
+def ask_answer(plan, body):
+    """Shape a successful run_enquiry body for an ask_plan."""
+    if plan["answer"] == "fare":
+        return fare_answer(body)
+    if plan["answer"] == "next":
+        return next_departure_answer(body, plan["enquiry"]["transport_type"])
+    return search_answer(body)
+
+
+def bookmark_payload(rows):
+    """Bookmark list for /api/bookmarks."""
+    return [{
+        "bookmark_id": row[0],
+        "schedule_id": row[1],
+        "operator": row[2],
+        "departure_time": str(row[3]),
+        "arrival_time": str(row[4]),
+        "transport_type": row[5],
+        "distance_km": float(row[6]),
+        "fare": float(row[7]),
+        "source": row[8],
+        "destination": row[9],
+        "saved_on": str(row[10])
+    } for row in rows]
+
+
+def journey_payload(journeys, station_names):
+    """Journey list for /api/journey; each leg priced like a search result."""
+    legs = [leg for journey in journeys for leg in journey]
+    with tracing.span("fare"):
+        fares, _ = fare_engine.quote([{
+            "operator": connection.operator,
+            "distance_km": connection.distance_km,
+            "departure_time": connection.departure_time
+        } for connection, _ in legs])
+    fares = iter(fares)
+
+    payload = []
+    for journey in journeys:
+        priced = [{
+            "schedule_id": connection.schedule_id,
+            "operator": connection.operator,
+            "transport_type": connection.transport_type,
+            "source": station_names.get(connection.source_id),
+            "destination": station_names.get(connection.destination_id),
+            "travel_date": leg_date.isoformat(),
+            "departure_time": str(connection.departure_time),
+            "arrival_time": str(connection.arrival_time),
+            "distance_km": connection.distance_km,
+            "fare": next(fares)
+        } for connection, leg_date in journey]
+        (first, first_date), (last, last_date) = journey[0], journey[-1]
+        # Milliseconds after midnight of the first leg's date
+        arrival_ms = last.arrival_ms + (last_date - first_date).days * journey_planner.DAY_MS
+        payload.append({
+            "transfers": len(journey) - 1,
+            "departure_date": first_date.isoformat(),
+            "departure_time": str(first.departure_time),
+            "arrival_date": (first_date + timedelta(milliseconds=arrival_ms)).isoformat(),
+            "arrival_time": str(last.arrival_time),
+            "duration_minutes": (arrival_ms - first.departure_ms) // 60000,
+            "total_fare": round(sum(leg["fare"] for leg in priced), 2),
+            "legs": priced
+        })
+    return payload
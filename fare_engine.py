@@ -0,0 +1,112 @@
+"""Dynamic fare engine.
+
+Prices a whole result set at once with NumPy instead of looping over rows
+in Python. Every enquiry endpoint goes through :func:`quote` so search,
+fare and next-departure answers always agree on the price.
+
+fare = distance_km * base_rate(bus_type) * operator_multiplier
+       * seat_factor * peak_factor, floored at MIN_FARE
+"""
+from datetime import time
+from functools import lru_cache
+
+import numpy as np
+
+BASE_RATE = {
+    'AC': 3.5,
+    'NON-AC': 2.5,
+    'SLEEPER': 4.0,
+    'VOLVO': 4.8,
+    'ORDINARY': 2.0
+}
+
+OPERATOR_MULTIPLIER = {
+    'UPSRTC': 1.10,
+    'MSRTC': 0.95,
+    'RSRTC': 1.00,
+    'KSRTC': 1.05,
+    'TSRTC': 1.08
+}
+
+MIN_FARE = 150
+DEFAULT_SEATS = 40
+PEAK_FACTOR = 1.15
+PEAK_HOURS = ((6, 9), (17, 21))  # inclusive hour ranges
+MAX_SEAT_SURCHARGE = 0.5  # up to +50% when seats are low
+
+
+def infer_bus_type(operator):
+    """Infer the coach class from the operator name."""
+    op_upper = (operator or '').upper()
+    if 'VOLVO' in op_upper:
+        return 'VOLVO'
+    if 'SLEEP' in op_upper:
+        return 'SLEEPER'
+    if 'AC' in op_upper:
+        return 'AC'
+    return 'ORDINARY'
+
+
+@lru_cache(maxsize=4096)
+def operator_profile(operator):
+    """Return ``(bus_type, rate)`` where rate is base rate times operator multiplier."""
+    bus_type = infer_bus_type(operator)
+    rate = BASE_RATE.get(bus_type, BASE_RATE['ORDINARY']) * OPERATOR_MULTIPLIER.get((operator or '').upper(), 1.0)
+    return bus_type, rate
+
+
+def departure_hour(value):
+    """Hour of a departure given as a time object or HH:MM[:SS] string."""
+    if isinstance(value, time):
+        return value.hour
+    value = str(value)
+    return int(value.split(':')[0]) if ':' in value else 12
+
+
+def _seats(row):
+    """``(seats_total, seats_available)`` with unknown inventory priced as a fully available coach."""
+    total = row.get('seats_total')
+    total = DEFAULT_SEATS if total is None else total
+    available = row.get('seats_available')
+    return total, total if available is None else available
+
+
+def price(distance_km, rates, departure_hours, seats_total, seats_available):
+    """Vectorized fare calculation over equally sized arrays."""
+    distance_km = np.asarray(distance_km, dtype=float)
+    rates = np.asarray(rates, dtype=float)
+    hours = np.asarray(departure_hours, dtype=int)
+    seats_total = np.asarray(seats_total, dtype=float)
+    seats_available = np.asarray(seats_available, dtype=float)
+
+    seat_ratio = np.divide(seats_available, seats_total, out=np.ones_like(seats_total), where=seats_total > 0)
+    seat_factor = 1 + MAX_SEAT_SURCHARGE * (1 - seat_ratio)
+
+    is_peak = np.zeros(hours.shape, dtype=bool)
+    for start, end in PEAK_HOURS:
+        is_peak |= (hours >= start) & (hours <= end)
+    peak_factor = np.where(is_peak, PEAK_FACTOR, 1.0)
+
+    fares = distance_km * rates * seat_factor * peak_factor
+    return np.maximum(MIN_FARE, np.round(fares, 2))
+
+
+def quote(rows):
+    """Price a result set in one pass.
+
+    ``rows`` are dicts with ``operator``, ``distance_km``, ``departure_time``,
+    ``seats_total`` and ``seats_available``. Returns ``(fares, bus_types)``.
+    """
+    count = len(rows)
+    if not count:
+        return [], []
+
+    profiles = [operator_profile(row.get('operator') or '') for row in rows]
+    fares = price(
+        np.fromiter((float(row.get('distance_km') or 0) for row in rows), dtype=float, count=count),
+        np.fromiter((profile[1] for profile in profiles), dtype=float, count=count),
+        np.fromiter((departure_hour(row.get('departure_time')) for row in rows), dtype=int, count=count),
+        np.fromiter((_seats(row)[0] for row in rows), dtype=float, count=count),
+        np.fromiter((_seats(row)[1] for row in rows), dtype=float, count=count),
+    )
+    return fares.tolist(), [profile[0] for profile in profiles]
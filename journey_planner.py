@@ -0,0 +1,221 @@
+"""In-memory multi-leg journey planner.
+
+Every schedule is one elementary connection: a vehicle leaving one station
+at ``departure_time`` and reaching another at ``arrival_time`` on the days
+of its calendar (``days_mask`` plus exception dates, see schedule_calendar).
+The connections are held in memory sorted by departure time, and journeys
+with up to two transfers are found with a connection scan (CSA): a single
+pass over the connections departing after the requested time, keeping the
+earliest arrival at every station per number of legs. A transfer is only
+allowed when the next leg leaves the same station at least the minimum
+connection time after the previous leg arrived.
+
+The timetable is loaded once and refreshed when it goes stale; the admin
+write paths replace just the connections of the route they touched.
+"""
+import bisect
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from sqlalchemy import JSON, text
+
+from schedule_calendar import ALL_DAYS, day_bit
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 24 * 60 * 60 * 1000
+# Journeys may run into the next day (overnight legs and late transfers)
+HORIZON_DAYS = 2
+
+_CONNECTIONS_SQL = """
+    SELECT s.schedule_id, r.route_id, r.source_station_id, r.destination_station_id,
+           r.transport_type, s.operator, s.departure_time, s.arrival_time,
+           s.days_mask, r.distance_km,
+           (SELECT json_object_agg(x.service_date, x.runs) FROM schedule_exceptions x
+            WHERE x.schedule_id = s.schedule_id AND x.service_date >= CURRENT_DATE - 1) AS exceptions
+    FROM schedules s
+    JOIN routes r ON r.route_id = s.route_id
+    {route_filter}
+"""
+CONNECTIONS_SQL = text(_CONNECTIONS_SQL.format(route_filter="")).columns(exceptions=JSON)
+ROUTE_CONNECTIONS_SQL = text(_CONNECTIONS_SQL.format(route_filter="WHERE r.route_id = :route_id")).columns(exceptions=JSON)
+
+Connection = namedtuple('Connection', (
+    'departure_ms', 'arrival_ms', 'source_id', 'destination_id', 'schedule_id', 'route_id',
+    'transport_type', 'operator', 'departure_time', 'arrival_time', 'days', 'distance_km', 'exceptions'
+))
+
+
+def time_ms(value):
+    """Milliseconds since midnight for a ``datetime.time``."""
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1000 + value.microsecond // 1000
+
+
+def to_connection(row):
+    """Build a Connection from a CONNECTIONS_SQL row."""
+    departure_ms = time_ms(row[6])
+    arrival_ms = time_ms(row[7])
+    if arrival_ms <= departure_ms:
+        arrival_ms += DAY_MS  # arrives the next day
+    return Connection(
+        departure_ms, arrival_ms, row[2], row[3], row[0], row[1], (row[4] or '').lower(),
+        row[5], row[6], row[7], ALL_DAYS if row[8] is None else row[8],
+        float(row[9]) if row[9] else 0.0, row[10] or None
+    )
+
+
+class JourneyPlanner:
+    """Connection-scan journey planner over the schedules timetable."""
+
+    def __init__(self, refresh_seconds=600, min_connection_ms=10 * 60 * 1000, max_transfers=2):
+        self.refresh_seconds = refresh_seconds
+        self.min_connection_ms = min_connection_ms
+        self.max_transfers = max_transfers
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self.generation = 0
+        # (departure_ms list for bisect, connections), swapped as a whole
+        self._timetable = ([], [])
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def __len__(self):
+        return len(self._timetable[1])
+
+    def load(self, engine):
+        """(Re)build the timetable from the schedules and routes tables."""
+        with engine.connect() as conn:
+            rows = conn.execute(CONNECTIONS_SQL).fetchall()
+        self.load_rows(rows)
+
+    def load_rows(self, rows):
+        """(Re)build the timetable from CONNECTIONS_SQL rows."""
+        self._swap(to_connection(row) for row in rows)
+        self._loaded_at = time.monotonic()
+        logger.info(f"Journey planner loaded with {len(rows)} connections")
+
+    def needs_refresh(self):
+        """True before the first load and once the timetable has gone stale."""
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            return True
+        return bool(self.refresh_seconds) and time.monotonic() - loaded_at >= self.refresh_seconds
+
+    def ensure_loaded(self, engine):
+        """Load the timetable on first use and refresh it once it goes stale."""
+        if not self.needs_refresh():
+            return
+        with self._lock:
+            if self.needs_refresh():
+                self.load(engine)
+
+    def invalidate(self):
+        """Force a full reload on the next plan."""
+        self._loaded_at = None
+
+    def refresh_route(self, engine, route_id):
+        """Reload only the connections of ``route_id`` after an admin write."""
+        if not self.loaded:
+            return
+        with engine.connect() as conn:
+            rows = conn.execute(ROUTE_CONNECTIONS_SQL, {"route_id": route_id}).fetchall()
+        self.replace_route(route_id, rows)
+
+    def replace_route(self, route_id, rows):
+        """Swap the connections of ``route_id`` for CONNECTIONS_SQL ``rows``."""
+        with self._lock:
+            kept = [c for c in self._timetable[1] if c.route_id != route_id]
+            for row in rows:
+                bisect.insort(kept, to_connection(row))
+            self._swap(kept, presorted=True)
+
+    def _swap(self, connections, presorted=False):
+        connections = list(connections) if presorted else sorted(connections)
+        self._timetable = ([c.departure_ms for c in connections], connections)
+        self.generation += 1
+
+    def plan(self, src_ids, dst_ids, travel_date, after_ms=0, transport_types=None,
+             max_transfers=None, min_connection_ms=None):
+        """Earliest-arriving journeys from any of ``src_ids`` to any of ``dst_ids``.
+
+        Returns at most one journey per number of transfers, fewest
+        transfers first, dropping journeys that arrive no earlier than one
+        with fewer transfers. Each journey is a list of
+        ``(Connection, leg_date)`` pairs.
+        """
+        max_transfers = self.max_transfers if max_transfers is None else max_transfers
+        min_connection_ms = self.min_connection_ms if min_connection_ms is None else min_connection_ms
+        sources, targets = set(src_ids), set(dst_ids)
+        types = set(transport_types) if transport_types else None
+        departures, connections = self._timetable
+        legs = max_transfers + 1
+
+        # reached[k][station] = (arrival, connection, day, previous entry) using k + 1 legs
+        reached = [{} for _ in range(legs)]
+        # Earliest arrival at a target with at most k transfers; a later arrival with
+        # k or more transfers is dominated, and nothing departing after bound[0] can win
+        bound = [float('inf')] * legs
+        # Stations a further leg can start from
+        boardable = set(sources)
+
+        for day in range(HORIZON_DAYS):
+            service_date = travel_date + timedelta(days=day)
+            weekday, service_day = day_bit(service_date), service_date.isoformat()
+            offset = day * DAY_MS
+            start = bisect.bisect_left(departures, after_ms - offset) if offset < after_ms else 0
+            for index in range(start, len(connections)):
+                c = connections[index]
+                departure = offset + c.departure_ms
+                if departure >= bound[0]:
+                    break
+                if c.source_id not in boardable or c.destination_id in sources:
+                    continue
+                runs = c.exceptions.get(service_day) if c.exceptions else None
+                if runs is False or (runs is None and not c.days & weekday):
+                    continue
+                if types is not None and c.transport_type not in types:
+                    continue
+                arrival = offset + c.arrival_ms
+                for k in range(legs):
+                    if arrival >= bound[k]:
+                        continue
+                    if k == 0:
+                        if c.source_id not in sources:
+                            continue
+                        previous = None
+                    else:
+                        previous = reached[k - 1].get(c.source_id)
+                        if previous is None or previous[0] + min_connection_ms > departure:
+                            continue
+                    best = reached[k].get(c.destination_id)
+                    if best is None or arrival < best[0]:
+                        reached[k][c.destination_id] = (arrival, c, day, previous)
+                        if k < max_transfers:
+                            boardable.add(c.destination_id)
+                        if c.destination_id in targets:
+                            for j in range(k, legs):
+                                bound[j] = min(bound[j], arrival)
+            else:
+                continue
+            break
+
+        journeys, earliest = [], float('inf')
+        for k in range(legs):
+            arrivals = [reached[k][t] for t in targets if t in reached[k]]
+            if not arrivals:
+                continue
+            entry = min(arrivals, key=lambda e: e[0])
+            if entry[0] >= earliest:
+                continue
+            earliest = entry[0]
+            journey = []
+            while entry is not None:
+                journey.append((entry[1], travel_date + timedelta(days=entry[2])))
+                entry = entry[3]
+            journeys.append(journey[::-1])
+        return journeys
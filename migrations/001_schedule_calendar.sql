@@ -0,0 +1,22 @@
+-- Schedule operating calendar (see schedule_calendar.py)
+--
+-- days_mask: days_of_week parsed into a 7-bit weekday mask, bit 0 = Monday
+-- (127 = daily). It is written by the admin API together with days_of_week;
+-- fill it for existing rows afterwards with:
+--     python schedule_calendar.py --backfill
+
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS days_mask SMALLINT
+    CHECK (days_mask BETWEEN 1 AND 127);
+
+-- One-off changes: runs = FALSE cancels a normally running day,
+-- runs = TRUE adds a day outside days_mask
+CREATE TABLE IF NOT EXISTS schedule_exceptions (
+    schedule_id INTEGER NOT NULL REFERENCES schedules(schedule_id) ON DELETE CASCADE,
+    service_date DATE NOT NULL,
+    runs BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (schedule_id, service_date)
+);
+
+-- Next-departure and timetable lookups read the mask straight from the index
+CREATE INDEX IF NOT EXISTS idx_schedules_route_departure
+    ON schedules (route_id, departure_time) INCLUDE (days_mask);
@@ -0,0 +1,125 @@
+-- Admin dashboard KPIs (see admin_metrics.py)
+--
+-- admin_counters holds one row per KPI. The table counts are kept current by
+-- the triggers below, so a dashboard load reads a few primary-key rows
+-- instead of counting whole tables. weekly_active and the
+-- admin_top_routes view depend on the clock and on cross-table aggregates;
+-- admin_metrics.py recomputes them in the background every ADMIN_METRICS_REFRESH_SECONDS
+-- (or run `python admin_metrics.py --refresh` from cron). After bulk edits
+-- that bypass the triggers (TRUNCATE, restores) recount with:
+--     python admin_metrics.py --rebuild
+
+CREATE TABLE IF NOT EXISTS admin_counters (
+    name TEXT PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO admin_counters (name, value) VALUES
+    ('total_users', (SELECT COUNT(*) FROM users)),
+    ('active_users', (SELECT COUNT(*) FROM users WHERE is_active = TRUE)),
+    ('weekly_active', (SELECT COUNT(*) FROM users WHERE last_login >= NOW() - INTERVAL '7 days')),
+    ('total_schedules', (SELECT COUNT(*) FROM schedules)),
+    ('total_routes', (SELECT COUNT(*) FROM routes)),
+    ('total_bookmarks', (SELECT COUNT(*) FROM bookmarks))
+ON CONFLICT (name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION admin_counter_add(counter TEXT, delta BIGINT) RETURNS VOID AS $$
+    UPDATE admin_counters SET value = value + delta, updated_at = NOW()
+    WHERE name = counter AND delta <> 0;
+$$ LANGUAGE sql;
+
+-- TG_ARGV[0] names the counter; one trigger per event so each sees its transition table
+CREATE OR REPLACE FUNCTION admin_count_rows() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM admin_counter_add(TG_ARGV[0], (SELECT COUNT(*) FROM new_rows));
+    ELSE
+        PERFORM admin_counter_add(TG_ARGV[0], -(SELECT COUNT(*) FROM old_rows));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION admin_count_active_users() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM admin_counter_add('active_users', (SELECT COUNT(*) FROM new_rows WHERE is_active));
+    ELSE
+        PERFORM admin_counter_add('active_users', -(SELECT COUNT(*) FROM old_rows WHERE is_active));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- One net delta per flipped row. Postgres allows no transition tables on an
+-- UPDATE OF trigger, so this one is row-level; its column list and WHEN keep
+-- the last_login write on every sign-in from firing it at all.
+CREATE OR REPLACE FUNCTION admin_flip_active_users() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM admin_counter_add('active_users',
+        CASE WHEN NEW.is_active THEN 1 ELSE 0 END - CASE WHEN OLD.is_active THEN 1 ELSE 0 END);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS admin_count_users_insert ON users;
+CREATE TRIGGER admin_count_users_insert AFTER INSERT ON users
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION admin_count_rows('total_users');
+DROP TRIGGER IF EXISTS admin_count_users_delete ON users;
+CREATE TRIGGER admin_count_users_delete AFTER DELETE ON users
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION admin_count_rows('total_users');
+DROP TRIGGER IF EXISTS admin_count_active_users_insert ON users;
+CREATE TRIGGER admin_count_active_users_insert AFTER INSERT ON users
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION admin_count_active_users();
+DROP TRIGGER IF EXISTS admin_count_active_users_update ON users;
+CREATE TRIGGER admin_count_active_users_update AFTER UPDATE OF is_active ON users
+    FOR EACH ROW WHEN (OLD.is_active IS DISTINCT FROM NEW.is_active) EXECUTE FUNCTION admin_flip_active_users();
+DROP TRIGGER IF EXISTS admin_count_active_users_delete ON users;
+CREATE TRIGGER admin_count_active_users_delete AFTER DELETE ON users
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION admin_count_active_users();
+
+DROP TRIGGER IF EXISTS admin_count_schedules_insert ON schedules;
+CREATE TRIGGER admin_count_schedules_insert AFTER INSERT ON schedules
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION admin_count_rows('total_schedules');
+DROP TRIGGER IF EXISTS admin_count_schedules_delete ON schedules;
+CREATE TRIGGER admin_count_schedules_delete AFTER DELETE ON schedules
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION admin_count_rows('total_schedules');
+
+DROP TRIGGER IF EXISTS admin_count_routes_insert ON routes;
+CREATE TRIGGER admin_count_routes_insert AFTER INSERT ON routes
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION admin_count_rows('total_routes');
+DROP TRIGGER IF EXISTS admin_count_routes_delete ON routes;
+CREATE TRIGGER admin_count_routes_delete AFTER DELETE ON routes
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION admin_count_rows('total_routes');
+
+DROP TRIGGER IF EXISTS admin_count_bookmarks_insert ON bookmarks;
+CREATE TRIGGER admin_count_bookmarks_insert AFTER INSERT ON bookmarks
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION admin_count_rows('total_bookmarks');
+DROP TRIGGER IF EXISTS admin_count_bookmarks_delete ON bookmarks;
+CREATE TRIGGER admin_count_bookmarks_delete AFTER DELETE ON bookmarks
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION admin_count_rows('total_bookmarks');
+
+-- Top routes by schedules and open seats, refreshed with the other periodic figures
+CREATE MATERIALIZED VIEW IF NOT EXISTS admin_top_routes AS
+    SELECT
+        r.route_id,
+        src.station_name AS source,
+        dst.station_name AS destination,
+        r.transport_type,
+        COUNT(DISTINCT s.schedule_id) AS schedule_count,
+        COALESCE(SUM(a.seats_total - COALESCE(a.seats_booked, 0)), 0) AS seats_available
+    FROM routes r
+    JOIN stations src ON r.source_station_id = src.station_id
+    JOIN stations dst ON r.destination_station_id = dst.station_id
+    LEFT JOIN schedules s ON s.route_id = r.route_id
+    LEFT JOIN availability a ON a.schedule_id = s.schedule_id AND a.travel_date >= CURRENT_DATE
+    GROUP BY r.route_id, src.station_name, dst.station_name, r.transport_type;
+
+-- Needed for REFRESH ... CONCURRENTLY; the second index serves the dashboard's ORDER BY ... LIMIT
+CREATE UNIQUE INDEX IF NOT EXISTS idx_admin_top_routes_route ON admin_top_routes (route_id);
+CREATE INDEX IF NOT EXISTS idx_admin_top_routes_rank
+    ON admin_top_routes (schedule_count DESC, seats_available DESC);
+
+-- Recent sign-ups panel
+CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at DESC);
@@ -0,0 +1,79 @@
+-- Route demand rollup (see route_demand.py)
+--
+-- One row per route pair, transport type and UTC hour. searches is added to
+-- in batches by the enquiry apps; bookmarks by the trigger below. The admin
+-- top-routes panel now ranks routes by this demand.
+
+CREATE TABLE IF NOT EXISTS route_demand_hourly (
+    hour TIMESTAMPTZ NOT NULL,
+    source_station_id INTEGER NOT NULL,
+    destination_station_id INTEGER NOT NULL,
+    transport_type TEXT NOT NULL,
+    searches INTEGER NOT NULL DEFAULT 0,
+    bookmarks INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hour, source_station_id, destination_station_id, transport_type)
+);
+
+CREATE OR REPLACE FUNCTION route_demand_count_bookmarks() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO route_demand_hourly (hour, source_station_id, destination_station_id, transport_type, bookmarks)
+    SELECT date_trunc('hour', NOW()), r.source_station_id, r.destination_station_id, LOWER(r.transport_type), COUNT(*)
+    FROM new_rows b
+    JOIN schedules s ON s.schedule_id = b.schedule_id
+    JOIN routes r ON r.route_id = s.route_id
+    GROUP BY r.source_station_id, r.destination_station_id, LOWER(r.transport_type)
+    ON CONFLICT (hour, source_station_id, destination_station_id, transport_type)
+    DO UPDATE SET bookmarks = route_demand_hourly.bookmarks + EXCLUDED.bookmarks;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS route_demand_bookmarks_insert ON bookmarks;
+CREATE TRIGGER route_demand_bookmarks_insert AFTER INSERT ON bookmarks
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION route_demand_count_bookmarks();
+
+-- Bookmarks saved before the rollup existed, in the hour they were saved
+INSERT INTO route_demand_hourly (hour, source_station_id, destination_station_id, transport_type, bookmarks)
+SELECT date_trunc('hour', COALESCE(b.saved_on, NOW())), r.source_station_id, r.destination_station_id,
+       LOWER(r.transport_type), COUNT(*)
+FROM bookmarks b
+JOIN schedules s ON s.schedule_id = b.schedule_id
+JOIN routes r ON r.route_id = s.route_id
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (hour, source_station_id, destination_station_id, transport_type) DO NOTHING;
+
+-- Top routes: last 7 days of demand, with schedules and open seats as load figures
+DROP MATERIALIZED VIEW IF EXISTS admin_top_routes;
+CREATE MATERIALIZED VIEW admin_top_routes AS
+    SELECT
+        r.route_id,
+        src.station_name AS source,
+        dst.station_name AS destination,
+        r.transport_type,
+        COALESCE(d.searches, 0) AS searches,
+        COALESCE(d.bookmarks, 0) AS bookmarks,
+        COALESCE(l.schedule_count, 0) AS schedule_count,
+        COALESCE(l.seats_available, 0) AS seats_available
+    FROM routes r
+    JOIN stations src ON r.source_station_id = src.station_id
+    JOIN stations dst ON r.destination_station_id = dst.station_id
+    LEFT JOIN (
+        SELECT source_station_id, destination_station_id, transport_type,
+               SUM(searches) AS searches, SUM(bookmarks) AS bookmarks
+        FROM route_demand_hourly
+        WHERE hour >= date_trunc('hour', NOW()) - INTERVAL '7 days'
+        GROUP BY source_station_id, destination_station_id, transport_type
+    ) d ON d.source_station_id = r.source_station_id
+       AND d.destination_station_id = r.destination_station_id
+       AND d.transport_type = LOWER(r.transport_type)
+    LEFT JOIN (
+        SELECT s.route_id, COUNT(DISTINCT s.schedule_id) AS schedule_count,
+               SUM(a.seats_total - COALESCE(a.seats_booked, 0)) AS seats_available
+        FROM schedules s
+        LEFT JOIN availability a ON a.schedule_id = s.schedule_id AND a.travel_date >= CURRENT_DATE
+        GROUP BY s.route_id
+    ) l ON l.route_id = r.route_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_admin_top_routes_route ON admin_top_routes (route_id);
+CREATE INDEX IF NOT EXISTS idx_admin_top_routes_rank
+    ON admin_top_routes (searches DESC, bookmarks DESC, schedule_count DESC, seats_available DESC);
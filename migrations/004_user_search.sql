@@ -0,0 +1,22 @@
+-- Indexed admin user search (GET /api/admin/users)
+--
+-- The search box matches a substring of "email first_name last_name". A
+-- trigram GIN index on that expression serves LIKE '%term%' for terms of
+-- three or more characters, and the list is keyset-paginated on
+-- (created_at, user_id). app.py must use the exact same expression for
+-- the index to apply.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_users_search_trgm ON users USING gin (
+    LOWER(COALESCE(email, '') || ' ' || COALESCE(first_name, '') || ' ' || COALESCE(last_name, '')) gin_trgm_ops
+);
+
+-- Keyset pagination needs a total order; registration always sets created_at,
+-- so rows without one predate it and are dated by their last login
+UPDATE users SET created_at = COALESCE(last_login, CURRENT_TIMESTAMP) WHERE created_at IS NULL;
+ALTER TABLE users ALTER COLUMN created_at SET NOT NULL;
+
+-- Replaces the created_at index from 002; also serves the recent sign-ups panel
+CREATE INDEX IF NOT EXISTS idx_users_created_keyset ON users (created_at DESC, user_id DESC);
+DROP INDEX IF EXISTS idx_users_created_at;
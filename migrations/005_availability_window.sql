@@ -0,0 +1,14 @@
+-- Rolling seat inventory (see availability_generator.py)
+--
+-- availability_generator.py keeps one row per schedule and running day for
+-- the next AVAILABILITY_WINDOW_DAYS with INSERT ... ON CONFLICT DO NOTHING,
+-- which needs (schedule_id, travel_date) to be unique. Earlier duplicates are
+-- collapsed first, keeping the row with the most seats booked.
+
+DELETE FROM availability a
+USING availability b
+WHERE a.schedule_id = b.schedule_id
+  AND a.travel_date = b.travel_date
+  AND (COALESCE(a.seats_booked, 0), b.availability_id) < (COALESCE(b.seats_booked, 0), a.availability_id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_availability_schedule_date ON availability (schedule_id, travel_date);
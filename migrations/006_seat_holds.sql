@@ -0,0 +1,23 @@
+-- Seat holds and bookings (see seat_booking.py)
+--
+-- A hold takes its seats out of availability.seats_booked at once, with a
+-- conditional UPDATE that never oversells, and lasts until expires_at.
+-- Confirming it turns it into a booking; releasing it, or the sweeper
+-- expiring it, gives the seats back. Needs the unique
+-- (schedule_id, travel_date) index from 005_availability_window.sql.
+
+CREATE TABLE IF NOT EXISTS seat_holds (
+    hold_id BIGSERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    schedule_id INTEGER NOT NULL REFERENCES schedules(schedule_id) ON DELETE CASCADE,
+    travel_date DATE NOT NULL,
+    seats INTEGER NOT NULL CHECK (seats > 0),
+    status TEXT NOT NULL DEFAULT 'held' CHECK (status IN ('held', 'booked', 'released', 'expired')),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ,
+    booked_at TIMESTAMPTZ
+);
+
+-- The sweeper scans only live holds, oldest expiry first
+CREATE INDEX IF NOT EXISTS idx_seat_holds_expiry ON seat_holds (expires_at) WHERE status = 'held';
+CREATE INDEX IF NOT EXISTS idx_seat_holds_user ON seat_holds (user_id, created_at DESC);
@@ -0,0 +1,90 @@
+"""Registry of the fixed enquiry queries, prepared server-side per connection.
+
+Each query is defined once with bind parameters only, so its text never
+changes between requests. Once installed on a psycopg2 engine, every new
+connection runs ``PREPARE`` for all registered queries and executions of a
+registered statement are rewritten to ``EXECUTE name(...)``: Postgres parses
+and plans each query once per connection instead of once per request.
+
+Nothing changes for callers, who keep executing the TextClause returned by
+:meth:`QueryRegistry.define`. Installation is skipped behind PgBouncer in
+transaction mode (a prepared statement would land on another server
+connection) and for asyncpg, which already prepares and caches statements
+per connection on its own.
+"""
+import logging
+import re
+
+from sqlalchemy import event, text
+
+logger = logging.getLogger(__name__)
+
+_BIND = re.compile(r"%\((\w+)\)s")
+
+
+class QueryRegistry:
+    """Named, bind-parameter-only queries that can be prepared per connection."""
+
+    def __init__(self, prefix="q_"):
+        self.prefix = prefix
+        self._queries = {}
+
+    def define(self, name, sql, columns=None):
+        """Register ``sql`` under ``name`` and return its TextClause."""
+        if name in self._queries:
+            raise ValueError(f"Query {name!r} is already registered")
+        clause = text(sql)
+        if columns:
+            clause = clause.columns(**columns)
+        self._queries[name] = clause
+        return clause
+
+    def names(self):
+        return list(self._queries)
+
+    def _compile(self, dialect):
+        """``(prepare_sql, compiled_statement, execute_sql)`` for every query."""
+        compiled = []
+        for name, clause in self._queries.items():
+            statement = str(clause.compile(dialect=dialect))
+            params = list(dict.fromkeys(_BIND.findall(statement)))
+            positions = {param: f"${index}" for index, param in enumerate(params, start=1)}
+            body = _BIND.sub(lambda match: positions[match.group(1)], statement).replace("%%", "%")
+            prepared_name = f"{self.prefix}{name}"
+            compiled.append((
+                f"PREPARE {prepared_name} AS {body.strip().rstrip(';')}",
+                statement,
+                f"EXECUTE {prepared_name}({', '.join(f'%({param})s' for param in params)})"
+            ))
+        return compiled
+
+    def install(self, engine):
+        """Prepare every query on each new connection of a psycopg2 engine.
+
+        Returns True when statements will be prepared.
+        """
+        settings = getattr(engine, "pool_settings", {})
+        if engine.dialect.driver != "psycopg2" or settings.get("pgbouncer") or not settings.get("prepared_statements", True):
+            return False
+
+        compiled = self._compile(engine.dialect)
+        rewrites = {statement: execute_sql for _, statement, execute_sql in compiled}
+
+        @event.listens_for(engine, "connect")
+        def _prepare(dbapi_conn, record):
+            cursor = dbapi_conn.cursor()
+            try:
+                for prepare_sql, _, _ in compiled:
+                    cursor.execute(prepare_sql)
+                dbapi_conn.commit()
+            finally:
+                cursor.close()
+
+        @event.listens_for(engine, "before_cursor_execute", retval=True)
+        def _use_prepared(conn, cursor, statement, parameters, context, executemany):
+            if not executemany:
+                statement = rewrites.get(statement, statement)
+            return statement, parameters
+
+        logger.info(f"Preparing {len(compiled)} enquiry queries per connection")
+        return True
@@ -0,0 +1,123 @@
+"""Search demand events and their hourly rollup.
+
+Every route search appends one tiny ``(hour, source_station_id,
+destination_station_id, transport_type)`` event per route pair it served
+to an in-memory ring buffer, with no database work on the request path.
+The buffer is drained in batches, collapsed to one count per route pair
+and hour, and upserted into ``route_demand_hourly``
+(``migrations/003_route_demand.sql``) with a single statement, so the
+admin dashboard can rank routes by real demand without raw logs.
+
+If flushes fall behind, the ring buffer drops its oldest events rather
+than growing; a failed flush puts its counts back for the next one.
+"""
+import logging
+import threading
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SQL = text("""
+    INSERT INTO route_demand_hourly (hour, source_station_id, destination_station_id, transport_type, searches)
+    SELECT * FROM unnest(
+        CAST(:hours AS TIMESTAMPTZ[]), CAST(:src_ids AS INTEGER[]), CAST(:dst_ids AS INTEGER[]),
+        CAST(:types AS TEXT[]), CAST(:searches AS INTEGER[])
+    )
+    ON CONFLICT (hour, source_station_id, destination_station_id, transport_type)
+    DO UPDATE SET searches = route_demand_hourly.searches + EXCLUDED.searches
+""")
+
+
+def current_hour():
+    """The current UTC hour, the rollup's time bucket."""
+    return datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def flush_params(counts):
+    """FLUSH_SQL bind parameters for drained ``{(hour, src, dst, type): searches}`` counts."""
+    keys = sorted(counts)
+    return {
+        "hours": [key[0] for key in keys],
+        "src_ids": [key[1] for key in keys],
+        "dst_ids": [key[2] for key in keys],
+        "types": [key[3] for key in keys],
+        "searches": [counts[key] for key in keys]
+    }
+
+
+class SearchEvents:
+    """Bounded buffer of search events, flushed in batches.
+
+    With ``on_flush`` a daemon thread, started by the first event, calls it
+    every ``flush_seconds`` or as soon as ``flush_size`` events are waiting;
+    otherwise the owner drains the buffer itself.
+    """
+
+    def __init__(self, capacity=10000, flush_size=500, flush_seconds=30, on_flush=None):
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self.on_flush = on_flush
+        self._events = deque(maxlen=capacity)
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed = 0
+
+    def record(self, keys):
+        """Count one search for each ``(src, dst, type)`` timetable key."""
+        hour = current_hour()
+        with self._lock:
+            for key in keys:
+                if len(self._events) == self._events.maxlen:
+                    self.dropped += 1
+                self._events.append((hour, *key))
+                self.recorded += 1
+            waiting = len(self._events)
+        if self.on_flush is not None:
+            if self._thread is None:
+                self._start()
+            if waiting >= self.flush_size:
+                self._wake.set()
+
+    def drain(self):
+        """Take every waiting event as ``{(hour, src, dst, type): searches}``."""
+        with self._lock:
+            events, self._events = self._events, deque(maxlen=self._events.maxlen)
+            counts, self._pending = self._pending, Counter()
+        counts.update(events)
+        return counts
+
+    def requeue(self, counts):
+        """Put back the counts of a failed flush."""
+        with self._lock:
+            self._pending.update(counts)
+
+    def mark_flushed(self, counts):
+        self.flushed += sum(counts.values())
+
+    def stats(self):
+        with self._lock:
+            waiting = len(self._events) + sum(self._pending.values())
+        return {"recorded": self.recorded, "flushed": self.flushed, "dropped": self.dropped, "waiting": waiting}
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="search-events", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.on_flush()
+            except Exception as e:
+                logger.error(f"Search event flush error: {e}")
@@ -0,0 +1,107 @@
+"""Schedule operating calendar.
+
+``schedules.days_of_week`` is free text ("Daily", "Mon-Fri", "Sat,Sun").
+It is parsed once, when the schedule is written, into ``days_mask``: a
+7-bit weekday mask (bit 0 = Monday) that the enquiry queries and the
+cached timetable test with a single AND. One-off changes live in
+``schedule_exceptions`` as ``(schedule_id, service_date, runs)`` rows: a
+cancellation on a day the mask says it runs, or an extra day it does not.
+
+Existing rows are backfilled after applying
+``migrations/001_schedule_calendar.sql`` with::
+
+    python schedule_calendar.py --backfill
+"""
+import argparse
+import logging
+import re
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+ALL_DAYS = (1 << len(WEEKDAYS)) - 1
+_DAY_NAMES = {
+    'daily': ALL_DAYS, 'everyday': ALL_DAYS, 'all': ALL_DAYS,
+    'weekdays': 0b0011111, 'weekends': 0b1100000, 'weekend': 0b1100000,
+}
+_DAY_SPLIT = re.compile(r'[\s,;/]+')
+
+
+def parse_days(value):
+    """Weekday bitmask for a ``days_of_week`` value, or None if it can't be read.
+
+    Accepts "Daily", "Weekdays", "Weekends", day lists such as "Mon,Wed,Fri"
+    and ranges such as "Mon-Fri" (full day names work too).
+    """
+    mask = 0
+    for part in _DAY_SPLIT.split(str(value or 'daily').strip().lower()):
+        if not part:
+            continue
+        if part in _DAY_NAMES:
+            mask |= _DAY_NAMES[part]
+            continue
+        first, _, last = part.partition('-')
+        if first[:3] not in WEEKDAYS or (last and last[:3] not in WEEKDAYS):
+            return None
+        start = WEEKDAYS.index(first[:3])
+        end = WEEKDAYS.index(last[:3]) if last else start
+        for offset in range((end - start) % len(WEEKDAYS) + 1):
+            mask |= 1 << ((start + offset) % len(WEEKDAYS))
+    return mask or None
+
+
+def day_bit(day):
+    """The ``days_mask`` bit for a date."""
+    return 1 << day.weekday()
+
+
+def runs_on(days_mask, exceptions, day):
+    """Whether a schedule runs on ``day``.
+
+    ``exceptions`` maps ISO dates to True (extra day) or False (cancelled);
+    a NULL mask (not yet backfilled) runs daily.
+    """
+    if exceptions:
+        runs = exceptions.get(day.isoformat())
+        if runs is not None:
+            return runs
+    return bool((ALL_DAYS if days_mask is None else days_mask) & day_bit(day))
+
+
+def backfill(engine):
+    """Fill ``days_mask`` for schedules written before the calendar existed.
+
+    Unreadable ``days_of_week`` values are logged and treated as daily.
+    Returns the number of schedules updated.
+    """
+    with engine.begin() as conn:
+        rows = conn.execute(text(
+            "SELECT schedule_id, days_of_week FROM schedules WHERE days_mask IS NULL"
+        )).fetchall()
+        updates = []
+        for schedule_id, days_of_week in rows:
+            mask = parse_days(days_of_week)
+            if mask is None:
+                logger.warning(f"Schedule {schedule_id}: unreadable days_of_week {days_of_week!r}, treating as daily")
+                mask = ALL_DAYS
+            updates.append({"schedule_id": schedule_id, "days_mask": mask})
+        if updates:
+            conn.execute(text(
+                "UPDATE schedules SET days_mask = :days_mask WHERE schedule_id = :schedule_id"
+            ), updates)
+    return len(updates)
+
+
+if __name__ == "__main__":
+    from database import create_db_engine
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Schedule calendar maintenance")
+    parser.add_argument("--backfill", action="store_true", help="parse days_of_week into days_mask for existing schedules")
+    args = parser.parse_args()
+    if args.backfill:
+        print(f"Backfilled days_mask for {backfill(create_db_engine())} schedules")
+    else:
+        parser.print_help()
@@ -0,0 +1,429 @@
+"""Bulk schedule and availability import.
+
+Admins load whole operator timetables from a CSV or Parquet file, one row
+per schedule run:
+
+    route_code | route_id | source, destination, transport_type
+    operator, departure_time, arrival_time, days_of_week (default Daily)
+    travel_date, seats_total (default 40), seats_booked (default 0)    optional
+
+The file is read in record batches with pyarrow, never whole. Each batch
+is validated column-wise with pandas against the same rules as
+``POST /api/admin/schedules``: ``parse_time_string``, ``parse_date_string``
+and ``parse_days`` are applied once per distinct value rather than once per
+row. Valid rows are streamed with ``COPY`` into a temporary staging table;
+once the file is read, routes are resolved in one pass (by code, id, or
+source and destination station names plus transport type) and the staged
+rows are merged into ``schedules`` and ``availability`` with a handful of
+set-based statements, all in one transaction.
+
+Rows with the same route, operator and departure time are one schedule.
+An existing schedule is updated rather than duplicated and its
+availability is replaced per travel date, so re-importing a file is safe.
+
+    python schedule_import.py timetable.csv [--dry-run]
+"""
+import argparse
+import io
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import text
+
+from enquiry import parse_date_string, parse_time_string
+from schedule_calendar import parse_days
+
+logger = logging.getLogger(__name__)
+
+INPUT_COLUMNS = (
+    'route_code', 'route_id', 'source', 'destination', 'transport_type', 'operator',
+    'departure_time', 'arrival_time', 'days_of_week', 'travel_date', 'seats_total', 'seats_booked'
+)
+STAGING_COLUMNS = (
+    'row_number', 'route_code', 'route_id', 'source', 'destination', 'transport_type', 'operator',
+    'departure_time', 'arrival_time', 'days_of_week', 'days_mask', 'travel_date', 'seats_total', 'seats_booked'
+)
+FORMATS = ('csv', 'parquet')
+TRANSPORT_TYPES = ('bus', 'train')
+DEFAULT_SEATS_TOTAL = 40
+DEFAULT_SEATS_BOOKED = 0
+_INTEGER = r'[+-]?\d+'
+
+STAGING_SQL = text("""
+    CREATE TEMP TABLE schedule_import_rows (
+        row_number INTEGER NOT NULL,
+        route_code TEXT,
+        route_id INTEGER,
+        source TEXT,
+        destination TEXT,
+        transport_type TEXT,
+        operator TEXT NOT NULL,
+        departure_time TIME NOT NULL,
+        arrival_time TIME NOT NULL,
+        days_of_week TEXT NOT NULL,
+        days_mask SMALLINT NOT NULL,
+        travel_date DATE,
+        seats_total INTEGER NOT NULL,
+        seats_booked INTEGER NOT NULL,
+        resolved_route_id INTEGER
+    ) ON COMMIT DROP
+""")
+
+COPY_SQL = f"COPY schedule_import_rows ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+# Station names match case-insensitively; a pair that names several routes is ambiguous and left unresolved
+RESOLVE_ROUTES_SQL = text("""
+    UPDATE schedule_import_rows st SET resolved_route_id = m.route_id
+    FROM (
+        SELECT st.row_number, MIN(r.route_id) AS route_id
+        FROM schedule_import_rows st
+        JOIN routes r ON (
+            (st.route_code IS NOT NULL AND r.route_code = st.route_code)
+            OR (st.route_code IS NULL AND r.route_id = st.route_id)
+        )
+        GROUP BY st.row_number
+        UNION ALL
+        SELECT st.row_number, MIN(r.route_id)
+        FROM schedule_import_rows st
+        JOIN stations src ON LOWER(src.station_name) = LOWER(st.source)
+        JOIN stations dst ON LOWER(dst.station_name) = LOWER(st.destination)
+        JOIN routes r ON r.source_station_id = src.station_id
+                     AND r.destination_station_id = dst.station_id
+                     AND LOWER(r.transport_type) = st.transport_type
+        WHERE st.route_code IS NULL AND st.route_id IS NULL
+        GROUP BY st.row_number
+        HAVING COUNT(DISTINCT r.route_id) = 1
+    ) m
+    WHERE st.row_number = m.row_number
+""")
+
+UNRESOLVED_SQL = text("""
+    SELECT row_number, route_code, route_id, source, destination, transport_type
+    FROM schedule_import_rows WHERE resolved_route_id IS NULL
+    ORDER BY row_number
+""")
+
+# One row per schedule: the last row in the file wins for arrival time and days
+SCHEDULE_KEYS_SQL = text("""
+    CREATE TEMP TABLE schedule_import_schedules ON COMMIT DROP AS
+    SELECT DISTINCT ON (resolved_route_id, operator, departure_time)
+        resolved_route_id AS route_id, operator, departure_time, arrival_time, days_of_week, days_mask,
+        (SELECT MIN(s.schedule_id) FROM schedules s
+         WHERE s.route_id = st.resolved_route_id AND s.operator = st.operator
+           AND s.departure_time = st.departure_time) AS schedule_id
+    FROM schedule_import_rows st
+    WHERE resolved_route_id IS NOT NULL
+    ORDER BY resolved_route_id, operator, departure_time, row_number DESC
+""")
+
+UPDATE_SCHEDULES_SQL = text("""
+    UPDATE schedules s
+    SET arrival_time = k.arrival_time, days_of_week = k.days_of_week, days_mask = k.days_mask
+    FROM schedule_import_schedules k
+    WHERE s.schedule_id = k.schedule_id
+      AND (s.arrival_time, s.days_of_week, s.days_mask) IS DISTINCT FROM (k.arrival_time, k.days_of_week, k.days_mask)
+""")
+
+INSERT_SCHEDULES_SQL = text("""
+    WITH inserted AS (
+        INSERT INTO schedules (route_id, operator, departure_time, arrival_time, days_of_week, days_mask)
+        SELECT route_id, operator, departure_time, arrival_time, days_of_week, days_mask
+        FROM schedule_import_schedules WHERE schedule_id IS NULL
+        RETURNING schedule_id, route_id, operator, departure_time
+    )
+    UPDATE schedule_import_schedules k SET schedule_id = i.schedule_id
+    FROM inserted i
+    WHERE k.route_id = i.route_id AND k.operator = i.operator AND k.departure_time = i.departure_time
+""")
+
+# One row per schedule and travel date: the last row in the file wins
+AVAILABILITY_ROWS_SQL = text("""
+    CREATE TEMP TABLE schedule_import_availability ON COMMIT DROP AS
+    SELECT DISTINCT ON (k.schedule_id, st.travel_date)
+        k.schedule_id, st.travel_date, st.seats_total, st.seats_booked
+    FROM schedule_import_rows st
+    JOIN schedule_import_schedules k ON k.route_id = st.resolved_route_id
+        AND k.operator = st.operator AND k.departure_time = st.departure_time
+    WHERE st.travel_date IS NOT NULL
+    ORDER BY k.schedule_id, st.travel_date, st.row_number DESC
+""")
+
+UPDATE_AVAILABILITY_SQL = text("""
+    UPDATE availability a SET seats_total = n.seats_total, seats_booked = n.seats_booked
+    FROM schedule_import_availability n
+    WHERE a.schedule_id = n.schedule_id AND a.travel_date = n.travel_date
+      AND (a.seats_total, a.seats_booked) IS DISTINCT FROM (n.seats_total, n.seats_booked)
+""")
+
+INSERT_AVAILABILITY_SQL = text("""
+    INSERT INTO availability (schedule_id, travel_date, seats_total, seats_booked)
+    SELECT n.schedule_id, n.travel_date, n.seats_total, n.seats_booked
+    FROM schedule_import_availability n
+    WHERE NOT EXISTS (
+        SELECT 1 FROM availability a WHERE a.schedule_id = n.schedule_id AND a.travel_date = n.travel_date
+    )
+""")
+
+IMPORTED_SCHEDULES_SQL = text("SELECT schedule_id FROM schedule_import_schedules ORDER BY schedule_id")
+
+AFFECTED_ROUTES_SQL = text("""
+    SELECT DISTINCT r.route_id, r.source_station_id, r.destination_station_id, r.transport_type
+    FROM schedule_import_schedules k JOIN routes r ON r.route_id = k.route_id
+    ORDER BY r.route_id
+""")
+
+
+def detect_format(filename, requested=None):
+    """'csv' or 'parquet' from an explicit format or the file extension, else None."""
+    fmt = (requested or '').strip().lower() or os.path.splitext(filename or '')[1].lstrip('.').lower()
+    fmt = 'parquet' if fmt == 'pq' else fmt
+    return fmt if fmt in FORMATS else None
+
+
+def read_batches(source, fmt, batch_rows):
+    """Yield the file's record batches of about ``batch_rows`` rows, all columns as strings."""
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(source).iter_batches(batch_size=batch_rows)
+    else:
+        import pyarrow.csv as pcsv
+
+        batches = pcsv.open_csv(
+            source,
+            read_options=pcsv.ReadOptions(block_size=max(1 << 16, batch_rows * 128)),
+            convert_options=pcsv.ConvertOptions(column_types={name: pa.string() for name in INPUT_COLUMNS})
+        )
+    for batch in batches:
+        yield _as_strings(batch)
+
+
+def _as_strings(batch):
+    columns = {}
+    for name, column in zip(batch.schema.names, batch.columns):
+        name = name.strip().lower()
+        if pa.types.is_time(column.type):
+            # time64 casts to "HH:MM:SS.ffffff"; keep the seconds the parsers accept
+            column = pc.utf8_slice_codeunits(column.cast(pa.string()), 0, 8)
+        elif not pa.types.is_string(column.type):
+            column = column.cast(pa.string())
+        columns[name] = column
+    return pa.table(columns).to_pandas(types_mapper={pa.string(): pd.StringDtype()}.get)
+
+
+def _parse_distinct(values, parser):
+    """Apply a scalar parser once per distinct value; unparsable values become None."""
+    distinct = values.dropna().unique()
+    return values.map(dict(zip(distinct, (parser(value) for value in distinct))), na_action='ignore')
+
+
+def validate_batch(frame, first_row):
+    """Split a batch into staging rows and ``{"row", "error"}`` reports.
+
+    ``first_row`` is the file row number (1-based, header excluded) of the
+    batch's first record. Rules and messages follow ``admin_create_schedule``.
+    """
+    frame = frame.reindex(columns=INPUT_COLUMNS).astype('string')
+    frame = frame.apply(lambda column: column.str.strip()).replace('', pd.NA)
+    rows = pd.Series(np.arange(first_row, first_row + len(frame)), index=frame.index)
+
+    route_code = frame['route_code'].str.upper()
+    transport_type = frame['transport_type'].str.lower()
+    route_id_ok = frame['route_id'].str.fullmatch(_INTEGER).fillna(False).astype(bool)
+    route_id = pd.to_numeric(frame['route_id'].where(route_id_ok), errors='coerce').astype('Int64')
+    has_names = frame['source'].notna() & frame['destination'].notna()
+
+    days_of_week = frame['days_of_week'].fillna('Daily')
+    days_mask = _parse_distinct(days_of_week, parse_days).astype('Int64')
+    departure_time = _parse_distinct(frame['departure_time'], parse_time_string)
+    arrival_time = _parse_distinct(frame['arrival_time'], parse_time_string)
+    travel_date = _parse_distinct(frame['travel_date'], parse_date_string)
+
+    seats = {}
+    seats_ok = {}
+    for name, default in (('seats_total', DEFAULT_SEATS_TOTAL), ('seats_booked', DEFAULT_SEATS_BOOKED)):
+        given = frame[name]
+        seats_ok[name] = (given.isna() | given.str.fullmatch(_INTEGER).fillna(False)).astype(bool)
+        seats[name] = pd.to_numeric(given.where(seats_ok[name]), errors='coerce').fillna(default).astype('Int64')
+
+    # First failing rule per row, in the order admin_create_schedule checks them
+    rules = [
+        (route_code.isna() & frame['route_id'].isna() & ~(has_names & transport_type.notna()),
+         "route_code, route_id or source, destination and transport_type is required"),
+        (frame['route_id'].notna() & ~route_id_ok, "route_id must be an integer"),
+        (route_code.isna() & route_id.notna() & (route_id <= 0).fillna(False), "Valid route_id required"),
+        (transport_type.notna() & ~transport_type.isin(TRANSPORT_TYPES), "transport_type must be 'bus' or 'train'"),
+        (frame['operator'].isna(), "operator is required"),
+        (days_mask.isna(), "days_of_week must be Daily, Weekdays, Weekends or days like Mon,Wed,Fri or Mon-Fri"),
+        (departure_time.isna() | arrival_time.isna(), "departure_time and arrival_time must be HH:MM format"),
+        (frame['travel_date'].notna() & travel_date.isna(), "travel_date must be YYYY-MM-DD format"),
+        (~seats_ok['seats_total'], "seats_total must be an integer"),
+        (~seats_ok['seats_booked'], "seats_booked must be an integer"),
+        ((seats['seats_total'] < 0) | (seats['seats_booked'] < 0), "Seat counts must be non-negative"),
+        (seats['seats_booked'] > seats['seats_total'], "seats_booked cannot exceed seats_total"),
+    ]
+    failed = np.select([mask.fillna(False).to_numpy(dtype=bool) for mask, _ in rules],
+                       [message for _, message in rules], default='')
+    invalid = failed != ''
+    errors = [{"row": int(row), "error": message} for row, message in zip(rows[invalid], failed[invalid])]
+
+    valid = ~invalid
+    staged = pd.DataFrame({
+        'row_number': rows,
+        'route_code': route_code,
+        'route_id': route_id.where(route_code.isna()),
+        'source': frame['source'],
+        'destination': frame['destination'],
+        'transport_type': transport_type,
+        'operator': frame['operator'],
+        'departure_time': departure_time,
+        'arrival_time': arrival_time,
+        'days_of_week': days_of_week,
+        'days_mask': days_mask,
+        'travel_date': travel_date,
+        'seats_total': seats['seats_total'],
+        'seats_booked': seats['seats_booked'],
+    })[valid]
+    return staged, errors
+
+
+def copy_rows(conn, staged):
+    """COPY validated rows into the staging table over the connection's psycopg2 cursor."""
+    buffer = io.StringIO()
+    staged.to_csv(buffer, header=False, index=False, columns=list(STAGING_COLUMNS))
+    buffer.seek(0)
+    with conn.connection.dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(COPY_SQL, buffer)
+
+
+class ScheduleImport:
+    """One import run; iterate :meth:`run` for progress events, ending with the report."""
+
+    def __init__(self, source, fmt, batch_rows=5000, max_errors=1000, dry_run=False):
+        self.source = source
+        self.fmt = fmt
+        self.batch_rows = batch_rows
+        self.max_errors = max_errors
+        self.dry_run = dry_run
+        self.schedule_ids = []
+        self.report = {
+            "rows_read": 0,
+            "rows_valid": 0,
+            "rows_rejected": 0,
+            "batches": 0,
+            "schedules_created": 0,
+            "schedules_updated": 0,
+            "availability_created": 0,
+            "availability_updated": 0,
+            "routes": [],
+            "dry_run": dry_run,
+            "errors": [],
+            "errors_truncated": False,
+        }
+
+    def _reject(self, errors):
+        self.report["rows_rejected"] += len(errors)
+        room = self.max_errors - len(self.report["errors"])
+        if len(errors) > room:
+            self.report["errors_truncated"] = True
+        self.report["errors"].extend(errors[:max(room, 0)])
+
+    def _progress(self, stage):
+        report = self.report
+        return {
+            "stage": stage,
+            "batches": report["batches"],
+            "rows_read": report["rows_read"],
+            "rows_valid": report["rows_valid"],
+            "rows_rejected": report["rows_rejected"],
+        }
+
+    def run(self, engine):
+        """Yield a progress event per batch and per merge step, then the final report.
+
+        ``report["routes"]`` lists the ``(route_id, source_station_id,
+        destination_station_id, transport_type)`` routes written and
+        ``schedule_ids`` the schedules, for cache invalidation and availability
+        generation once the transaction has committed.
+        """
+        report = self.report
+        with engine.connect() as conn:
+            transaction = conn.begin()
+            try:
+                conn.execute(STAGING_SQL)
+                next_row = 1
+                for frame in read_batches(self.source, self.fmt, self.batch_rows):
+                    staged, errors = validate_batch(frame, next_row)
+                    next_row += len(frame)
+                    if len(staged):
+                        copy_rows(conn, staged)
+                    report["batches"] += 1
+                    report["rows_read"] += len(frame)
+                    report["rows_valid"] += len(staged)
+                    self._reject(errors)
+                    yield self._progress("staged")
+
+                conn.execute(RESOLVE_ROUTES_SQL)
+                unresolved = conn.execute(UNRESOLVED_SQL).fetchall()
+                report["rows_valid"] -= len(unresolved)
+                self._reject([{"row": row[0], "error": "Route not found or ambiguous"} for row in unresolved])
+                yield self._progress("resolved")
+
+                conn.execute(SCHEDULE_KEYS_SQL)
+                report["schedules_updated"] = conn.execute(UPDATE_SCHEDULES_SQL).rowcount
+                report["schedules_created"] = conn.execute(INSERT_SCHEDULES_SQL).rowcount
+                conn.execute(AVAILABILITY_ROWS_SQL)
+                report["availability_updated"] = conn.execute(UPDATE_AVAILABILITY_SQL).rowcount
+                report["availability_created"] = conn.execute(INSERT_AVAILABILITY_SQL).rowcount
+                self.schedule_ids = conn.execute(IMPORTED_SCHEDULES_SQL).scalars().all()
+                report["routes"] = [tuple(row) for row in conn.execute(AFFECTED_ROUTES_SQL).fetchall()]
+            except Exception:
+                transaction.rollback()
+                raise
+            if self.dry_run:
+                transaction.rollback()
+            else:
+                transaction.commit()
+        report["errors"].sort(key=lambda error: error["row"])
+        yield dict(report, stage="done")
+
+
+def import_schedules(engine, source, fmt, **options):
+    """Run an import to completion and return its report."""
+    for event in ScheduleImport(source, fmt, **options).run(engine):
+        pass
+    return event
+
+
+if __name__ == "__main__":
+    from availability_generator import AvailabilityGenerator
+    from database import create_db_engine
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Bulk import schedules and availability from CSV or Parquet")
+    parser.add_argument("path", help="timetable file, one row per schedule run")
+    parser.add_argument("--format", choices=FORMATS, help="file format (default: from the extension)")
+    parser.add_argument("--batch-rows", type=int, default=5000, help="rows validated and copied per batch")
+    parser.add_argument("--max-errors", type=int, default=1000, help="row errors to report before truncating")
+    parser.add_argument("--dry-run", action="store_true", help="validate and merge, then roll back")
+    args = parser.parse_args()
+
+    fmt = detect_format(args.path, args.format)
+    if not fmt:
+        parser.error("cannot tell the file format, pass --format")
+    engine = create_db_engine()
+    job = ScheduleImport(args.path, fmt, batch_rows=args.batch_rows, max_errors=args.max_errors, dry_run=args.dry_run)
+    for event in job.run(engine):
+        if event["stage"] != "done":
+            logger.info(f"{event['stage']}: {event['rows_read']} rows read, {event['rows_valid']} valid, "
+                        f"{event['rows_rejected']} rejected")
+    event.pop("routes")
+    if not args.dry_run:
+        window_days = int(os.environ.get("AVAILABILITY_WINDOW_DAYS", 90))
+        event["availability_generated"] = AvailabilityGenerator(window_days=window_days).generate(engine, job.schedule_ids)
+    print(json.dumps(event, indent=2))
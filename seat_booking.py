@@ -0,0 +1,359 @@
+"""Seat holds and bookings.
+
+A hold takes seats out of ``availability`` at once and keeps them for
+``hold_seconds``; the user then confirms it into a booking or releases it,
+and holds left alone are expired by a sweeper that gives their seats back.
+Tables: ``seat_holds`` (``migrations/006_seat_holds.sql``).
+
+Every inventory change is a single statement in its own short transaction.
+Taking seats is one conditional ``UPDATE availability ... WHERE
+seats_total - seats_booked >= :seats RETURNING`` chained to the hold
+insert, so Postgres re-checks the condition against the latest row version
+when concurrent holds queue on a hot schedule: no seat is sold twice and no
+update is lost, and the row lock is held only for that one statement's
+commit, with no read-then-write round trip in between. The sweeper skips
+holds locked by a concurrent confirm or release and runs on one worker at a
+time.
+
+Contention benchmark against one schedule and date::
+
+    python seat_booking.py --benchmark --user-id 1 --schedule-id 7 --date 2025-01-31 --workers 32
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Serializes sweeps across workers (pg_try_advisory_xact_lock key)
+SWEEP_LOCK_KEY = 74610024
+
+HOLD_SQL = text("""
+    WITH seat AS (
+        UPDATE availability
+        SET seats_booked = COALESCE(seats_booked, 0) + :seats
+        WHERE schedule_id = :schedule_id AND travel_date = :travel_date
+          AND seats_total - COALESCE(seats_booked, 0) >= :seats
+        RETURNING schedule_id, travel_date, seats_total - seats_booked AS seats_available
+    )
+    INSERT INTO seat_holds (user_id, schedule_id, travel_date, seats, expires_at)
+    SELECT :user_id, schedule_id, travel_date, :seats, NOW() + make_interval(secs => :hold_seconds)
+    FROM seat
+    RETURNING hold_id, expires_at, (SELECT seats_available FROM seat)
+""")
+
+SEATS_LEFT_SQL = text("""
+    SELECT seats_total - COALESCE(seats_booked, 0) FROM availability
+    WHERE schedule_id = :schedule_id AND travel_date = :travel_date
+""")
+
+CONFIRM_SQL = text("""
+    UPDATE seat_holds SET status = 'booked', booked_at = NOW(), expires_at = NULL
+    WHERE hold_id = :hold_id AND user_id = :user_id AND status = 'held' AND expires_at > NOW()
+    RETURNING hold_id, schedule_id, travel_date, seats, status, expires_at, booked_at
+""")
+
+RELEASE_SQL = text("""
+    WITH released AS (
+        UPDATE seat_holds SET status = 'released', expires_at = NULL
+        WHERE hold_id = :hold_id AND user_id = :user_id AND status IN ('held', 'booked')
+        RETURNING schedule_id, travel_date, seats
+    ), restored AS (
+        UPDATE availability a SET seats_booked = a.seats_booked - r.seats
+        FROM released r
+        WHERE a.schedule_id = r.schedule_id AND a.travel_date = r.travel_date
+        RETURNING a.seats_total - a.seats_booked AS seats_available
+    )
+    SELECT r.schedule_id, r.travel_date, r.seats, (SELECT seats_available FROM restored)
+    FROM released r
+""")
+
+HOLD_STATE_SQL = text("""
+    SELECT hold_id, schedule_id, travel_date, seats,
+           CASE WHEN status = 'held' AND expires_at <= NOW() THEN 'expired' ELSE status END,
+           expires_at, booked_at
+    FROM seat_holds WHERE hold_id = :hold_id AND user_id = :user_id
+""")
+
+# Expired holds are summed per schedule and date first: UPDATE ... FROM applies one match per row
+SWEEP_SQL = text("""
+    WITH expired AS (
+        UPDATE seat_holds SET status = 'expired'
+        WHERE status = 'held' AND hold_id IN (
+            SELECT hold_id FROM seat_holds
+            WHERE status = 'held' AND expires_at <= NOW()
+            ORDER BY expires_at
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING schedule_id, travel_date, seats
+    ), released AS (
+        SELECT schedule_id, travel_date, SUM(seats) AS seats FROM expired GROUP BY schedule_id, travel_date
+    ), restored AS (
+        UPDATE availability a SET seats_booked = a.seats_booked - r.seats
+        FROM released r
+        WHERE a.schedule_id = r.schedule_id AND a.travel_date = r.travel_date
+    )
+    SELECT COUNT(*) FROM expired
+""")
+
+USER_HOLDS_SQL = text("""
+    SELECT h.hold_id, h.schedule_id, h.travel_date, h.seats,
+           CASE WHEN h.status = 'held' AND h.expires_at <= NOW() THEN 'expired' ELSE h.status END,
+           h.expires_at, h.booked_at, s.operator, s.departure_time, s.arrival_time
+    FROM seat_holds h
+    JOIN schedules s ON s.schedule_id = h.schedule_id
+    WHERE h.user_id = :user_id AND h.status IN ('held', 'booked') AND h.travel_date >= CURRENT_DATE
+    ORDER BY h.travel_date, s.departure_time, h.hold_id
+""")
+
+
+def hold_payload(row):
+    """One hold as returned by the hold endpoints."""
+    return {
+        "hold_id": row[0],
+        "schedule_id": row[1],
+        "date": row[2].isoformat(),
+        "seats": row[3],
+        "status": row[4],
+        "expires_at": row[5].isoformat() if row[5] else None,
+        "booked_at": row[6].isoformat() if row[6] else None
+    }
+
+
+class SeatHolds:
+    """Holds, bookings and the expiry sweeper; each method returns ``(body, status)``."""
+
+    def __init__(self, hold_seconds=600, sweep_seconds=30, sweep_batch=1000):
+        self.hold_seconds = hold_seconds
+        self.sweep_seconds = sweep_seconds
+        self.sweep_batch = sweep_batch
+        self._thread = None
+        self._lock = threading.Lock()
+        self.held = 0
+        self.sold_out = 0
+        self.booked = 0
+        self.released = 0
+        self.expired = 0
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def hold(self, engine, user_id, schedule_id, travel_date, seats=1):
+        """Take ``seats`` on a schedule and date for ``hold_seconds``."""
+        params = {"user_id": user_id, "schedule_id": schedule_id, "travel_date": travel_date, "seats": seats}
+        with engine.begin() as conn:
+            row = conn.execute(HOLD_SQL, dict(params, hold_seconds=self.hold_seconds)).fetchone()
+        if row:
+            self._count("held")
+            return {
+                "hold_id": row[0],
+                "schedule_id": schedule_id,
+                "date": travel_date.isoformat(),
+                "seats": seats,
+                "status": "held",
+                "expires_at": row[1].isoformat(),
+                "seats_available": row[2]
+            }, 201
+
+        with engine.connect() as conn:
+            seats_left = conn.execute(SEATS_LEFT_SQL, params).scalar()
+        if seats_left is None:
+            return {"error": "No seats on sale for this schedule and date"}, 404
+        self._count("sold_out")
+        return {"error": "Not enough seats available", "seats_available": seats_left}, 409
+
+    def confirm(self, engine, user_id, hold_id):
+        """Turn a live hold into a booking; confirming a booking again is a no-op."""
+        params = {"hold_id": hold_id, "user_id": user_id}
+        with engine.begin() as conn:
+            row = conn.execute(CONFIRM_SQL, params).fetchone()
+            if not row:
+                row = conn.execute(HOLD_STATE_SQL, params).fetchone()
+                if not row:
+                    return {"error": "Hold not found"}, 404
+                if row[4] != 'booked':
+                    return {"error": f"Hold is {row[4]}", **hold_payload(row)}, 409
+                return hold_payload(row), 200
+        self._count("booked")
+        return hold_payload(row), 200
+
+    def release(self, engine, user_id, hold_id):
+        """Give back the seats of a hold or booking."""
+        params = {"hold_id": hold_id, "user_id": user_id}
+        with engine.begin() as conn:
+            row = conn.execute(RELEASE_SQL, params).fetchone()
+            if not row:
+                state = conn.execute(HOLD_STATE_SQL, params).fetchone()
+                if not state:
+                    return {"error": "Hold not found"}, 404
+                return {"error": f"Hold is {state[4]}", **hold_payload(state)}, 409
+        self._count("released")
+        return {
+            "hold_id": hold_id,
+            "schedule_id": row[0],
+            "date": row[1].isoformat(),
+            "seats": row[2],
+            "status": "released",
+            "seats_available": row[3]
+        }, 200
+
+    def holds(self, engine, user_id):
+        """The user's upcoming holds and bookings."""
+        with engine.connect() as conn:
+            rows = conn.execute(USER_HOLDS_SQL, {"user_id": user_id}).fetchall()
+        return {"holds": [dict(
+            hold_payload(row), operator=row[7], departure_time=str(row[8]), arrival_time=str(row[9])
+        ) for row in rows]}, 200
+
+    def sweep(self, engine):
+        """Expire overdue holds and return their seats; None if another worker is sweeping."""
+        expired = 0
+        while True:
+            with engine.begin() as conn:
+                if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": SWEEP_LOCK_KEY}).scalar():
+                    if not expired:
+                        return None
+                    break
+                batch = conn.execute(SWEEP_SQL, {"limit": self.sweep_batch}).scalar()
+            expired += batch
+            if batch < self.sweep_batch:
+                break
+        if expired:
+            self._count("expired", expired)
+            logger.info(f"Expired {expired} seat holds")
+        return expired
+
+    def start(self, engine):
+        """Sweep every ``sweep_seconds`` on a daemon thread."""
+        with self._lock:
+            if self._thread is not None or not self.sweep_seconds:
+                return
+            self._thread = threading.Thread(target=self._run, args=(engine,), name="seat-hold-sweeper", daemon=True)
+        self._thread.start()
+
+    def _run(self, engine):
+        while True:
+            time.sleep(self.sweep_seconds)
+            try:
+                self.sweep(engine)
+            except Exception as e:
+                logger.error(f"Seat hold sweep error: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "held": self.held,
+                "sold_out": self.sold_out,
+                "booked": self.booked,
+                "released": self.released,
+                "expired": self.expired
+            }
+
+
+def benchmark(engine, user_id, schedule_id, travel_date, workers=16, attempts=50, seats=1):
+    """Hammer one schedule and date with concurrent holds and check the inventory adds up.
+
+    Every worker makes ``attempts`` holds back to back. Afterwards the
+    seats booked must have grown by exactly the seats held (no lost updates)
+    and never past ``seats_total`` (no overselling); the holds are then
+    released again.
+    """
+    holds = SeatHolds()
+    params = {"schedule_id": schedule_id, "travel_date": travel_date}
+    inventory_sql = text("""
+        SELECT seats_total, COALESCE(seats_booked, 0) FROM availability
+        WHERE schedule_id = :schedule_id AND travel_date = :travel_date
+    """)
+    with engine.connect() as conn:
+        before = conn.execute(inventory_sql, params).fetchone()
+    if before is None:
+        raise ValueError("No availability row for that schedule and date")
+
+    latencies = []
+    hold_ids = []
+    outcomes = {}
+    results_lock = threading.Lock()
+    start_line = threading.Barrier(workers)
+
+    def worker():
+        start_line.wait()
+        for _ in range(attempts):
+            started = time.perf_counter()
+            try:
+                body, status = holds.hold(engine, user_id, schedule_id, travel_date, seats)
+            except Exception as e:
+                logger.error(f"Benchmark hold error: {e}")
+                body, status = {}, 500
+            elapsed = time.perf_counter() - started
+            with results_lock:
+                latencies.append(elapsed)
+                outcomes[status] = outcomes.get(status, 0) + 1
+                if status == 201:
+                    hold_ids.append(body["hold_id"])
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - began
+
+    with engine.connect() as conn:
+        after = conn.execute(inventory_sql, params).fetchone()
+    for hold_id in hold_ids:
+        holds.release(engine, user_id, hold_id)
+
+    latencies.sort()
+
+    def percentile(p):
+        return round(1000 * latencies[min(len(latencies) - 1, int(p * len(latencies)))], 2)
+
+    return {
+        "workers": workers,
+        "attempts": len(latencies),
+        "held": len(hold_ids),
+        "outcomes": {str(status): count for status, count in sorted(outcomes.items())},
+        "seconds": round(wall, 3),
+        "holds_per_second": round(len(latencies) / wall, 1),
+        "latency_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99)},
+        "seats_booked_before": before[1],
+        "seats_booked_after": after[1],
+        "lost_updates": len(hold_ids) * seats - (after[1] - before[1]),
+        "oversold": max(0, after[1] - after[0])
+    }
+
+
+if __name__ == "__main__":
+    from database import create_db_engine, pool_config
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Seat hold maintenance and contention benchmark")
+    parser.add_argument("--sweep", action="store_true", help="expire overdue holds and return their seats")
+    parser.add_argument("--benchmark", action="store_true", help="concurrent holds against one schedule and date")
+    parser.add_argument("--user-id", type=int, help="user the benchmark holds are made for")
+    parser.add_argument("--schedule-id", type=int, help="benchmark schedule")
+    parser.add_argument("--date", type=date.fromisoformat, help="benchmark travel date (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=16, help="concurrent benchmark connections")
+    parser.add_argument("--attempts", type=int, default=50, help="holds per benchmark worker")
+    parser.add_argument("--seats", type=int, default=1, help="seats per benchmark hold")
+    args = parser.parse_args()
+    if args.benchmark:
+        if not (args.user_id and args.schedule_id and args.date):
+            parser.error("--benchmark needs --user-id, --schedule-id and --date")
+        config = dict(pool_config(), pool_size=args.workers, max_overflow=0)
+        result = benchmark(create_db_engine(config), args.user_id, args.schedule_id, args.date,
+                           workers=args.workers, attempts=args.attempts, seats=args.seats)
+        print(json.dumps(result, indent=2))
+    elif args.sweep:
+        expired = SeatHolds().sweep(create_db_engine())
+        print("Another worker is sweeping" if expired is None else f"Expired {expired} holds")
+    else:
+        parser.print_help()
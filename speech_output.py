@@ -0,0 +1,151 @@
+"""Persistent speech output for the voice module.
+
+The pyttsx3 engine is initialized once on a dedicated worker thread and fed
+from a queue, so answers are spoken without paying engine start-up on every
+utterance and the caller never blocks on audio. ``cancel()`` interrupts the
+current utterance and drops anything queued (barge-in when the user asks the
+next question).
+
+Fixed prompts (errors, "please specify ...") are rendered to WAV once at
+start-up and kept in memory; with ``simpleaudio`` installed they play back
+immediately instead of being synthesized each time.
+"""
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+try:
+    import simpleaudio
+except ImportError:  # cached prompts fall back to live synthesis
+    simpleaudio = None
+
+logger = logging.getLogger(__name__)
+
+_POLL_SECONDS = 0.05
+_TICK_SECONDS = 0.01
+
+
+class SpeechOutput:
+    """Single TTS engine on a worker thread with a queue, barge-in and a phrase cache."""
+
+    def __init__(self, cached_phrases=(), rate=None, voice=None):
+        self.cached_phrases = tuple(cached_phrases)
+        self.rate = rate
+        self.voice = voice
+        self._queue = queue.Queue()
+        self._cancel = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._idle_lock = threading.Lock()
+        self._stopping = False
+        self._failed = False
+        self._audio = {}
+        self._thread = threading.Thread(target=self._run, name="speech-output", daemon=True)
+        self._thread.start()
+
+    def say(self, text, interrupt=False):
+        """Queue ``text``; with ``interrupt`` anything still playing is cut off first."""
+        if not text or self._failed:
+            return
+        if interrupt:
+            self.cancel()
+        with self._idle_lock:
+            self._idle.clear()
+            self._queue.put(text)
+
+    def cancel(self):
+        """Stop the current utterance and drop queued ones."""
+        self._drain()
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        """Block until everything queued has been spoken."""
+        return self._idle.wait(timeout)
+
+    def close(self):
+        self._stopping = True
+        self.cancel()
+        self._thread.join(timeout=2)
+
+    def _drain(self):
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def _init_engine(self):
+        import pyttsx3
+
+        engine = pyttsx3.init()
+        if self.rate:
+            engine.setProperty('rate', self.rate)
+        if self.voice:
+            engine.setProperty('voice', self.voice)
+        return engine
+
+    def _render_cache(self, engine):
+        """Synthesize the fixed phrases to WAV once and keep them in memory."""
+        if simpleaudio is None or not self.cached_phrases:
+            return
+        directory = tempfile.mkdtemp(prefix="voice-phrases-")
+        try:
+            paths = {}
+            for index, phrase in enumerate(self.cached_phrases):
+                paths[phrase] = os.path.join(directory, f"{index}.wav")
+                engine.save_to_file(phrase, paths[phrase])
+            engine.runAndWait()
+            for phrase, path in paths.items():
+                try:
+                    self._audio[phrase] = simpleaudio.WaveObject.from_wave_file(path)
+                except Exception as e:
+                    logger.warning(f"Could not cache phrase {phrase!r}: {e}")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _run(self):
+        try:
+            engine = self._init_engine()
+            self._render_cache(engine)
+            engine.startLoop(False)
+        except Exception as e:
+            logger.error(f"Speech output unavailable: {e}")
+            self._failed = True
+            self._drain()
+            self._idle.set()
+            return
+
+        playing = None  # simpleaudio PlayObject of a cached phrase
+        try:
+            while not self._stopping:
+                if self._cancel.is_set():
+                    self._cancel.clear()
+                    if playing is not None:
+                        playing.stop()
+                        playing = None
+                    engine.stop()
+
+                busy = engine.isBusy() or (playing is not None and playing.is_playing())
+                if not busy:
+                    playing = None
+                    try:
+                        text = self._queue.get(timeout=_POLL_SECONDS)
+                    except queue.Empty:
+                        with self._idle_lock:
+                            if self._queue.empty():
+                                self._idle.set()
+                        continue
+                    cached = self._audio.get(text)
+                    if cached is not None:
+                        playing = cached.play()
+                    else:
+                        engine.say(text)
+                engine.iterate()
+                if busy:
+                    time.sleep(_TICK_SECONDS)
+        finally:
+            engine.endLoop()
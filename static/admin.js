@@ -2,9 +2,11 @@ const toastEl = document.getElementById('toast');
 const kpiFields = document.querySelectorAll('[data-field]');
 const recentUsersList = document.getElementById('recent-users');
 const topRoutesList = document.getElementById('top-routes');
+const metricsFreshness = document.getElementById('metrics-freshness');
 const usersTableBody = document.getElementById('users-table-body');
 const searchInput = document.getElementById('user-search');
 const refreshBtn = document.getElementById('refresh-users');
+const loadMoreUsersBtn = document.getElementById('load-more-users');
 const routeForm = document.getElementById('route-form');
 const sourceInput = document.getElementById('route-source');
 const destinationInput = document.getElementById('route-destination');
@@ -28,6 +30,10 @@ const scheduleSeatsTotalInput = document.getElementById('schedule-seats-total');
 const scheduleSeatsBookedInput = document.getElementById('schedule-seats-booked');
 
 const numberFormat = new Intl.NumberFormat('en-IN');
+// The trigram index only narrows searches of three or more characters
+const USER_SEARCH_MIN_LENGTH = 3;
+let usersRequest = null;
+let usersCursor = null;
 
 function showToast(message, type = 'success') {
   if (!toastEl) return;
@@ -67,6 +73,11 @@ async function loadMetrics() {
     }
     renderRecentUsers(data.recent_users || []);
     renderTopRoutes(data.top_routes || []);
+    if (metricsFreshness) {
+      metricsFreshness.textContent = data.refreshed_at
+        ? `Weekly activity and top routes as of ${new Date(data.refreshed_at).toLocaleString()}`
+        : '';
+    }
   } catch (error) {
     showToast(error.message, 'error');
   }
@@ -111,6 +122,8 @@ function renderTopRoutes(routes) {
           <strong>${label}</strong>
           <div class="item-meta">
             <span>${route.transport_type.toUpperCase()}</span>
+            <span>${numberFormat.format(route.searches)} searches</span>
+            <span>${numberFormat.format(route.bookmarks)} bookmarks</span>
             <span>${route.schedule_count} schedules</span>
             <span>${route.seats_available} seats open</span>
           </div>
@@ -120,39 +133,51 @@ function renderTopRoutes(routes) {
     .join('');
 }
 
-async function loadUsers(force = false) {
+async function loadUsers(force = false, append = false) {
   const query = searchInput?.value.trim();
+  if (query && query.length < USER_SEARCH_MIN_LENGTH) return;
   const url = new URL('/api/admin/users', window.location.origin);
   if (query) {
     url.searchParams.set('search', query);
   }
-  if (!force && usersTableBody.dataset.loading === 'true') return;
-  usersTableBody.dataset.loading = 'true';
-  usersTableBody.innerHTML = `
-    <tr><td colspan="8" class="empty-state">Loading users…</td></tr>
-  `;
+  if (append && usersCursor) {
+    url.searchParams.set('cursor', usersCursor);
+  }
+  if (!force && usersRequest) return;
+  // A newer search supersedes whatever is still in flight
+  usersRequest?.abort();
+  const controller = new AbortController();
+  usersRequest = controller;
+  if (!append) {
+    usersTableBody.innerHTML = `
+      <tr><td colspan="8" class="empty-state">Loading users…</td></tr>
+    `;
+  }
   try {
-    const data = await fetchJSON(url.toString());
-    renderUsersTable(data.users || []);
+    const data = await fetchJSON(url.toString(), { signal: controller.signal });
+    renderUsersTable(data.users || [], append);
+    usersCursor = data.next_cursor || null;
+    if (loadMoreUsersBtn) loadMoreUsersBtn.hidden = !usersCursor;
   } catch (error) {
+    if (error.name === 'AbortError') return;
     usersTableBody.innerHTML = `
       <tr><td colspan="8" class="empty-state">Failed to load users.</td></tr>
     `;
     showToast(error.message, 'error');
   } finally {
-    usersTableBody.dataset.loading = 'false';
+    if (usersRequest === controller) usersRequest = null;
   }
 }
 
-function renderUsersTable(users) {
-  if (!users.length) {
+function renderUsersTable(users, append = false) {
+  if (!users.length && !append) {
     usersTableBody.innerHTML = `
       <tr><td colspan="8" class="empty-state">No users match this filter.</td></tr>
     `;
     return;
   }
 
-  usersTableBody.innerHTML = users
+  const rows = users
     .map((user) => {
       const name = `${user.first_name || ''} ${user.last_name || ''}`.trim() || '—';
       const created = user.created_at ? new Date(user.created_at).toLocaleDateString() : '—';
@@ -175,6 +200,11 @@ function renderUsersTable(users) {
       `;
     })
     .join('');
+  if (append) {
+    usersTableBody.insertAdjacentHTML('beforeend', rows);
+  } else {
+    usersTableBody.innerHTML = rows;
+  }
 }
 
 async function toggleUserStatus(row, newStatus) {
@@ -433,10 +463,11 @@ scheduleForm?.addEventListener('submit', submitScheduleForm);
 let searchDebounce;
 searchInput?.addEventListener('input', () => {
   clearTimeout(searchDebounce);
-  searchDebounce = setTimeout(() => loadUsers(true), 400);
+  searchDebounce = setTimeout(() => loadUsers(true), 300);
 });
 
 refreshBtn?.addEventListener('click', () => loadUsers(true));
+loadMoreUsersBtn?.addEventListener('click', () => loadUsers(true, true));
 
 usersTableBody?.addEventListener('click', (event) => {
   if (event.target.matches('.toggle-btn')) {
@@ -633,148 +633,24 @@ if('webkitSpeechRecognition' in window || 'SpeechRecognition' in window){
     console.warn('Recognition error', e);
     alert('Voice recognition error');
   };
- recognition.onresult = (e) => {
+ recognition.onresult = async (e) => {
   const transcript = e.results[0][0].transcript.toLowerCase().trim();
   console.log("🎤 Heard:", transcript);
 
-  // === TRANSPORT TYPE DETECTION (English and Hindi) ===
-  let type = '';
-  if (transcript.includes('bus') || transcript.includes('बस')) type = 'bus';
-  else if (transcript.includes('train') || transcript.includes('ट्रेन') || transcript.includes('रेल')) type = 'train';
-
-  // === SOURCE AND DESTINATION DETECTION ===
-  let src = '', dst = '';
-  
-  if (currentLanguage === 'hi') {
-    // Hindi patterns: 
-    // "देहरादून से दिल्ली बस" (X से Y बस)
-    // "दिल्ली से मुंबई तक" (X से Y तक)
-    // "से दिल्ली तक मुंबई" (से X तक Y)
-    
-    console.log('🎤 Hindi transcript:', transcript);
-    
-    // Pattern 1: "X से Y बस/ट्रेन" - most common pattern
-    // Split on "से" and extract source and destination
-    const seIndex = transcript.indexOf('से');
-    if (seIndex >= 0) {
-      if (seIndex > 0) {
-        // "से" is in the middle: "X से Y बस"
-        src = transcript.substring(0, seIndex).trim();
-        let afterSe = transcript.substring(seIndex + 2).trim(); // +2 for "से" (2 chars)
-        
-        // Remove transport type if present at the end
-        afterSe = afterSe.replace(/\s+(बस|ट्रेन|bus|train)$/i, '').trim();
-        // Remove "तक" if present
-        afterSe = afterSe.replace(/\s+तक\s*$/i, '').trim();
-        
-        dst = afterSe;
-        console.log('✅ Pattern 1 matched - src:', src, 'dst:', dst);
-      } else {
-        // "से" is at the start: "से X तक Y" or "से X Y बस"
-        const afterSe = transcript.substring(2).trim(); // Skip "से"
-        const takIndex = afterSe.indexOf('तक');
-        
-        if (takIndex > 0) {
-          // Pattern: "से X तक Y"
-          const parts = afterSe.split('तक');
-          if (parts.length >= 2) {
-            src = parts[0].trim();
-            let dstPart = parts.slice(1).join('तक').trim();
-            // Remove transport type if present
-            dstPart = dstPart.replace(/\s+(बस|ट्रेन|bus|train)$/i, '').trim();
-            dst = dstPart;
-            console.log('✅ Pattern 2 matched (से X तक Y) - src:', src, 'dst:', dst);
-          }
-        } else {
-          // Pattern: "से X Y बस" - take first word as source, rest as destination
-          const words = afterSe.split(/\s+/);
-          if (words.length >= 2) {
-            // Find where transport type starts
-            let destEnd = words.length;
-            for (let i = words.length - 1; i >= 0; i--) {
-              if (/^(बस|ट्रेन|bus|train)$/i.test(words[i])) {
-                destEnd = i;
-                break;
-              }
-            }
-            src = words[0];
-            dst = words.slice(1, destEnd).join(' ').trim();
-            console.log('✅ Pattern 2 matched (से X Y बस) - src:', src, 'dst:', dst);
-          }
-        }
-      }
-    } else {
-      console.log('❌ No "से" found in Hindi transcript');
-    }
-  } else {
-    // English patterns
-    if (transcript.includes('from') && transcript.includes('to')) {
-      const afterFrom = transcript.split('from')[1];
-      const parts = afterFrom.split('to');
-      src = parts[0]?.trim() || '';
-      dst = parts[1]?.trim() || '';
-    }
-  }
-
-  // === DATE DETECTION (English and Hindi) ===
-  let date = '';
-  const today = new Date();
-
-  // Hindi month names
-  const hindiMonths = {
-    'जनवरी': 0, 'फरवरी': 1, 'मार्च': 2, 'अप्रैल': 3, 'मई': 4, 'जून': 5,
-    'जुलाई': 6, 'अगस्त': 7, 'सितंबर': 8, 'अक्टूबर': 9, 'नवंबर': 10, 'दिसंबर': 11
-  };
-  const englishMonths = [
-    "january","february","march","april","may","june",
-    "july","august","september","october","november","december"
-  ];
-
-  if (transcript.includes('today') || transcript.includes('आज')) {
-    date = today.toISOString().split('T')[0];
-  } else if (transcript.includes('tomorrow') || transcript.includes('कल')) {
-    const d = new Date();
-    d.setDate(today.getDate() + 1);
-    date = d.toISOString().split('T')[0];
-  } else if (transcript.includes('day after tomorrow') || transcript.includes('परसों')) {
-    const d = new Date();
-    d.setDate(today.getDate() + 2);
-    date = d.toISOString().split('T')[0];
-  } else {
-    // Match English: "on 15 november", "on 17th november"
-    let dateMatch = transcript.match(/on\s+(\d{1,2})(?:st|nd|rd|th)?\s+([a-zA-Z]+)/);
-    let monthIndex = -1;
-    
-    if (dateMatch) {
-      const monthName = dateMatch[2].toLowerCase();
-      monthIndex = englishMonths.indexOf(monthName);
-    } else {
-      // Match Hindi: "17 नवंबर को", "15 जनवरी"
-      dateMatch = transcript.match(/(\d{1,2})(?:\s+तारीख|\s+को)?\s+([\u0900-\u097F]+)/);
-      if (dateMatch) {
-        const monthName = dateMatch[2].trim();
-        monthIndex = hindiMonths[monthName] !== undefined ? hindiMonths[monthName] : -1;
-      }
-    }
-    
-    if (dateMatch && monthIndex >= 0) {
-      const day = parseInt(dateMatch[1]);
-      const year = today.getFullYear();
-      // Format date as YYYY-MM-DD directly to avoid timezone issues
-      const monthStr = String(monthIndex + 1).padStart(2, '0');
-      const dayStr = String(day).padStart(2, '0');
-      date = `${year}-${monthStr}-${dayStr}`;
-    }
-  }
-
-  // Clean destination: remove date information if it was extracted (English and Hindi)
-  if (date && dst) {
-    // Remove English patterns like "on 17th november", "on 17 november", etc.
-    dst = dst.replace(/\s+on\s+\d{1,2}(?:st|nd|rd|th)?\s+(january|february|march|april|may|june|july|august|september|october|november|december)/i, '').trim();
-    // Remove Hindi patterns like "17 नवंबर को", "15 जनवरी"
-    const hindiMonthNames = Object.keys(hindiMonths).join('|');
-    dst = dst.replace(new RegExp(`\\s+\\d{1,2}(?:\\s+तारीख|\\s+को)?\\s+(${hindiMonthNames})`, 'i'), '').trim();
+  // === SOURCE, DESTINATION, TYPE, DATE AND INTENT (parsed server-side, English and Hindi) ===
+  let parsed = {};
+  try {
+    const res = await fetch('/api/parse', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ query: transcript })
+    });
+    if (res.ok) parsed = await res.json();
+  } catch (err) {
+    console.warn('Parse failed', err);
   }
+  const src = parsed.source || '', dst = parsed.destination || '';
+  const type = parsed.type || '', date = parsed.date || '';
 
   // === TIME RANGE DETECTION ===
   let start_time = '', end_time = '';
@@ -789,7 +665,7 @@ if('webkitSpeechRecognition' in window || 'SpeechRecognition' in window){
     const afterMatch = transcript.match(/after\s+(\d{1,2})\s*(am|pm)?/);
     if (afterMatch) {
       start_time = convertTo24Hour(afterMatch[1], afterMatch[2]);
-    } else if (transcript.includes('next')) {
+    } else if (parsed.intent === 'next') {
       // “Next bus/train” = starting from now
       const now = new Date();
       start_time = now.toTimeString().split(' ')[0];
@@ -798,30 +674,20 @@ if('webkitSpeechRecognition' in window || 'SpeechRecognition' in window){
 
   // === FILL UI FIELDS ===
   if (src && dst) {
-    // Convert Hindi city names to English for database search
-    const srcEnglish = convertHindiToEnglishCityName(src);
-    const dstEnglish = convertHindiToEnglishCityName(dst);
-    
-    console.log('🔄 City name conversion:', { 
-      original: { src, dst }, 
-      converted: { srcEnglish, dstEnglish } 
-    });
-    
-    el('source').value = capitalize(srcEnglish);
-    el('destination').value = capitalize(dstEnglish);
-    el('transport-type').value = type || '';
+    el('source').value = capitalize(src);
+    el('destination').value = capitalize(dst);
+    el('transport-type').value = type;
     if (date) el('date').value = date;
 
-    // Speak in selected language (use original Hindi names for speech)
+    // Speak in selected language
     if (currentLanguage === 'hi') {
       const transportText = type === 'bus' ? 'बस' : type === 'train' ? 'ट्रेन' : 'यातायात';
       speak(`${src} से ${dst} के लिए ${transportText} खोज रहे हैं` + (date ? ` ${date} को` : ''));
     } else {
-      speak(`Searching ${type || 'transport'} from ${srcEnglish} to ${dstEnglish}` + (date ? ` on ${date}` : ''));
+      speak(`Searching ${type || 'transport'} from ${src} to ${dst}` + (date ? ` on ${date}` : ''));
     }
 
-    // Call backend with English city names for database search
-    doSearchWithParams(srcEnglish, dstEnglish, type, date, start_time, end_time);
+    doSearchWithParams(src, dst, type, date, start_time, end_time);
   } else {
     if (currentLanguage === 'hi') {
       speak("क्षमा करें, मैं रूट समझ नहीं पाया। कृपया फिर से कोशिश करें।");
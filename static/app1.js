@@ -376,66 +376,29 @@ if ("webkitSpeechRecognition" in window) {
 speakBtn.onclick = () => recognition.start();
 
 // ========== VOICE QUERY PROCESSING ==========
-function processVoiceQuery(query) {
+async function processVoiceQuery(query) {
   query = query.toLowerCase();
   const params = new URLSearchParams();
 
-  // Extract transport type (support both English and Hindi)
-  if (query.includes("bus") || query.includes("बस")) params.append("type", "bus");
-  else if (query.includes("train") || query.includes("ट्रेन")) params.append("type", "train");
-
-  // Extract source and destination
-  let source = null;
-  let destination = null;
-
-  if (currentLanguage === 'hi') {
-    // Hindi patterns
-    const hindiFromMatch = query.match(/(?:से|from)\s+([a-z\u0900-\u097F\s]+?)(?:\s+तक|\s+to)/);
-    if (hindiFromMatch) {
-      source = hindiFromMatch[1].trim();
-    }
-    
-    const hindiToMatch = query.match(/(?:तक|to)\s+([a-z\u0900-\u097F\s]+?)(?:\s+बस|\s+ट्रेन|\s+bus|\s+train|$)/);
-    if (hindiToMatch) {
-      destination = hindiToMatch[1].trim();
-    }
-    
-    // Fallback for Hindi
-    if (!source) {
-      const fromMatch = query.match(/(?:से|from)\s+([a-z\u0900-\u097F\s]+)/);
-      if (fromMatch) source = fromMatch[1].trim();
-    }
-    if (!destination) {
-      const toMatch = query.match(/(?:तक|to)\s+([a-z\u0900-\u097F\s]+)/);
-      if (toMatch) destination = toMatch[1].trim();
-    }
-  } else {
-    // English patterns
-    const match = query.match(/from\s+([a-z\s]+)\s+to\s+([a-z\s]+)/);
-    if (match) {
-      source = match[1].trim();
-      destination = match[2].trim();
-    } else {
-      // fallback as before
-      const fromMatch = query.match(/from\s+([a-z\s]+)/);
-      const toMatch = query.match(/to\s+([a-z\s]+)/);
-      if (fromMatch) source = fromMatch[1].trim();
-      if (toMatch) destination = toMatch[1].trim();
-    }
+  // Source, destination, type and date are parsed server-side (English and Hindi)
+  let parsed = {};
+  try {
+    const res = await fetch("/api/parse", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ query })
+    });
+    if (res.ok) parsed = await res.json();
+  } catch (err) {
+    console.warn("Parse failed", err);
   }
 
+  const source = parsed.source;
+  const destination = parsed.destination;
+  if (parsed.type) params.append("type", parsed.type);
   if (source) params.append("source", source);
   if (destination) params.append("destination", destination);
-
-  // Date detection (support both languages)
-  const today = new Date();
-  if (query.includes("today") || query.includes("आज")) {
-    params.append("date", today.toISOString().split("T")[0]);
-  } else if (query.includes("tomorrow") || query.includes("कल")) {
-    const tomorrow = new Date(today);
-    tomorrow.setDate(today.getDate() + 1);
-    params.append("date", tomorrow.toISOString().split("T")[0]);
-  }
+  if (parsed.date) params.append("date", parsed.date);
 
   // Time extraction (support both languages)
   const timeMatch = query.match(/(?:at|पर|सुबह|शाम)\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm|बजे|सुबह|शाम)?/);
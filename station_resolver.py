@@ -0,0 +1,251 @@
+"""In-process station name index.
+
+Loads the ``stations`` table once and resolves free text such as "delhi",
+"new delhi jn" or "दिल्ली" to a ranked list of station_ids, so the enquiry
+queries can filter on ``station_id = ANY(...)`` instead of running
+leading-wildcard ``ILIKE`` scans against ``stations`` on every request.
+
+The ``(source, destination, transport_type)`` pairs that have a route are
+loaded with it, so an enquiry only looks up timetables for pairs that exist
+instead of every combination of the matched stations.
+"""
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Hindi spellings of common station cities (kept in sync with static/app.js)
+HINDI_CITY_NAMES = {
+    'दिल्ली': 'Delhi', 'देहरादून': 'Dehradun', 'मुंबई': 'Mumbai', 'बॉम्बे': 'Mumbai',
+    'पुणे': 'Pune', 'बेंगलुरु': 'Bangalore', 'बैंगलोर': 'Bangalore', 'चेन्नई': 'Chennai',
+    'मद्रास': 'Chennai', 'कोलकाता': 'Kolkata', 'कलकत्ता': 'Kolkata', 'हैदराबाद': 'Hyderabad',
+    'अहमदाबाद': 'Ahmedabad', 'जयपुर': 'Jaipur', 'सूरत': 'Surat', 'लखनऊ': 'Lucknow',
+    'कानपुर': 'Kanpur', 'नागपुर': 'Nagpur', 'इंदौर': 'Indore', 'थाणे': 'Thane',
+    'भोपाल': 'Bhopal', 'विशाखापत्तनम': 'Visakhapatnam', 'पटना': 'Patna', 'वडोदरा': 'Vadodara',
+    'गाजियाबाद': 'Ghaziabad', 'लुधियाना': 'Ludhiana', 'कोयंबटूर': 'Coimbatore', 'आगरा': 'Agra',
+    'मदुरै': 'Madurai', 'नाशिक': 'Nashik', 'मेरठ': 'Meerut', 'राजकोट': 'Rajkot',
+    'वाराणसी': 'Varanasi', 'बनारस': 'Varanasi', 'श्रीनगर': 'Srinagar', 'अमृतसर': 'Amritsar',
+    'जोधपुर': 'Jodhpur', 'रांची': 'Ranchi', 'रायपुर': 'Raipur', 'कोच्चि': 'Kochi',
+    'कोचीन': 'Kochi', 'चंडीगढ़': 'Chandigarh', 'गुवाहाटी': 'Guwahati', 'सोलापुर': 'Solapur',
+    'हुबली': 'Hubli', 'मैसूर': 'Mysore', 'तिरुवनंतपुरम': 'Thiruvananthapuram',
+    'तिरुचिरापल्ली': 'Tiruchirappalli', 'कोटा': 'Kota', 'जमशेदपुर': 'Jamshedpur',
+    'अलीगढ़': 'Aligarh', 'बरेली': 'Bareilly', 'गोरखपुर': 'Gorakhpur', 'मुरादाबाद': 'Moradabad',
+    'जलंधर': 'Jalandhar', 'अमरावती': 'Amravati', 'नोएडा': 'Noida', 'ग्रेटर नोएडा': 'Greater Noida',
+    'गुरुग्राम': 'Gurgaon', 'फरीदाबाद': 'Faridabad', 'शिमला': 'Shimla', 'मनाली': 'Manali',
+    'हरिद्वार': 'Haridwar', 'ऋषिकेश': 'Rishikesh', 'मसूरी': 'Mussoorie', 'नैनीताल': 'Nainital',
+    'अल्मोड़ा': 'Almora', 'रानीखेत': 'Ranikhet', 'कुल्लू': 'Kullu', 'सोलन': 'Solan',
+    'धर्मशाला': 'Dharamshala', 'मक्लोडगंज': 'McLeod Ganj', 'दार्जिलिंग': 'Darjeeling',
+    'गंगटोक': 'Gangtok', 'कालिम्पोंग': 'Kalimpong', 'उदयपुर': 'Udaipur', 'माउंट आबू': 'Mount Abu',
+    'जैसलमेर': 'Jaisalmer', 'बीकानेर': 'Bikaner', 'अजमेर': 'Ajmer', 'पुष्कर': 'Pushkar',
+    'चित्तौड़गढ़': 'Chittorgarh', 'बूंदी': 'Bundi', 'भरतपुर': 'Bharatpur', 'अलवर': 'Alwar',
+    'सीकर': 'Sikar', 'झुंझुनू': 'Jhunjhunu', 'चूरू': 'Churu', 'नागौर': 'Nagaur', 'पाली': 'Pali',
+    'बाड़मेर': 'Barmer', 'जालौर': 'Jalore', 'सिरोही': 'Sirohi', 'प्रतापगढ़': 'Pratapgarh',
+    'बांसवाड़ा': 'Banswara', 'डूंगरपुर': 'Dungarpur', 'बारां': 'Baran', 'झालावाड़': 'Jhalawar',
+    'सवाई माधोपुर': 'Sawai Madhopur', 'करौली': 'Karauli', 'धौलपुर': 'Dholpur',
+}
+
+# Abbreviations commonly found in station names and spoken queries
+ABBREVIATIONS = {
+    'jn': 'junction',
+    'jct': 'junction',
+    'stn': 'station',
+    'cantt': 'cantonment',
+    'cant': 'cantonment',
+    'ctrl': 'central',
+    'rly': 'railway',
+    'rd': 'road',
+}
+
+_NON_ALNUM = re.compile(r'[^0-9a-z\u0900-\u097F]+')
+
+# Match quality tiers, best first
+SCORE_EXACT = 100.0
+SCORE_PREFIX = 90.0
+SCORE_TOKEN_PREFIX = 80.0
+SCORE_SUBSTRING = 70.0
+SCORE_FUZZY = 50.0
+
+FUZZY_THRESHOLD = 0.4
+
+STATIONS_SQL = "SELECT station_id, station_name FROM stations"
+ROUTE_PAIRS_SQL = "SELECT DISTINCT source_station_id, destination_station_id, LOWER(transport_type) FROM routes"
+
+
+def normalize_name(value):
+    """Normalize a station name or query for index lookups."""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFKC', str(value)).strip()
+    value = HINDI_CITY_NAMES.get(value, value)
+    value = _NON_ALNUM.sub(' ', value.lower())
+    tokens = [HINDI_CITY_NAMES.get(tok, tok).lower() for tok in value.split()]
+    tokens = [ABBREVIATIONS.get(tok, tok) for tok in tokens]
+    return ' '.join(tokens)
+
+
+def trigrams(value):
+    """Return the set of padded trigrams for a normalized string."""
+    padded = f"  {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class StationResolver:
+    """Resolves free-text station names to ranked station_ids."""
+
+    def __init__(self, refresh_seconds=600):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self.generation = 0
+        self._names = {}
+        self._normalized = {}
+        self._exact = {}
+        self._prefixes = {}
+        self._trigrams = {}
+        self._station_grams = {}
+        self._route_pairs = None
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def load(self, engine):
+        """(Re)build the index from the stations and routes tables."""
+        with engine.connect() as conn:
+            rows = conn.execute(text(STATIONS_SQL)).fetchall()
+            route_rows = conn.execute(text(ROUTE_PAIRS_SQL)).fetchall()
+        self.load_rows(rows, route_rows)
+
+    def load_rows(self, rows, route_rows=None):
+        """(Re)build the index from ``(station_id, station_name)`` rows.
+
+        ``route_rows`` are ROUTE_PAIRS_SQL rows; without them every station
+        pair counts as a possible route.
+        """
+        self._build(rows)
+        self._route_pairs = None if route_rows is None else {tuple(row) for row in route_rows}
+        logger.info(f"Station index loaded with {len(rows)} stations and {len(route_rows or ())} route pairs")
+
+    def needs_refresh(self):
+        """True before the first load and once the index has gone stale."""
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            return True
+        return bool(self.refresh_seconds) and time.monotonic() - loaded_at >= self.refresh_seconds
+
+    def ensure_loaded(self, engine):
+        """Load the index on first use and refresh it once it goes stale."""
+        if not self.needs_refresh():
+            return
+        with self._lock:
+            if self.needs_refresh():
+                self.load(engine)
+
+    def invalidate(self):
+        """Force a reload on the next lookup."""
+        self._loaded_at = None
+
+    def _build(self, rows):
+        names, normalized = {}, {}
+        exact, prefixes, grams, station_grams = {}, {}, {}, {}
+        for station_id, station_name in rows:
+            norm = normalize_name(station_name)
+            if not norm:
+                continue
+            names[station_id] = station_name
+            normalized[station_id] = norm
+            exact.setdefault(norm, set()).add(station_id)
+            for token in norm.split():
+                for i in range(1, len(token) + 1):
+                    prefixes.setdefault(token[:i], set()).add(station_id)
+            station_grams[station_id] = trigrams(norm)
+            for gram in station_grams[station_id]:
+                grams.setdefault(gram, set()).add(station_id)
+
+        # Swap all indexes at once so readers never see a half-built index
+        (self._names, self._normalized, self._exact,
+         self._prefixes, self._trigrams, self._station_grams) = (
+            names, normalized, exact, prefixes, grams, station_grams)
+        self._loaded_at = time.monotonic()
+        self.generation += 1
+
+    def names(self):
+        """``{station_id: station_name}`` for every indexed station."""
+        return self._names
+
+    def route_pairs(self):
+        """Set of ``(source_id, destination_id, transport_type)`` with a route, or None if not loaded."""
+        return self._route_pairs
+
+    def add_route(self, source_station_id, destination_station_id, transport_type):
+        """Make a newly created route searchable before the next reload."""
+        pairs = self._route_pairs
+        if pairs is not None:
+            self._route_pairs = pairs | {(source_station_id, destination_station_id, transport_type.lower())}
+
+    def name_of(self, station_id):
+        return self._names.get(station_id)
+
+    def rank(self, query, limit=25):
+        """Return ``[(station_id, score), ...]`` best match first."""
+        norm = normalize_name(query)
+        if not norm:
+            return []
+
+        normalized = self._normalized
+        scores = {}
+
+        for station_id in self._exact.get(norm, ()):
+            scores[station_id] = SCORE_EXACT
+
+        # Every query token must prefix some token of the station name
+        query_tokens = norm.split()
+        candidates = None
+        for token in query_tokens:
+            matches = self._prefixes.get(token, set())
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                break
+        for station_id in candidates or ():
+            if station_id in scores:
+                continue
+            if normalized[station_id].startswith(norm):
+                scores[station_id] = SCORE_PREFIX
+            else:
+                scores[station_id] = SCORE_TOKEN_PREFIX
+
+        # Trigram candidates cover mid-word substrings and misspellings
+        query_grams = trigrams(norm)
+        counts = {}
+        for gram in query_grams:
+            for station_id in self._trigrams.get(gram, ()):
+                counts[station_id] = counts.get(station_id, 0) + 1
+        for station_id, shared in counts.items():
+            if station_id in scores:
+                continue
+            name = normalized[station_id]
+            if len(norm) >= 3 and norm in name:
+                scores[station_id] = SCORE_SUBSTRING
+                continue
+            similarity = shared / len(query_grams | self._station_grams[station_id])
+            if similarity >= FUZZY_THRESHOLD:
+                scores[station_id] = SCORE_FUZZY * similarity
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (-item[1], len(normalized[item[0]]), normalized[item[0]])
+        )
+        return ranked[:limit]
+
+    def resolve(self, query, limit=25):
+        """Return the station_ids matching ``query``, best match first."""
+        return [station_id for station_id, _ in self.rank(query, limit)]
+
+    def search(self, query, limit=8):
+        """Return ``[(station_id, station_name), ...]`` for autocomplete."""
+        return [(station_id, self._names[station_id]) for station_id in self.resolve(query, limit)]
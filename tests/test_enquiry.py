@@ -0,0 +1,150 @@
+"""Timetable helpers: next departures, keyset pages and seat lookups."""
+from datetime import date, time, timedelta
+
+import pytest
+
+import enquiry
+import fare_engine
+from schedule_calendar import parse_days
+
+MONDAY = date(2026, 10, 19)
+
+
+def sched(schedule_id, departure_time, days="Daily", exceptions=None, availability=None):
+    return {
+        "schedule_id": schedule_id,
+        "departure_time": departure_time,
+        "days_mask": parse_days(days),
+        "exceptions": exceptions or {},
+        "availability": availability or {},
+    }
+
+
+def departures(found):
+    return [(entry["schedule_id"], day) for entry, day in found]
+
+
+class TestNextDepartures:
+    def test_later_today(self):
+        timetable = [sched(1, "06:00:00"), sched(2, "09:00:00"), sched(3, "18:00:00")]
+        found = enquiry.next_departures([timetable], time(8, 0), count=2, today=MONDAY)
+        assert departures(found) == [(2, MONDAY), (3, MONDAY)]
+
+    def test_departure_at_after_time_counts(self):
+        timetable = [sched(1, "09:00:00")]
+        assert departures(enquiry.next_departures([timetable], time(9, 0), today=MONDAY)) == [(1, MONDAY)]
+
+    def test_wraps_to_tomorrows_first_departure(self):
+        timetable = [sched(1, "06:00:00"), sched(2, "09:00:00")]
+        found = enquiry.next_departures([timetable], time(22, 0), count=3, today=MONDAY)
+        tuesday = MONDAY + timedelta(days=1)
+        assert departures(found) == [(1, tuesday), (2, tuesday), (1, tuesday + timedelta(days=1))]
+
+    def test_skips_days_the_service_does_not_run(self):
+        timetable = [sched(1, "07:00:00", days="Sat,Sun")]
+        found = enquiry.next_departures([timetable], time(0, 0), today=MONDAY)
+        assert departures(found) == [(1, MONDAY + timedelta(days=5))]
+
+    def test_wraps_a_full_week_to_the_same_weekday(self):
+        timetable = [sched(1, "07:00:00", days="Mon")]
+        found = enquiry.next_departures([timetable], time(12, 0), count=2, today=MONDAY)
+        assert departures(found) == [(1, MONDAY + timedelta(days=7))]
+
+    def test_cancelled_day_is_skipped(self):
+        timetable = [sched(1, "07:00:00", exceptions={MONDAY.isoformat(): False})]
+        found = enquiry.next_departures([timetable], time(0, 0), today=MONDAY)
+        assert departures(found) == [(1, MONDAY + timedelta(days=1))]
+
+    def test_nothing_within_the_lookahead(self):
+        tuesday_only = [sched(1, "07:00:00", days="Tue")]
+        assert enquiry.next_departures([tuesday_only], time(8, 0), today=MONDAY, lookahead_days=0) == []
+
+    def test_merges_route_pairs_in_time_order(self):
+        buses = [sched(1, "07:00:00"), sched(3, "11:00:00")]
+        trains = [sched(2, "08:30:00"), sched(4, "10:00:00")]
+        found = enquiry.next_departures([buses, trains], time(7, 30), count=3, today=MONDAY)
+        assert departures(found) == [(2, MONDAY), (4, MONDAY), (3, MONDAY)]
+
+
+class TestPageSchedules:
+    SCHEDULES = [sched(1, "06:00:00"), sched(5, "06:00:00"), sched(2, "08:00:00"), sched(3, "12:00:00")]
+
+    def test_without_limit_returns_everything(self):
+        assert enquiry.page_schedules(self.SCHEDULES) == (self.SCHEDULES, None)
+
+    def test_walks_every_page_once(self):
+        seen, cursor = [], None
+        while True:
+            page, next_cursor = enquiry.page_schedules(self.SCHEDULES, cursor, limit=3)
+            seen.extend(entry["schedule_id"] for entry in page)
+            if next_cursor is None:
+                break
+            cursor = enquiry.decode_cursor(next_cursor)
+        assert seen == [1, 5, 2, 3]
+
+    def test_cursor_breaks_departure_time_ties_by_schedule_id(self):
+        page, next_cursor = enquiry.page_schedules(self.SCHEDULES, ("06:00:00", 1), limit=1)
+        assert [entry["schedule_id"] for entry in page] == [5]
+        assert enquiry.decode_cursor(next_cursor) == ("06:00:00", 5)
+
+    def test_exact_last_page_has_no_cursor(self):
+        assert enquiry.page_schedules(self.SCHEDULES, limit=4)[1] is None
+
+    def test_cursor_past_the_end(self):
+        assert enquiry.page_schedules(self.SCHEDULES, ("23:59:00", 0), limit=2) == ([], None)
+
+    @pytest.mark.parametrize("value", ["zzz", "", "MTI6MDA"])
+    def test_malformed_cursor(self, value):
+        assert enquiry.decode_cursor(value) is None
+
+
+def test_timetable_keys_keep_only_existing_routes():
+    keys = enquiry.timetable_keys([1, 2], [3, 4], ["bus", "train"], {(1, 3, "bus"), (2, 4, "train")})
+    assert keys == [(1, 3, "bus"), (2, 4, "train")]
+    assert len(enquiry.timetable_keys([1, 2], [3, 4], ["bus", "train"])) == 8
+
+
+def test_enquiry_seats_inside_the_window_use_the_parsed_date():
+    day = date(2026, 11, 5)
+    seats = {"date": day.isoformat(), "seats_available": 12}
+    timetable = [sched(1, "07:00:00", availability={day.isoformat(): seats})]
+    requested, error = enquiry.requested_date("2026-11-5")
+    assert (requested, error) == (day, None)
+    assert enquiry.enquiry_seats([timetable], ('search',), requested, 90, today=MONDAY) == ({1: seats}, [])
+
+
+def test_requested_date_rejects_other_formats():
+    assert enquiry.requested_date("") == (None, None)
+    assert enquiry.requested_date("05/11/2026") == (None, "date must be YYYY-MM-DD")
+
+
+def test_enquiry_seats_outside_the_window_list_schedules_to_load():
+    timetable = [sched(1, "07:00:00"), sched(2, "09:00:00", days="Sun")]
+    later = MONDAY + timedelta(days=120)
+    assert enquiry.enquiry_seats([timetable], ('search',), later, 90, today=MONDAY) == (None, [1])
+    assert enquiry.enquiry_seats([timetable], ('fare',), later, 90, today=MONDAY) == (None, [])
+
+
+def listed(schedule_id, available_dates=()):
+    return {
+        **sched(schedule_id, "07:00:00"),
+        "operator": "UTC", "arrival_time": "09:00:00", "distance_km": 100.0, "transport_type": "bus",
+        "available_dates": list(available_dates),
+    }
+
+
+def test_search_without_inventory_reports_no_dates():
+    body = enquiry.build_enquiry([[listed(1)]], ('search',), today=MONDAY)
+    result = body["results"][0]
+    assert result["available_dates"] == []
+    assert [result[name] for name in ("travel_date", "seats_total", "seats_booked", "seats_available")] == [None] * 4
+    empty_coach = {"operator": "UTC", "distance_km": 100.0, "departure_time": "07:00:00"}
+    assert result["fare"] == fare_engine.quote([empty_coach])[0][0]
+
+
+def test_dated_search_without_inventory_reports_unknown_seats():
+    seats = {"seats_total": 30, "seats_booked": 12, "seats_available": 18}
+    body = enquiry.build_enquiry([[listed(1), listed(2)]], ('search',), "2026-10-20", {2: seats}, today=MONDAY)
+    unknown, known = body["results"]
+    assert [unknown[name] for name in ("seats_total", "seats_booked", "seats_available")] == [None] * 3
+    assert [known[name] for name in ("seats_total", "seats_booked", "seats_available")] == [30, 12, 18]
@@ -0,0 +1,84 @@
+"""Vectorized fare quotes."""
+from datetime import time
+
+import pytest
+
+import fare_engine
+from fare_engine import BASE_RATE, MAX_SEAT_SURCHARGE, MIN_FARE, OPERATOR_MULTIPLIER, PEAK_FACTOR, quote
+
+
+def row(operator="Shatabdi", distance_km=100, departure_time="12:00:00", seats_total=40, seats_available=40):
+    return {
+        "operator": operator,
+        "distance_km": distance_km,
+        "departure_time": departure_time,
+        "seats_total": seats_total,
+        "seats_available": seats_available,
+    }
+
+
+def test_empty_result_set():
+    assert quote([]) == ([], [])
+
+
+def test_base_fare_is_distance_times_rate():
+    fares, bus_types = quote([row()])
+    assert bus_types == ["ORDINARY"]
+    assert fares == [pytest.approx(100 * BASE_RATE["ORDINARY"])]
+
+
+@pytest.mark.parametrize("operator, bus_type", [
+    ("Shatabdi", "ORDINARY"),
+    ("Volvo Travels", "VOLVO"),
+    ("Sleeper Express", "SLEEPER"),
+    ("Zing AC", "AC"),
+    (None, "ORDINARY"),
+])
+def test_bus_type_from_operator(operator, bus_type):
+    assert quote([row(operator=operator)])[1] == [bus_type]
+
+
+def test_operator_multiplier():
+    fares, _ = quote([row(operator="MSRTC")])
+    assert fares == [pytest.approx(100 * BASE_RATE["ORDINARY"] * OPERATOR_MULTIPLIER["MSRTC"])]
+
+
+@pytest.mark.parametrize("departure_time, peak", [
+    ("05:59:00", False),
+    ("06:00:00", True),
+    ("09:59:00", True),
+    ("10:00:00", False),
+    ("17:30", True),
+    (time(21, 45), True),
+    (time(22, 0), False),
+])
+def test_peak_hours(departure_time, peak):
+    fares, _ = quote([row(departure_time=departure_time)])
+    base = 100 * BASE_RATE["ORDINARY"]
+    assert fares == [pytest.approx(base * PEAK_FACTOR if peak else base)]
+
+
+def test_seat_surcharge_grows_as_seats_run_out():
+    fares, _ = quote([row(seats_available=40), row(seats_available=10), row(seats_available=0)])
+    base = 100 * BASE_RATE["ORDINARY"]
+    assert fares == [
+        pytest.approx(base),
+        pytest.approx(base * (1 + MAX_SEAT_SURCHARGE * 0.75)),
+        pytest.approx(base * (1 + MAX_SEAT_SURCHARGE)),
+    ]
+
+
+def test_unknown_inventory_is_priced_as_an_empty_coach():
+    unknown = {"operator": "Shatabdi", "distance_km": 100, "departure_time": "12:00:00"}
+    assert quote([unknown]) == quote([row(seats_total=fare_engine.DEFAULT_SEATS, seats_available=None)])
+    assert quote([unknown])[0] == [pytest.approx(100 * BASE_RATE["ORDINARY"])]
+
+
+def test_short_trips_pay_the_minimum_fare():
+    assert quote([row(distance_km=10), row(distance_km=None)])[0] == [MIN_FARE, MIN_FARE]
+
+
+def test_fares_line_up_with_rows():
+    rows = [row(distance_km=distance) for distance in (300, 100, 200)]
+    fares, _ = quote(rows)
+    assert fares == [pytest.approx(distance * BASE_RATE["ORDINARY"]) for distance in (300, 100, 200)]
@@ -0,0 +1,185 @@
+"""Connection-scan journeys over synthetic timetables."""
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+
+import pytest
+
+from journey_planner import ROUTE_CONNECTIONS_SQL, JourneyPlanner, time_ms
+from schedule_calendar import parse_days
+
+MONDAY = date(2026, 10, 19)
+TUESDAY = MONDAY + timedelta(days=1)
+DELHI, HARIDWAR, RISHIKESH, DEHRADUN = 1, 2, 3, 4
+
+
+def conn(schedule_id, route_id, source, destination, departure, arrival, days="Daily", transport_type="bus",
+         exceptions=None):
+    """A CONNECTIONS_SQL row; times are "HH:MM"."""
+    return (
+        schedule_id, route_id, source, destination, transport_type, f"Operator {schedule_id}",
+        time.fromisoformat(departure), time.fromisoformat(arrival), parse_days(days), 100, exceptions
+    )
+
+
+def planner(*rows, **kwargs):
+    planner = JourneyPlanner(**kwargs)
+    planner.load_rows(list(rows))
+    return planner
+
+
+def legs(journeys):
+    return [[(c.schedule_id, day) for c, day in journey] for journey in journeys]
+
+
+def at(hhmm):
+    return time_ms(time.fromisoformat(hhmm))
+
+
+class TestTransfers:
+    DIRECT = conn(1, 1, DELHI, DEHRADUN, "08:00", "14:00")
+    FIRST_LEG = conn(2, 2, DELHI, HARIDWAR, "07:00", "10:00")
+
+    def test_faster_transfer_is_offered_after_the_direct_journey(self):
+        found = planner(self.DIRECT, self.FIRST_LEG, conn(3, 3, HARIDWAR, DEHRADUN, "10:30", "12:00")).plan(
+            [DELHI], [DEHRADUN], MONDAY, at("06:00")
+        )
+        assert legs(found) == [[(1, MONDAY)], [(2, MONDAY), (3, MONDAY)]]
+
+    def test_slower_transfer_is_dominated(self):
+        found = planner(self.DIRECT, self.FIRST_LEG, conn(3, 3, HARIDWAR, DEHRADUN, "12:00", "14:30")).plan(
+            [DELHI], [DEHRADUN], MONDAY, at("06:00")
+        )
+        assert legs(found) == [[(1, MONDAY)]]
+
+    def test_equal_arrival_keeps_fewer_transfers(self):
+        found = planner(self.DIRECT, self.FIRST_LEG, conn(3, 3, HARIDWAR, DEHRADUN, "12:00", "14:00")).plan(
+            [DELHI], [DEHRADUN], MONDAY, at("06:00")
+        )
+        assert legs(found) == [[(1, MONDAY)]]
+
+    def test_two_transfers_within_the_limit(self):
+        rows = (
+            conn(1, 1, DELHI, HARIDWAR, "07:00", "10:00"),
+            conn(2, 2, HARIDWAR, RISHIKESH, "10:30", "11:00"),
+            conn(3, 3, RISHIKESH, DEHRADUN, "11:30", "12:30"),
+        )
+        assert legs(planner(*rows).plan([DELHI], [DEHRADUN], MONDAY)) == [[(1, MONDAY), (2, MONDAY), (3, MONDAY)]]
+        assert planner(*rows, max_transfers=1).plan([DELHI], [DEHRADUN], MONDAY) == []
+
+    def test_departures_before_after_are_skipped(self):
+        found = planner(self.DIRECT, self.FIRST_LEG, conn(3, 3, HARIDWAR, DEHRADUN, "10:30", "12:00")).plan(
+            [DELHI], [DEHRADUN], MONDAY, at("07:30")
+        )
+        assert legs(found) == [[(1, MONDAY)]]
+
+    def test_transport_type_filter(self):
+        train = conn(1, 1, DELHI, DEHRADUN, "08:00", "12:00", transport_type="Train")
+        bus = conn(2, 2, DELHI, DEHRADUN, "09:00", "15:00")
+        assert legs(planner(train, bus).plan([DELHI], [DEHRADUN], MONDAY, transport_types=["bus"])) == [[(2, MONDAY)]]
+        assert legs(planner(train, bus).plan([DELHI], [DEHRADUN], MONDAY)) == [[(1, MONDAY)]]
+
+
+class TestMinimumConnection:
+    ROWS = (
+        conn(1, 1, DELHI, HARIDWAR, "07:00", "10:00"),
+        conn(2, 2, HARIDWAR, DEHRADUN, "10:05", "11:00"),
+        conn(3, 2, HARIDWAR, DEHRADUN, "10:10", "11:30"),
+    )
+
+    def test_too_tight_a_connection_is_missed(self):
+        found = planner(*self.ROWS).plan([DELHI], [DEHRADUN], MONDAY)
+        assert legs(found) == [[(1, MONDAY), (3, MONDAY)]]
+
+    def test_shorter_minimum_makes_it(self):
+        found = planner(*self.ROWS).plan([DELHI], [DEHRADUN], MONDAY, min_connection_ms=5 * 60 * 1000)
+        assert legs(found) == [[(1, MONDAY), (2, MONDAY)]]
+
+    def test_planner_default_waits_for_tomorrows_connection(self):
+        found = planner(*self.ROWS, min_connection_ms=15 * 60 * 1000).plan([DELHI], [DEHRADUN], MONDAY)
+        assert legs(found) == [[(1, MONDAY), (2, TUESDAY)]]
+
+
+class TestOvernight:
+    def test_overnight_leg_connects_next_morning(self):
+        rows = (
+            conn(1, 1, DELHI, HARIDWAR, "22:00", "03:00"),
+            conn(2, 2, HARIDWAR, DEHRADUN, "06:00", "07:00"),
+        )
+        found = planner(*rows).plan([DELHI], [DEHRADUN], MONDAY, at("20:00"))
+        assert legs(found) == [[(1, MONDAY), (2, TUESDAY)]]
+
+    def test_late_departure_runs_into_tomorrows_timetable(self):
+        found = planner(conn(1, 1, DELHI, DEHRADUN, "06:00", "11:00")).plan([DELHI], [DEHRADUN], MONDAY, at("12:00"))
+        assert legs(found) == [[(1, TUESDAY)]]
+
+    def test_next_day_leg_follows_its_calendar(self):
+        rows = (
+            conn(1, 1, DELHI, HARIDWAR, "22:00", "03:00"),
+            conn(2, 2, HARIDWAR, DEHRADUN, "06:00", "07:00", days="Mon"),
+        )
+        assert planner(*rows).plan([DELHI], [DEHRADUN], MONDAY, at("20:00")) == []
+
+    def test_exception_date_cancels_a_leg(self):
+        cancelled = conn(1, 1, DELHI, DEHRADUN, "08:00", "12:00", exceptions={MONDAY.isoformat(): False})
+        found = planner(cancelled).plan([DELHI], [DEHRADUN], MONDAY)
+        assert legs(found) == [[(1, TUESDAY)]]
+
+
+class FakeEngine:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    def execute(self, statement, params=None):
+        self.executed.append((statement, params))
+        return self
+
+    def fetchall(self):
+        return self.rows
+
+
+class TestRefreshRoute:
+    ROWS = (
+        conn(1, 1, DELHI, DEHRADUN, "08:00", "14:00"),
+        conn(2, 2, DELHI, HARIDWAR, "07:00", "10:00"),
+    )
+
+    def test_replaces_only_that_route(self):
+        journeys = planner(*self.ROWS)
+        generation = journeys.generation
+        engine = FakeEngine([conn(5, 1, DELHI, DEHRADUN, "09:00", "12:00")])
+        journeys.refresh_route(engine, 1)
+
+        assert engine.executed == [(ROUTE_CONNECTIONS_SQL, {"route_id": 1})]
+        assert journeys.generation == generation + 1
+        assert len(journeys) == 2
+        assert legs(journeys.plan([DELHI], [DEHRADUN], MONDAY)) == [[(5, MONDAY)]]
+        assert legs(journeys.plan([DELHI], [HARIDWAR], MONDAY)) == [[(2, MONDAY)]]
+
+    def test_new_connections_stay_in_departure_order(self):
+        journeys = planner(*self.ROWS)
+        journeys.refresh_route(FakeEngine([conn(6, 3, HARIDWAR, DEHRADUN, "10:30", "11:30")]), 3)
+        assert legs(journeys.plan([DELHI], [DEHRADUN], MONDAY)) == [[(1, MONDAY)], [(2, MONDAY), (6, MONDAY)]]
+
+    def test_deleted_route_disappears(self):
+        journeys = planner(*self.ROWS)
+        journeys.refresh_route(FakeEngine([]), 1)
+        assert journeys.plan([DELHI], [DEHRADUN], MONDAY) == []
+
+    def test_skipped_until_loaded(self):
+        engine = FakeEngine([conn(5, 1, DELHI, DEHRADUN, "09:00", "12:00")])
+        JourneyPlanner().refresh_route(engine, 1)
+        assert engine.executed == []
+
+
+@pytest.mark.parametrize("departure, arrival, arrival_ms", [
+    ("08:00", "14:00", 14 * 3600 * 1000),
+    ("22:00", "03:00", 27 * 3600 * 1000),
+])
+def test_arrival_before_departure_is_the_next_day(departure, arrival, arrival_ms):
+    journeys = planner(conn(1, 1, DELHI, DEHRADUN, departure, arrival))
+    assert journeys.plan([DELHI], [DEHRADUN], MONDAY)[0][0][0].arrival_ms == arrival_ms
@@ -0,0 +1,55 @@
+"""days_of_week parsing and the running-day test."""
+from datetime import date, timedelta
+
+import pytest
+
+from schedule_calendar import ALL_DAYS, parse_days, runs_on
+
+MONDAY = date(2026, 10, 19)
+SATURDAY = MONDAY + timedelta(days=5)
+
+MON, TUE, WED, THU, FRI, SAT, SUN = (1 << bit for bit in range(7))
+
+
+@pytest.mark.parametrize("value, mask", [
+    ("Daily", ALL_DAYS),
+    ("everyday", ALL_DAYS),
+    ("Weekdays", MON | TUE | WED | THU | FRI),
+    ("Weekends", SAT | SUN),
+    ("Mon-Fri", MON | TUE | WED | THU | FRI),
+    ("Sat,Sun", SAT | SUN),
+    ("monday, wednesday / friday", MON | WED | FRI),
+    ("Tuesday-Thursday", TUE | WED | THU),
+    ("Fri-Mon", FRI | SAT | SUN | MON),
+    ("Sun", SUN),
+])
+def test_parse_days(value, mask):
+    assert parse_days(value) == mask
+
+
+@pytest.mark.parametrize("value", [None, ""])
+def test_missing_days_mean_daily(value):
+    assert parse_days(value) == ALL_DAYS
+
+
+@pytest.mark.parametrize("value", ["Funday", "Mon-Xyz", "Mon,Someday", "   "])
+def test_unreadable_days(value):
+    assert parse_days(value) is None
+
+
+def test_runs_on_follows_the_mask():
+    weekdays = parse_days("Mon-Fri")
+    assert runs_on(weekdays, {}, MONDAY)
+    assert not runs_on(weekdays, {}, SATURDAY)
+
+
+def test_null_mask_runs_daily():
+    assert all(runs_on(None, None, MONDAY + timedelta(days=offset)) for offset in range(7))
+
+
+def test_exceptions_override_the_mask():
+    weekdays = parse_days("Mon-Fri")
+    exceptions = {MONDAY.isoformat(): False, SATURDAY.isoformat(): True}
+    assert not runs_on(weekdays, exceptions, MONDAY)
+    assert runs_on(weekdays, exceptions, SATURDAY)
+    assert runs_on(weekdays, exceptions, MONDAY + timedelta(days=1))
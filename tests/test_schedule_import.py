@@ -0,0 +1,107 @@
+"""Column-wise validation of imported schedule rows."""
+import io
+from datetime import date, time
+
+import pandas as pd
+import pytest
+
+from schedule_calendar import ALL_DAYS, parse_days
+from schedule_import import DEFAULT_SEATS_BOOKED, DEFAULT_SEATS_TOTAL, read_batches, validate_batch
+
+VALID = {"route_code": "ndls-ddn", "operator": "Shatabdi", "departure_time": "06:45", "arrival_time": "12:40"}
+
+
+def frame(*rows):
+    return pd.DataFrame([{**VALID, **row} for row in rows])
+
+
+def errors_of(*rows):
+    return validate_batch(frame(*rows), 1)[1]
+
+
+@pytest.mark.parametrize("row, message", [
+    ({"route_code": None}, "route_code, route_id or source, destination and transport_type is required"),
+    ({"route_code": None, "source": "Delhi", "destination": "Dehradun"},
+     "route_code, route_id or source, destination and transport_type is required"),
+    ({"route_id": "12a"}, "route_id must be an integer"),
+    ({"route_code": None, "route_id": "0"}, "Valid route_id required"),
+    ({"transport_type": "ship"}, "transport_type must be 'bus' or 'train'"),
+    ({"operator": "  "}, "operator is required"),
+    ({"days_of_week": "Funday"},
+     "days_of_week must be Daily, Weekdays, Weekends or days like Mon,Wed,Fri or Mon-Fri"),
+    ({"departure_time": "7pm"}, "departure_time and arrival_time must be HH:MM format"),
+    ({"arrival_time": None}, "departure_time and arrival_time must be HH:MM format"),
+    ({"travel_date": "05/11/2026"}, "travel_date must be YYYY-MM-DD format"),
+    ({"seats_total": "many"}, "seats_total must be an integer"),
+    ({"seats_booked": "1.5"}, "seats_booked must be an integer"),
+    ({"seats_total": "-1", "seats_booked": "0"}, "Seat counts must be non-negative"),
+    ({"seats_total": "40", "seats_booked": "41"}, "seats_booked cannot exceed seats_total"),
+])
+def test_rule_messages(row, message):
+    assert errors_of(row) == [{"row": 1, "error": message}]
+
+
+def test_first_failing_rule_is_reported():
+    broken = {"operator": None, "departure_time": "7pm", "seats_total": "many"}
+    assert errors_of(broken) == [{"row": 1, "error": "operator is required"}]
+
+
+def test_valid_row_is_staged_with_defaults():
+    staged, errors = validate_batch(frame({"days_of_week": None, "transport_type": " Bus "}), 1)
+    assert errors == []
+    row = staged.iloc[0]
+    assert (row["route_code"], row["transport_type"]) == ("NDLS-DDN", "bus")
+    assert (row["days_of_week"], row["days_mask"]) == ("Daily", ALL_DAYS)
+    assert (row["departure_time"], row["arrival_time"]) == (time(6, 45), time(12, 40))
+    assert (row["seats_total"], row["seats_booked"]) == (DEFAULT_SEATS_TOTAL, DEFAULT_SEATS_BOOKED)
+    assert pd.isna(row["travel_date"])
+
+
+def test_route_by_id_or_by_names():
+    staged, errors = validate_batch(frame(
+        {"route_code": None, "route_id": "7"},
+        {"route_code": None, "source": "Delhi", "destination": "Dehradun", "transport_type": "TRAIN"},
+        {"route_id": "7"},
+    ), 1)
+    assert errors == []
+    assert staged["route_id"].iloc[0] == 7
+    assert pd.isna(staged["route_id"].iloc[1]) and staged["transport_type"].iloc[1] == "train"
+    assert pd.isna(staged["route_id"].iloc[2])  # route_code wins over route_id
+
+
+def test_dated_row_keeps_its_seats():
+    staged, _ = validate_batch(frame({
+        "travel_date": "2026-11-05", "days_of_week": "Mon-Fri", "seats_total": "30", "seats_booked": "+4"
+    }), 1)
+    row = staged.iloc[0]
+    assert row["travel_date"] == date(2026, 11, 5)
+    assert row["days_mask"] == parse_days("Mon-Fri")
+    assert (row["seats_total"], row["seats_booked"]) == (30, 4)
+
+
+def test_rows_are_numbered_from_first_row():
+    staged, errors = validate_batch(frame({}, {"operator": None}, {}), 101)
+    assert staged["row_number"].tolist() == [101, 103]
+    assert errors == [{"row": 102, "error": "operator is required"}]
+
+
+def test_row_numbers_carry_across_batches():
+    lines = ["route_code,operator,departure_time,arrival_time,days_of_week"]
+    bad = {5, 2500, 4999}
+    lines += [
+        f"R{row},Operator {row:05d} with a longer name,06:45,12:40,{'Funday' if row in bad else 'Daily'}"
+        for row in range(1, 5001)
+    ]
+    source = io.BytesIO("\n".join(lines).encode())
+
+    reported, staged_rows, batches, next_row = [], 0, 0, 1
+    for batch in read_batches(source, "csv", batch_rows=1):
+        staged, errors = validate_batch(batch, next_row)
+        next_row += len(batch)
+        staged_rows += len(staged)
+        batches += 1
+        reported.extend(error["row"] for error in errors)
+
+    assert batches > 1
+    assert reported == sorted(bad)
+    assert staged_rows == 5000 - len(bad)
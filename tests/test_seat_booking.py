@@ -0,0 +1,149 @@
+"""SeatHolds answers, driven by a fake connection that replays canned rows."""
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import pytest
+
+import seat_booking
+from seat_booking import SeatHolds, hold_payload
+
+TRAVEL_DATE = date(2026, 11, 5)
+EXPIRES_AT = datetime(2026, 10, 18, 12, 10)
+BOOKED_AT = datetime(2026, 10, 18, 12, 5)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+
+class FakeEngine:
+    """Answers each statement with the rows given for it and records the calls."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.executed = []
+
+    def execute(self, statement, params=None):
+        self.executed.append((statement, params))
+        return FakeResult(self.answers.get(statement, []))
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    connect = begin
+
+
+def hold_row(status, expires_at=EXPIRES_AT, booked_at=None):
+    return (9, 7, TRAVEL_DATE, 2, status, expires_at, booked_at)
+
+
+def statements(engine):
+    return [statement for statement, _ in engine.executed]
+
+
+def test_hold_payload():
+    assert hold_payload(hold_row("booked", None, BOOKED_AT)) == {
+        "hold_id": 9,
+        "schedule_id": 7,
+        "date": "2026-11-05",
+        "seats": 2,
+        "status": "booked",
+        "expires_at": None,
+        "booked_at": "2026-10-18T12:05:00"
+    }
+
+
+class TestHold:
+    def test_takes_the_seats(self):
+        holds = SeatHolds(hold_seconds=120)
+        engine = FakeEngine({seat_booking.HOLD_SQL: [(9, EXPIRES_AT, 38)]})
+        assert holds.hold(engine, 1, 7, TRAVEL_DATE, 2) == ({
+            "hold_id": 9,
+            "schedule_id": 7,
+            "date": "2026-11-05",
+            "seats": 2,
+            "status": "held",
+            "expires_at": "2026-10-18T12:10:00",
+            "seats_available": 38
+        }, 201)
+        assert engine.executed == [(seat_booking.HOLD_SQL, {
+            "user_id": 1, "schedule_id": 7, "travel_date": TRAVEL_DATE, "seats": 2, "hold_seconds": 120
+        })]
+        assert holds.stats()["held"] == 1
+
+    def test_no_availability_row(self):
+        holds = SeatHolds()
+        engine = FakeEngine({})
+        assert holds.hold(engine, 1, 7, TRAVEL_DATE) == ({"error": "No seats on sale for this schedule and date"}, 404)
+        assert statements(engine) == [seat_booking.HOLD_SQL, seat_booking.SEATS_LEFT_SQL]
+        assert holds.stats()["sold_out"] == 0
+
+    def test_sold_out(self):
+        holds = SeatHolds()
+        engine = FakeEngine({seat_booking.SEATS_LEFT_SQL: [(1,)]})
+        assert holds.hold(engine, 1, 7, TRAVEL_DATE, 2) == (
+            {"error": "Not enough seats available", "seats_available": 1}, 409
+        )
+        assert holds.stats()["sold_out"] == 1
+
+
+class TestConfirm:
+    def test_books_a_live_hold(self):
+        holds = SeatHolds()
+        engine = FakeEngine({seat_booking.CONFIRM_SQL: [hold_row("booked", None, BOOKED_AT)]})
+        body, status = holds.confirm(engine, 1, 9)
+        assert (status, body["status"], body["booked_at"]) == (200, "booked", "2026-10-18T12:05:00")
+        assert holds.stats()["booked"] == 1
+
+    def test_booking_again_is_a_no_op(self):
+        holds = SeatHolds()
+        engine = FakeEngine({seat_booking.HOLD_STATE_SQL: [hold_row("booked", None, BOOKED_AT)]})
+        assert holds.confirm(engine, 1, 9) == (hold_payload(hold_row("booked", None, BOOKED_AT)), 200)
+        assert holds.stats()["booked"] == 0
+
+    @pytest.mark.parametrize("state", ["expired", "released"])
+    def test_dead_hold_conflicts(self, state):
+        engine = FakeEngine({seat_booking.HOLD_STATE_SQL: [hold_row(state)]})
+        body, status = SeatHolds().confirm(engine, 1, 9)
+        assert (status, body["error"], body["status"]) == (409, f"Hold is {state}", state)
+
+    def test_unknown_hold(self):
+        assert SeatHolds().confirm(FakeEngine({}), 1, 9) == ({"error": "Hold not found"}, 404)
+
+
+class TestRelease:
+    def test_returns_the_seats(self):
+        holds = SeatHolds()
+        engine = FakeEngine({seat_booking.RELEASE_SQL: [(7, TRAVEL_DATE, 2, 40)]})
+        assert holds.release(engine, 1, 9) == ({
+            "hold_id": 9,
+            "schedule_id": 7,
+            "date": "2026-11-05",
+            "seats": 2,
+            "status": "released",
+            "seats_available": 40
+        }, 200)
+        assert statements(engine) == [seat_booking.RELEASE_SQL]
+        assert holds.stats()["released"] == 1
+
+    def test_expired_hold_conflicts(self):
+        holds = SeatHolds()
+        engine = FakeEngine({seat_booking.HOLD_STATE_SQL: [hold_row("expired")]})
+        body, status = holds.release(engine, 1, 9)
+        assert status == 409
+        assert body == {"error": "Hold is expired", **hold_payload(hold_row("expired"))}
+        assert holds.stats()["released"] == 0
+
+    def test_unknown_hold(self):
+        assert SeatHolds().release(FakeEngine({}), 1, 9) == ({"error": "Hold not found"}, 404)
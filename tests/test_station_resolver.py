@@ -0,0 +1,84 @@
+"""Station name ranking and the route pair index."""
+import pytest
+
+from station_resolver import SCORE_EXACT, SCORE_PREFIX, StationResolver, normalize_name
+
+STATIONS = [
+    (1, "New Delhi"),
+    (2, "New Delhi Junction"),
+    (3, "Delhi ISBT Kashmiri Gate"),
+    (4, "Dehradun ISBT"),
+    (5, "Old Delhi"),
+    (6, "Haridwar Junction"),
+]
+
+
+@pytest.fixture
+def resolver():
+    resolver = StationResolver()
+    resolver.load_rows(STATIONS, [(1, 4, "bus"), (3, 4, "bus")])
+    return resolver
+
+
+@pytest.mark.parametrize("value, normalized", [
+    ("New Delhi Jn.", "new delhi junction"),
+    ("  DEHRADUN   ISBT ", "dehradun isbt"),
+    ("Agra Cantt", "agra cantonment"),
+    ("देहरादून", "dehradun"),
+    ("", ""),
+])
+def test_normalize_name(value, normalized):
+    assert normalize_name(value) == normalized
+
+
+def test_abbreviation_resolves_to_the_junction_first(resolver):
+    ranked = resolver.rank("new delhi jn")
+    assert ranked[0] == (2, SCORE_EXACT)
+    assert [station_id for station_id, _ in ranked] == [2, 1]
+
+
+def test_exact_name_beats_longer_prefix_match(resolver):
+    assert resolver.resolve("new delhi")[:2] == [1, 2]
+    assert resolver.rank("new delhi")[0] == (1, SCORE_EXACT)
+
+
+def test_prefix_matches_rank_above_token_matches(resolver):
+    ranked = resolver.rank("delhi")
+    assert ranked[0] == (3, SCORE_PREFIX)
+    assert {station_id for station_id, _ in ranked} == {1, 2, 3, 5}
+
+
+def test_partial_words(resolver):
+    assert resolver.resolve("new del") == [1, 2]
+    assert resolver.resolve("kashmiri") == [3]
+
+
+def test_hindi_city_name(resolver):
+    assert resolver.resolve("देहरादून") == [4]
+
+
+def test_misspelling_matches_fuzzily(resolver):
+    assert resolver.resolve("haridwaar junction")[0] == 6
+
+
+@pytest.mark.parametrize("query", ["", "   ", "zzz"])
+def test_no_match(resolver, query):
+    assert resolver.rank(query) == []
+
+
+def test_limit(resolver):
+    assert len(resolver.resolve("delhi", limit=2)) == 2
+
+
+def test_route_pairs(resolver):
+    assert resolver.route_pairs() == {(1, 4, "bus"), (3, 4, "bus")}
+    resolver.add_route(2, 4, "Train")
+    assert (2, 4, "train") in resolver.route_pairs()
+
+
+def test_route_pairs_unknown_without_routes():
+    resolver = StationResolver()
+    resolver.load_rows(STATIONS)
+    assert resolver.route_pairs() is None
+    resolver.add_route(1, 4, "bus")
+    assert resolver.route_pairs() is None
@@ -0,0 +1,98 @@
+"""Transcript parsing into source, destination, type, date and intent."""
+from datetime import date
+
+import pytest
+
+from station_resolver import StationResolver
+from voice_parser import QueryParser
+
+TODAY = date(2026, 10, 18)
+
+
+@pytest.fixture(scope="module")
+def parser():
+    return QueryParser(["New Delhi", "Dehradun ISBT", "Haridwar Junction"])
+
+
+def parse(parser, transcript):
+    return parser.parse(transcript, today=TODAY)
+
+
+def test_full_english_query(parser):
+    assert parse(parser, "next bus from new delhi to dehradun on 17th november") == {
+        "source": "New Delhi",
+        "destination": "Dehradun",
+        "type": "bus",
+        "date": "2026-11-17",
+        "intent": "next",
+    }
+
+
+def test_hindi_query(parser):
+    assert parse(parser, "देहरादून से दिल्ली कल की ट्रेन का किराया") == {
+        "source": "Dehradun",
+        "destination": "Delhi",
+        "type": "train",
+        "date": "2026-10-19",
+        "intent": "fare",
+    }
+
+
+def test_roles_follow_markers_not_word_order(parser):
+    parsed = parse(parser, "trains to mumbai from pune tomorrow")
+    assert (parsed["source"], parsed["destination"]) == ("Pune", "Mumbai")
+
+
+def test_places_without_markers_are_taken_in_order(parser):
+    parsed = parse(parser, "delhi dehradun bus")
+    assert (parsed["source"], parsed["destination"], parsed["type"]) == ("Delhi", "Dehradun", "bus")
+
+
+def test_station_abbreviation(parser):
+    assert parse(parser, "from haridwar jn to delhi")["source"] == "Haridwar Junction"
+
+
+def test_unknown_place_is_kept_for_the_resolver(parser):
+    assert parse(parser, "bus from delhi to hogwarts")["destination"] == "Hogwarts"
+
+
+@pytest.mark.parametrize("transcript, intent", [
+    ("fare from dehradun to delhi", "fare"),
+    ("how much is the train from agra to jaipur", "fare"),
+    ("first train from delhi to mumbai", "next"),
+    ("buses from delhi to dehradun", "search"),
+])
+def test_intent(parser, transcript, intent):
+    assert parse(parser, transcript)["intent"] == intent
+
+
+@pytest.mark.parametrize("transcript, travel_date", [
+    ("delhi to dehradun today", "2026-10-18"),
+    ("delhi to dehradun day after tomorrow", "2026-10-20"),
+    ("delhi to dehradun on 5 jan 2027", "2027-01-05"),
+    ("delhi to dehradun on november 3", "2026-11-03"),
+    ("delhi to dehradun 17 नवंबर", "2026-11-17"),
+    ("delhi to dehradun", None),
+])
+def test_dates(parser, transcript, travel_date):
+    assert parse(parser, transcript)["date"] == travel_date
+
+
+def test_past_day_rolls_to_next_year(parser):
+    assert parse(parser, "delhi to dehradun on 10 october")["date"] == "2027-10-10"
+
+
+def test_impossible_date_is_ignored(parser):
+    assert parse(parser, "delhi to dehradun on 31 february")["date"] is None
+
+
+def test_sync_picks_up_new_stations():
+    resolver = StationResolver()
+    resolver.load_rows([(1, "Rishikesh")])
+    parser = QueryParser()
+    parser.sync(resolver)
+    assert parse(parser, "rishikesh se chamoli")["source"] == "Rishikesh"
+
+    resolver.load_rows([(1, "Rishikesh"), (2, "Chamoli Bus Stand")])
+    parser.sync(resolver)
+    assert parse(parser, "from chamoli to rishikesh")["source"] == "Chamoli"
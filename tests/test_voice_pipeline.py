@@ -0,0 +1,179 @@
+"""VoicePipeline ordering, overtaking and barge-in, with stub stages.
+
+Utterances are plain strings; the stubs can hold a stage open on an Event
+so each test fixes the order in which the concurrent stages finish.
+"""
+import threading
+from collections import defaultdict
+
+import pytest
+
+pytest.importorskip("speech_recognition")
+
+from voice_pipeline import VoicePipeline  # noqa: E402
+
+TIMEOUT = 5
+NOISE = "<noise>"
+
+
+class StubRecognizer:
+    """Transcribes an utterance to itself; ``NOISE`` is not understood."""
+
+    def __init__(self, gates=None):
+        self.gates = gates or {}
+        self.heard = defaultdict(threading.Event)
+
+    def __call__(self, audio):
+        if audio in self.gates:
+            assert self.gates[audio].wait(TIMEOUT)
+        self.heard[audio].set()
+        return None if audio == NOISE else audio
+
+
+class StubAnswer:
+    """Answers ``q`` with ``"answer to q"``."""
+
+    def __init__(self, gates=None):
+        self.gates = gates or {}
+
+    def __call__(self, transcript):
+        if transcript in self.gates:
+            assert self.gates[transcript].wait(TIMEOUT)
+        return f"answer to {transcript}"
+
+
+class StubSpeech:
+    """Records what is said; with ``hold`` a reply keeps talking until cancelled."""
+
+    def __init__(self, hold=False):
+        self.said = []
+        self.interrupted = []
+        self.cancels = 0
+        self._released = threading.Event()
+        if not hold:
+            self._released.set()
+        self._speaking = None
+        self._changed = threading.Condition()
+
+    def say(self, text):
+        with self._changed:
+            self._speaking = text
+            self.said.append(text)
+            self._changed.notify_all()
+        self._released.wait(TIMEOUT)
+        with self._changed:
+            self._speaking = None
+
+    def cancel(self):
+        with self._changed:
+            self.cancels += 1
+            if self._speaking is not None:
+                self.interrupted.append(self._speaking)
+                self._released.set()
+
+    def wait_for(self, count):
+        with self._changed:
+            return self._changed.wait_for(lambda: len(self.said) >= count, TIMEOUT)
+
+
+@pytest.fixture
+def make_pipeline():
+    pipelines = []
+
+    def make(recognizer=None, answer=None, speech=None, **kwargs):
+        pipeline = VoicePipeline(
+            recognizer or StubRecognizer(), answer or StubAnswer(), speech or StubSpeech(), **kwargs
+        )
+        pipelines.append(pipeline)
+        return pipeline
+
+    yield make
+    for pipeline in pipelines:
+        pipeline.close()
+
+
+def test_answers_are_spoken_in_question_order(make_pipeline):
+    speech = StubSpeech()
+    pipeline = make_pipeline(speech=speech)
+
+    for count, question in enumerate(("delhi to dehradun", "next bus", "fare"), start=1):
+        pipeline.submit(question)
+        assert speech.wait_for(count)
+    pipeline.close()
+
+    assert speech.said == ["answer to delhi to dehradun", "answer to next bus", "answer to fare"]
+
+
+def test_slow_answer_is_dropped_once_a_newer_question_is_recognized(make_pipeline):
+    speech = StubSpeech()
+    slow = threading.Event()
+    recognized = threading.Event()
+    pipeline = make_pipeline(
+        answer=StubAnswer({"first": slow}), speech=speech,
+        on_transcript=lambda transcript: transcript == "second" and recognized.set()
+    )
+
+    pipeline.submit("first")
+    pipeline.submit("second")
+    assert recognized.wait(TIMEOUT)
+    slow.set()
+    pipeline.close()
+
+    assert speech.said == ["answer to second"]
+
+
+def test_earlier_question_recognized_last_is_still_overtaken(make_pipeline):
+    speech = StubSpeech()
+    slow = threading.Event()
+    recognizer = StubRecognizer({"first": slow})
+    pipeline = make_pipeline(recognizer=recognizer, speech=speech)
+
+    pipeline.submit("first")
+    pipeline.submit("second")
+    assert recognizer.heard["second"].wait(TIMEOUT)
+    slow.set()
+    pipeline.close()
+
+    assert speech.said == ["answer to second"]
+
+
+def test_noise_neither_overtakes_nor_interrupts(make_pipeline):
+    speech = StubSpeech()
+    slow = threading.Event()
+    recognizer = StubRecognizer()
+    pipeline = make_pipeline(recognizer=recognizer, answer=StubAnswer({"first": slow}), speech=speech)
+
+    pipeline.submit("first")
+    pipeline.submit(NOISE)
+    assert recognizer.heard[NOISE].wait(TIMEOUT)
+    slow.set()
+    pipeline.close()
+
+    assert speech.said == ["answer to first"]
+    assert speech.cancels == 1  # only "first" itself barged in
+
+
+def test_new_question_cancels_the_reply_being_spoken(make_pipeline):
+    speech = StubSpeech(hold=True)
+    pipeline = make_pipeline(speech=speech)
+
+    pipeline.submit("first")
+    assert speech.wait_for(1)
+    pipeline.submit("second")
+    assert speech.wait_for(2)
+    pipeline.close()
+
+    assert speech.interrupted == ["answer to first"]
+    assert speech.said == ["answer to first", "answer to second"]
+
+
+def test_without_barge_in_the_reply_is_not_cancelled(make_pipeline):
+    speech = StubSpeech()
+    pipeline = make_pipeline(speech=speech, barge_in=False)
+
+    pipeline.submit("first")
+    assert speech.wait_for(1)
+    pipeline.close()
+
+    assert speech.cancels == 0
+    assert speech.said == ["answer to first"]
@@ -0,0 +1,89 @@
+"""Route-pair timetable cache.
+
+Holds the denormalized schedule rows (schedule, route and future
+availability) for each ``(source_station_id, destination_station_id,
+transport_type)`` key so repeated enquiries for popular pairs skip the
+database entirely. Entries expire after a TTL, the least recently used
+entries are evicted once the cache is full, and the admin write paths
+invalidate exactly the keys they touch.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TimetableCache:
+    """Thread-safe LRU + TTL cache keyed by route pair and transport type."""
+
+    def __init__(self, max_entries=4096, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get_many(self, keys):
+        """Return ``(found, missing)`` for the requested keys.
+
+        ``found`` maps each fresh key to its cached rows; ``missing`` lists
+        the keys that have to be loaded from the database.
+        """
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    found[key] = entry[1]
+                    self.hits += 1
+                else:
+                    if entry is not None:
+                        del self._entries[key]
+                    missing.append(key)
+                    self.misses += 1
+        return found, missing
+
+    def put(self, key, rows):
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, source_station_id, destination_station_id, transport_type):
+        """Drop the entry for one route pair after an admin write."""
+        key = (source_station_id, destination_station_id, (transport_type or '').lower())
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
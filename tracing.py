@@ -0,0 +1,176 @@
+"""Structured, sampled request tracing.
+
+A sampled request gets a trace id and timed spans (parse, resolve, db, fare,
+serialize) and is written as one JSON line on the ``tracing`` logger when it
+finishes. Requests that are not sampled cost one ``random()`` call: every
+span is a shared no-op.
+
+    TRACE_SAMPLE_RATE   fraction of enquiries traced, 0 disables (default 0.01)
+    TRACE_SQL           log every statement and its parameters at DEBUG (default false)
+
+The current trace lives in a context variable, so it follows the request
+through Flask worker threads and Quart tasks alike.
+"""
+import contextvars
+import inspect
+import json
+import logging
+import os
+import random
+import secrets
+import time
+from functools import wraps
+
+from sqlalchemy import event
+
+logger = logging.getLogger("tracing")
+
+SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0.01))
+SQL_DUMP = os.environ.get("TRACE_SQL", "false").strip().lower() in {"1", "true", "yes", "on"}
+if SQL_DUMP:
+    logger.setLevel(logging.DEBUG)
+
+_current = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    """Timings and attributes collected for one sampled request."""
+
+    def __init__(self, name):
+        self.trace_id = secrets.token_hex(8)
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.attrs = {}
+        self.queries = 0
+
+    def add(self, span, seconds):
+        total, count = self.spans.get(span, (0.0, 0))
+        self.spans[span] = (total + seconds, count + 1)
+
+    def record(self, status):
+        return {
+            "trace_id": self.trace_id,
+            "endpoint": self.name,
+            "status": status,
+            "total_ms": round(1000 * (time.perf_counter() - self.started), 3),
+            "spans": {
+                span: {"ms": round(1000 * total, 3), "count": count}
+                for span, (total, count) in self.spans.items()
+            },
+            "queries": self.queries,
+            **self.attrs
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "name", "started")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def current():
+    """The active trace, or None when this request is not sampled."""
+    return _current.get()
+
+
+def span(name):
+    """Time a block under ``name`` in the active trace (no-op when unsampled)."""
+    trace = _current.get()
+    return _NOOP if trace is None else _Span(trace, name)
+
+
+def annotate(**attrs):
+    """Attach key/value attributes to the active trace."""
+    trace = _current.get()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+def _status(response):
+    if response is None:
+        return 500
+    if isinstance(response, tuple):
+        return response[1] if len(response) > 1 and isinstance(response[1], int) else 200
+    return getattr(response, "status_code", 200)
+
+
+def _begin(name):
+    if SAMPLE_RATE <= 0 or random.random() >= SAMPLE_RATE:
+        return None
+    return _current.set(Trace(name))
+
+
+def _end(token, response):
+    if token is None:
+        return
+    trace = _current.get()
+    _current.reset(token)
+    logger.info(json.dumps(trace.record(_status(response)), default=str))
+
+
+def traced(name):
+    """Decorate a (sync or async) view so sampled requests are traced as ``name``."""
+
+    def decorator(view_func):
+        if inspect.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(*args, **kwargs):
+                token = _begin(name)
+                response = None
+                try:
+                    response = await view_func(*args, **kwargs)
+                    return response
+                finally:
+                    _end(token, response)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(*args, **kwargs):
+            token = _begin(name)
+            response = None
+            try:
+                response = view_func(*args, **kwargs)
+                return response
+            finally:
+                _end(token, response)
+        return wrapper
+
+    return decorator
+
+
+def instrument_engine(engine):
+    """Count statements per trace and, with TRACE_SQL, dump them at DEBUG."""
+    engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        trace = _current.get()
+        if trace is not None:
+            trace.queries += 1
+        if SQL_DUMP:
+            trace_id = trace.trace_id if trace is not None else "-"
+            logger.debug(f"[{trace_id}] SQL: {statement} params={parameters!r}")
@@ -1,11 +1,98 @@
+import argparse
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
 import speech_recognition as sr
-import pyttsx3
 import requests
+from requests.adapters import HTTPAdapter
+
+from speech_output import SpeechOutput
+from voice_pipeline import RECOGNIZERS, VoicePipeline
+
+# Base URL of the enquiry API (Flask app or async_app)
+API_BASE_URL = os.environ.get("VOICE_API_URL", "http://127.0.0.1:5000").rstrip("/")
+API_TIMEOUT = float(os.environ.get("VOICE_API_TIMEOUT", 10))
+VOICE_LANGUAGE = os.environ.get("VOICE_LANGUAGE", "en-IN")
+# Departures announced for "next bus/train" questions
+NEXT_DEPARTURES = 3
+
+# Fixed prompts, pre-rendered once so they play without synthesis latency
+PROMPT_NOT_UNDERSTOOD = "Sorry, I could not understand your voice."
+PROMPT_NEED_ROUTE = "Please specify both source and destination."
+PROMPT_SERVER_DOWN = "Sorry, I couldn't connect to the database. Please check if the server is running."
+PROMPT_NO_RESULTS = "No transport found for this route."
+FIXED_PROMPTS = (PROMPT_NOT_UNDERSTOOD, PROMPT_NEED_ROUTE, PROMPT_SERVER_DOWN, PROMPT_NO_RESULTS)
+
+_speech = None
+
+
+class EnquiryClient:
+    """Keep-alive HTTP client for the enquiry API.
+
+    One pooled session is reused for every query, and each spoken query is
+    answered with a single /api/ask round trip that returns the priced search
+    results; fare and next-departure answers are phrased from the same data.
+    """
+
+    def __init__(self, base_url=API_BASE_URL, timeout=API_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=1))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=1))
+        self._prefetcher = ThreadPoolExecutor(max_workers=1)
+
+    def ask(self, query):
+        res = self.session.post(
+            f"{self.base_url}/api/ask",
+            # Spoken answers never read the per-date seat lists, so leave them out
+            json={"query": query, "intent": "search", "count": NEXT_DEPARTURES, "max_dates": 0},
+            timeout=self.timeout
+        )
+        return res.json()
+
+    def warm_up(self):
+        """Open the connection and load the server's station index before the first query."""
+        try:
+            self.session.get(f"{self.base_url}/api/parse", params={"query": "delhi to dehradun"}, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            pass
+
+    def prefetch(self, parsed):
+        """Warm the likely follow-up (the return journey) in the background."""
+        if not parsed.get("source") or not parsed.get("destination"):
+            return
+        params = {
+            "source": parsed["destination"],
+            "destination": parsed["source"],
+            "type": parsed.get("type") or "",
+            "date": parsed.get("date") or ""
+        }
+        self._prefetcher.submit(self._get_quietly, "/api/search", params)
+
+    def _get_quietly(self, path, params):
+        try:
+            self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            pass
+
+    def close(self):
+        self._prefetcher.shutdown(wait=False)
+        self.session.close()
+
+
+def speech():
+    """The shared speech output worker, started on first use."""
+    global _speech
+    if _speech is None:
+        _speech = SpeechOutput(cached_phrases=FIXED_PROMPTS)
+    return _speech
 
 def speak(text):
-    engine = pyttsx3.init()
-    engine.say(text)
-    engine.runAndWait()
+    """Queue ``text`` for speech and return immediately."""
+    speech().say(text)
 
 def take_voice_input():
     r = sr.Recognizer()
@@ -17,112 +104,152 @@ def take_voice_input():
         print("You said:", query)
         return query
     except:
-        speak("Sorry, I could not understand your voice.")
+        speak(PROMPT_NOT_UNDERSTOOD)
         return None
 
-def process_query():
-    query = take_voice_input()
-    if not query:
-        return
-    
-    # Enhanced query processing
-    query_lower = query.lower()
-    
-    # Extract source and destination
-    source = None
-    destination = None
-    
-    if "from" in query_lower and "to" in query_lower:
-        words = query_lower.split()
-        try:
-            from_idx = words.index("from")
-            to_idx = words.index("to")
-            source = words[from_idx + 1]
-            destination = words[to_idx + 1]
-        except (ValueError, IndexError):
-            speak("Sorry, I couldn't understand the source and destination.")
-            return
-    
+def spoken_day(travel_date):
+    """'' for today, ' tomorrow' or ' on YYYY-MM-DD' otherwise."""
+    today = date.today()
+    if travel_date == today.isoformat():
+        return ""
+    if travel_date == (today + timedelta(days=1)).isoformat():
+        return " tomorrow"
+    return f" on {travel_date}"
+
+def compose_answer(res):
+    """Phrase the answer to a fare, next or search query from /api/ask search results."""
+    parsed = res.get("query") or {}
+    source = parsed.get("source")
+    destination = parsed.get("destination")
+    transport_type = parsed.get("type") or "transport"
+    results = res.get("results") or []
+
     if not source or not destination:
-        speak("Please specify both source and destination.")
-        return
-    
-    # Determine transport type and intent
-    transport_type = "bus"  # default
-    if "train" in query_lower or "rail" in query_lower:
-        transport_type = "train"
-    
-    is_fare_query = "fare" in query_lower or "price" in query_lower or "cost" in query_lower
-    is_next_query = "next" in query_lower or "first" in query_lower
-    
+        return PROMPT_NEED_ROUTE
+    if not results:
+        return PROMPT_NO_RESULTS
+
+    if parsed.get("intent") == "fare":
+        cheapest = min(results, key=lambda r: r["fare"])
+        response = f"The fare from {source} to {destination} by {cheapest['transport_type']} is ₹{cheapest['fare']} with {cheapest['operator']}."
+        if len(results) > 1:
+            dearest = max(results, key=lambda r: r["fare"])
+            response += f" Fares range up to ₹{dearest['fare']} with {dearest['operator']}."
+        return response
+
+    departures = res.get("departures") or []
+    if parsed.get("intent") == "next" and departures:
+        first = departures[0]
+        response = f"The next {first['transport_type']} from {source} to {destination} is {first['operator']} at {first['departure_time']}{spoken_day(first['travel_date'])}. Fare is ₹{first['fare']}."
+        if len(departures) > 1:
+            later = ", ".join(f"{dep['operator']} at {dep['departure_time']}{spoken_day(dep['travel_date'])}" for dep in departures[1:])
+            response += f" After that: {later}."
+        return response
+
+    # Results are already sorted by departure_time
+    next_one = results[0]
+    if parsed.get("intent") == "next":
+        return f"The next {next_one['transport_type']} from {source} to {destination} is {next_one['operator']} at {next_one['departure_time']}. Fare is ₹{next_one['fare']}."
+
+    if len(results) == 1:
+        return f"Found {next_one['transport_type']} from {source} to {destination}: {next_one['operator']} at {next_one['departure_time']}, fare ₹{next_one['fare']}."
+
+    response = f"The next {transport_type} from {source} to {destination} is {next_one['operator']} at {next_one['departure_time']}, fare ₹{next_one['fare']}."
+    if len(results) == 2:
+        # If only 2 options, mention the other one
+        other = results[1]
+        response += f" Another option is {other['operator']} at {other['departure_time']}."
+    elif len(results) <= 5:
+        # For 3-5 options, list them briefly
+        option_list = ", ".join([f"{opt['operator']} at {opt['departure_time']}" for opt in results[1:]])
+        response += f" Other options: {option_list}."
+    else:
+        # For more than 5, just mention count
+        response += f" There are {len(results) - 1} more {transport_type} options available."
+    return response
+
+def answer_query(client, query):
+    """Look up ``query`` and return the text to speak."""
     try:
-        if is_fare_query:
-            # Get fare information
-            url = f"http://127.0.0.1:5000/api/fare?source={source}&destination={destination}&type={transport_type}"
-            res = requests.get(url).json()
-            
-            if "fares" in res and res["fares"]:
-                fare_info = res["fares"][0]  # Get first result
-                response = f"The fare from {source} to {destination} by {fare_info['transport_type']} is ₹{fare_info['fare']} with {fare_info['operator']}."
-            else:
-                response = res.get("message", "No fare information available.")
-                
-        elif is_next_query:
-            # Get next transport
-            if transport_type == "train":
-                url = f"http://127.0.0.1:5000/api/nexttrain?source={source}&destination={destination}"
-            else:
-                url = f"http://127.0.0.1:5000/api/nextbus?source={source}&destination={destination}"
-            
-            res = requests.get(url).json()
-            
-            if "operator" in res:
-                response = f"The next {transport_type} from {source} to {destination} is {res['operator']} at {res['departure_time']}. Fare is ₹{res.get('fare', 'N/A')}."
-            else:
-                response = res.get("message", f"No {transport_type} found for this route.")
-        else:
-            # General search - show next/earliest option by default
-            url = f"http://127.0.0.1:5000/api/search?source={source}&destination={destination}&type={transport_type}"
-            res = requests.get(url).json()
-            
-            if "results" in res and res["results"]:
-                results = res["results"]
-                if len(results) == 1:
-                    result = results[0]
-                    response = f"Found {result['transport_type']} from {source} to {destination}: {result['operator']} at {result['departure_time']}, fare ₹{result['fare']}."
-                else:
-                    # Show the next/earliest bus (first result is already sorted by departure_time)
-                    next_bus = results[0]
-                    response = f"The next {transport_type} from {source} to {destination} is {next_bus['operator']} at {next_bus['departure_time']}, fare ₹{next_bus['fare']}."
-                    
-                    # If there are more options, mention them briefly
-                    if len(results) > 1:
-                        if len(results) == 2:
-                            # If only 2 options, mention the other one
-                            other_bus = results[1]
-                            response += f" Another option is {other_bus['operator']} at {other_bus['departure_time']}."
-                        elif len(results) <= 5:
-                            # For 3-5 options, list them briefly
-                            other_options = results[1:]
-                            option_list = ", ".join([f"{opt['operator']} at {opt['departure_time']}" for opt in other_options])
-                            response += f" Other options: {option_list}."
-                        else:
-                            # For more than 5, just mention count
-                            response += f" There are {len(results) - 1} more {transport_type} options available."
-            else:
-                response = res.get("message", f"No {transport_type} found for this route.")
-        
-        print(response)
-        speak(response)
-        
+        res = client.ask(query)
+        response = compose_answer(res)
+        client.prefetch(res.get("query") or {})
     except requests.exceptions.ConnectionError:
-        error_msg = "Sorry, I couldn't connect to the database. Please check if the server is running."
-        print(error_msg)
-        speak(error_msg)
+        response = PROMPT_SERVER_DOWN
     except Exception as e:
-        error_msg = f"Sorry, an error occurred: {str(e)}"
-        print(error_msg)
-        speak(error_msg)
+        response = f"Sorry, an error occurred: {str(e)}"
+    print(response)
+    return response
+
+def process_query(client=None):
+    query = take_voice_input()
+    if not query:
+        return
+    # Barge-in: a new question cuts off whatever is still being said
+    speech().cancel()
+
+    own_client = client is None
+    client = client or EnquiryClient()
+    try:
+        speak(answer_query(client, query))
+    finally:
+        if own_client:
+            client.close()
+
+def run_daemon(base_url=API_BASE_URL):
+    """Kiosk mode: answer queries in a loop over one keep-alive session."""
+    client = EnquiryClient(base_url)
+    client.warm_up()
+    print(f"🚏 Voice enquiry daemon connected to {client.base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            process_query(client)
+    except KeyboardInterrupt:
+        print("Stopping voice enquiry daemon")
+    finally:
+        client.close()
+        speech().close()
+
+def run_continuous(base_url=API_BASE_URL, recognizer="google", language=VOICE_LANGUAGE, barge_in=True):
+    """Capture, recognize, look up and speak as overlapping stages until Ctrl+C."""
+    client = EnquiryClient(base_url)
+    client.warm_up()
+    pipeline = VoicePipeline(
+        recognizer=RECOGNIZERS[recognizer](language) if isinstance(recognizer, str) else recognizer,
+        answer=lambda query: answer_query(client, query),
+        speech=speech(),
+        barge_in=barge_in,
+        on_transcript=lambda query: print("You said:", query)
+    )
+    pipeline.listen()
+    print(f"🎤 Listening continuously, answers from {client.base_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("Stopping voice enquiry")
+    finally:
+        pipeline.close()
+        client.close()
+        speech().close()
 
 if __name__ == "__main__":
-    process_query()
+    parser = argparse.ArgumentParser(description="Voice transport enquiry")
+    parser.add_argument("--daemon", action="store_true", help="keep listening for queries")
+    parser.add_argument("--continuous", action="store_true", help="listen continuously with overlapped recognition")
+    parser.add_argument("--recognizer", choices=sorted(RECOGNIZERS), default="google", help="speech recognizer for --continuous")
+    parser.add_argument("--language", default=VOICE_LANGUAGE, help="recognition language, e.g. en-IN or hi-IN")
+    parser.add_argument("--no-barge-in", action="store_true", help="let answers finish when a new question is heard")
+    parser.add_argument("--base-url", default=API_BASE_URL, help="enquiry API base URL")
+    args = parser.parse_args()
+    if args.continuous:
+        run_continuous(args.base_url, args.recognizer, args.language, barge_in=not args.no_barge_in)
+    elif args.daemon:
+        run_daemon(args.base_url)
+    else:
+        client = EnquiryClient(args.base_url)
+        try:
+            process_query(client)
+            speech().wait()
+        finally:
+            client.close()
+            speech().close()
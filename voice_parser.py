@@ -0,0 +1,324 @@
+"""Voice query parser.
+
+Turns a spoken transcript such as "next bus from new delhi to dehradun on
+17th november" or "देहरादून से दिल्ली कल की ट्रेन का किराया" into
+``{source, destination, type, date, intent}``.
+
+Station names, city aliases (English and Hindi) and the keyword lexicon are
+compiled once into a word-level Aho-Corasick automaton, so a transcript is
+scanned in a single pass however many stations exist. Roles are then
+assigned from the markers around each place: English "from X" / "to X" and
+Hindi "X से" / "X तक". Places missing from the gazetteer are still picked
+up from the words next to a marker and left for the station resolver.
+"""
+import re
+import threading
+import unicodedata
+from collections import deque
+from datetime import date, timedelta
+
+from station_resolver import ABBREVIATIONS, HINDI_CITY_NAMES
+
+_TOKEN_SPLIT = re.compile(r'[^0-9a-z\u0900-\u0963\u0966-\u097F]+')  # dandas split too
+_DAY = re.compile(r'^(\d{1,2})(?:st|nd|rd|th)?$')
+_YEAR = re.compile(r'^\d{4}$')
+
+# Words that describe a station rather than name its city
+GENERIC_STATION_WORDS = {
+    'junction', 'station', 'railway', 'central', 'cantonment', 'terminus',
+    'terminal', 'isbt', 'bus', 'stand', 'depot', 'road', 'city'
+}
+
+TYPE_WORDS = {
+    'bus': 'bus', 'buses': 'bus', 'coach': 'bus', 'बस': 'bus', 'बसें': 'bus',
+    'train': 'train', 'trains': 'train', 'rail': 'train', 'railway': 'train',
+    'ट्रेन': 'train', 'रेल': 'train', 'रेलगाड़ी': 'train',
+}
+
+INTENT_WORDS = {
+    'fare': 'fare', 'fares': 'fare', 'price': 'fare', 'cost': 'fare', 'how much': 'fare',
+    'ticket price': 'fare', 'किराया': 'fare', 'भाड़ा': 'fare',
+    'next': 'next', 'first': 'next', 'earliest': 'next',
+    'अगली': 'next', 'अगला': 'next', 'पहली': 'next', 'पहला': 'next',
+}
+
+# "from X", "to X" (marker before the place)
+SOURCE_PREFIXES = {'from'}
+DESTINATION_PREFIXES = {'to', 'till', 'until', 'towards'}
+# "X से", "X तक" (marker after the place)
+SOURCE_POSTFIXES = {'से'}
+DESTINATION_POSTFIXES = {'तक', 'को', 'के लिए'}
+
+RELATIVE_DAYS = {
+    'today': 0, 'tonight': 0, 'tomorrow': 1, 'day after tomorrow': 2,
+    'आज': 0, 'कल': 1, 'परसों': 2,
+}
+
+MONTHS = {
+    name: index + 1
+    for index, names in enumerate((
+        ('january', 'jan', 'जनवरी'), ('february', 'feb', 'फरवरी'),
+        ('march', 'mar', 'मार्च'), ('april', 'apr', 'अप्रैल'),
+        ('may', 'मई'), ('june', 'jun', 'जून'), ('july', 'jul', 'जुलाई'),
+        ('august', 'aug', 'अगस्त'), ('september', 'sep', 'sept', 'सितंबर', 'सितम्बर'),
+        ('october', 'oct', 'अक्टूबर', 'अक्तूबर'), ('november', 'nov', 'नवंबर', 'नवम्बर'),
+        ('december', 'dec', 'दिसंबर', 'दिसम्बर'),
+    ))
+    for name in names
+}
+
+# Words that never belong to a place name
+FILLER_WORDS = {
+    'a', 'an', 'the', 'is', 'are', 'what', 'which', 'when', 'show', 'me', 'find',
+    'search', 'please', 'i', 'want', 'need', 'go', 'going', 'travel', 'book', 'get',
+    'there', 'any', 'of', 'on', 'for', 'by', 'at', 'in', 'and', 'tell', 'leave', 'leaves',
+    'की', 'का', 'के', 'है', 'हैं', 'में', 'मुझे', 'कब', 'क्या', 'कितना', 'बताओ', 'बताइए',
+    'जाना', 'जाने', 'वाली', 'वाला', 'लिए', 'तारीख',
+}
+
+
+def tokenize(text):
+    """Lowercased, abbreviation-expanded word tokens of a transcript."""
+    text = unicodedata.normalize('NFKC', str(text or '')).lower()
+    return [ABBREVIATIONS.get(tok, tok) for tok in _TOKEN_SPLIT.split(text) if tok]
+
+
+class Automaton:
+    """Word-level Aho-Corasick automaton over token phrases."""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+    def add(self, tokens, payload):
+        state = 0
+        for token in tokens:
+            nxt = self._goto[state].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][token] = nxt
+            state = nxt
+        self._out[state].append((len(tokens), payload))
+
+    def build(self):
+        """Compute failure links breadth first."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(token, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        return self
+
+    def find(self, tokens):
+        """Return every ``(start, end, payload)`` match in ``tokens``."""
+        matches = []
+        state = 0
+        for index, token in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for length, payload in self._out[state]:
+                matches.append((index + 1 - length, index + 1, payload))
+        return matches
+
+
+def _longest_matches(matches):
+    """Leftmost-longest, non-overlapping subset of ``matches``."""
+    selected, covered_to = [], 0
+    for start, end, payload in sorted(matches, key=lambda m: (m[0], m[0] - m[1])):
+        if start >= covered_to:
+            selected.append((start, end, payload))
+            covered_to = end
+    return selected
+
+
+def _display(tokens):
+    phrase = ' '.join(tokens)
+    return phrase.title() if phrase.isascii() else phrase
+
+
+class QueryParser:
+    """Compiled gazetteer + grammar for spoken transport enquiries."""
+
+    def __init__(self, station_names=()):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._automaton = self._compile(station_names)
+
+    @staticmethod
+    def _compile(station_names):
+        automaton = Automaton()
+        for keywords, kind in (
+            (TYPE_WORDS, 'type'), (INTENT_WORDS, 'intent'),
+            (RELATIVE_DAYS, 'relative_day'), (MONTHS, 'month'),
+        ):
+            for phrase, value in keywords.items():
+                automaton.add(tokenize(phrase), (kind, value))
+        for markers, kind in (
+            (SOURCE_PREFIXES, 'source_prefix'), (DESTINATION_PREFIXES, 'destination_prefix'),
+            (SOURCE_POSTFIXES, 'source_postfix'), (DESTINATION_POSTFIXES, 'destination_postfix'),
+        ):
+            for phrase in markers:
+                automaton.add(tokenize(phrase), (kind, None))
+        for phrase in FILLER_WORDS:
+            automaton.add(tokenize(phrase), ('filler', None))
+
+        places = {}
+        for hindi, english in HINDI_CITY_NAMES.items():
+            places[tuple(tokenize(hindi))] = english
+            places.setdefault(tuple(tokenize(english)), english)
+        for name in station_names:
+            tokens = tuple(tokenize(name))
+            if not tokens:
+                continue
+            places[tokens] = name
+            # "Dehradun ISBT" is also reachable as plain "dehradun"
+            city = []
+            for token in tokens:
+                if token in GENERIC_STATION_WORDS:
+                    break
+                city.append(token)
+            if city and len(city) < len(tokens):
+                places.setdefault(tuple(city), _display(city))
+        for tokens, display in places.items():
+            automaton.add(tokens, ('place', display))
+        return automaton.build()
+
+    def sync(self, resolver):
+        """Recompile when the station resolver has loaded a new index."""
+        generation = resolver.generation
+        if generation == self._generation:
+            return
+        with self._lock:
+            if generation != self._generation:
+                self._automaton = self._compile(resolver.names().values())
+                self._generation = generation
+
+    def parse(self, transcript, today=None):
+        """Parse ``transcript`` into ``{source, destination, type, date, intent}``."""
+        today = today or date.today()
+        tokens = tokenize(transcript)
+        spans = _longest_matches(self._automaton.find(tokens))
+
+        kinds = [None] * len(tokens)
+        for start, end, (kind, _) in spans:
+            for index in range(start, end):
+                kinds[index] = kind
+
+        transport_type = intent = travel_date = None
+        events = []
+        for start, end, (kind, value) in spans:
+            if kind == 'type':
+                transport_type = transport_type or value
+            elif kind == 'intent':
+                intent = intent or value
+            elif kind == 'relative_day':
+                travel_date = travel_date or today + timedelta(days=value)
+            elif kind == 'month':
+                parsed = self._absolute_date(tokens, kinds, start, end, value, today)
+                travel_date = travel_date or parsed
+            elif kind != 'filler':
+                events.append((start, end, kind, value))
+
+        # Unrecognised words between markers may still be a place name
+        index = 0
+        while index < len(tokens):
+            if kinds[index] is None:
+                end = index
+                while end < len(tokens) and kinds[end] is None:
+                    end += 1
+                events.append((index, end, 'free', _display(tokens[index:end])))
+                index = end
+            else:
+                index += 1
+        events.sort()
+
+        source, destination = self._assign_roles(events)
+        return {
+            "source": source,
+            "destination": destination,
+            "type": transport_type,
+            "date": travel_date.isoformat() if travel_date else None,
+            "intent": intent or "search"
+        }
+
+    @staticmethod
+    def _absolute_date(tokens, kinds, start, end, month, today):
+        """Date for "17 november", "17th of nov", "november 17" (next occurrence)."""
+        day = None
+        before = start - 1
+        if before >= 0 and tokens[before] == 'of':
+            before -= 1
+        for position in (before, end):
+            if 0 <= position < len(tokens) and kinds[position] is None:
+                match = _DAY.match(tokens[position])
+                if match:
+                    day = int(match.group(1))
+                    kinds[position] = 'date'
+                    break
+        if day is None:
+            return None
+
+        year = today.year
+        if end < len(tokens) and _YEAR.match(tokens[end]):
+            year = int(tokens[end])
+            kinds[end] = 'date'
+        elif end + 1 < len(tokens) and kinds[end] == 'date' and _YEAR.match(tokens[end + 1]):
+            year = int(tokens[end + 1])
+            kinds[end + 1] = 'date'
+        try:
+            parsed = date(year, month, day)
+        except ValueError:
+            return None
+        if parsed < today and year == today.year:
+            try:
+                parsed = date(year + 1, month, day)
+            except ValueError:
+                return None
+        return parsed
+
+    @staticmethod
+    def _assign_roles(events):
+        """Pick source and destination from places and the markers around them."""
+        candidates = {"source": [], "destination": []}
+        loose = []
+        for position, (start, end, kind, value) in enumerate(events):
+            if kind not in ('place', 'free'):
+                continue
+            known = kind == 'place'
+            before = events[position - 1] if position > 0 and events[position - 1][1] == start else None
+            after = events[position + 1] if position + 1 < len(events) and events[position + 1][0] == end else None
+            role = None
+            if after and after[2] == 'source_postfix':
+                role = "source"
+            elif after and after[2] == 'destination_postfix':
+                role = "destination"
+            elif before and before[2] == 'source_prefix':
+                role = "source"
+            elif before and before[2] in ('destination_prefix', 'source_postfix'):
+                # "to X", and "X से Y" where Y carries no marker of its own
+                role = "destination"
+            if role:
+                candidates[role].append((not known, start, value))
+            elif known:
+                loose.append(value)
+
+        chosen = {}
+        for role in ("source", "destination"):
+            if candidates[role]:
+                chosen[role] = min(candidates[role])[2]
+        for value in loose:
+            for role in ("source", "destination"):
+                if role not in chosen and value not in chosen.values():
+                    chosen[role] = value
+                    break
+        return chosen.get("source"), chosen.get("destination")
@@ -0,0 +1,146 @@
+"""Continuous listening mode for the voice module.
+
+Audio is captured on speech_recognition's background listener, which splits
+the microphone stream into utterances with energy-based voice activity
+detection. Every completed utterance is handed straight to a recognizer
+pool, so the next one is already being captured while the last is still
+being transcribed, and the stages run concurrently:
+
+    capture (VAD) -> recognize (pool) -> parse + lookup (pool) -> speak (queue)
+
+Answers are spoken in the order the questions were asked; an answer that is
+overtaken by a newer question is dropped, and the newer question interrupts
+whatever is still being said.
+
+Recognition is pluggable: any callable ``recognizer(audio) -> str | None``
+works, e.g. :class:`SphinxRecognizer` for offline use or a stub in tests.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+
+logger = logging.getLogger(__name__)
+
+
+class GoogleRecognizer:
+    """Google Web Speech API (network)."""
+
+    def __init__(self, language="en-IN"):
+        self.language = language
+        self._recognizer = sr.Recognizer()
+
+    def __call__(self, audio):
+        try:
+            return self._recognizer.recognize_google(audio, language=self.language)
+        except sr.UnknownValueError:
+            return None
+
+
+class SphinxRecognizer:
+    """CMU Sphinx (offline, needs ``pocketsphinx``)."""
+
+    def __init__(self, language="en-US"):
+        self.language = language
+        self._recognizer = sr.Recognizer()
+
+    def __call__(self, audio):
+        try:
+            return self._recognizer.recognize_sphinx(audio, language=self.language)
+        except sr.UnknownValueError:
+            return None
+
+
+RECOGNIZERS = {
+    "google": GoogleRecognizer,
+    "sphinx": SphinxRecognizer,
+}
+
+
+class VoicePipeline:
+    """Overlapped capture -> recognize -> lookup -> speak stages."""
+
+    def __init__(self, recognizer, answer, speech, recognizer_workers=2, lookup_workers=2,
+                 barge_in=True, on_transcript=None):
+        self.recognizer = recognizer
+        self.answer = answer  # transcript -> text to speak
+        self.speech = speech
+        self.barge_in = barge_in
+        self.on_transcript = on_transcript
+        self._recognize_pool = ThreadPoolExecutor(max_workers=recognizer_workers, thread_name_prefix="recognize")
+        self._lookup_pool = ThreadPoolExecutor(max_workers=lookup_workers, thread_name_prefix="lookup")
+        self._answers = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_seq = 0
+        self._latest_question = -1
+        self._stop_listening = None
+        self._speaker = threading.Thread(target=self._speak_answers, name="speak-answers", daemon=True)
+        self._speaker.start()
+
+    def submit(self, audio):
+        """Queue one captured utterance; returns immediately."""
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+        recognized = self._recognize_pool.submit(self._recognize, seq, audio)
+        self._answers.put((seq, self._lookup_pool.submit(self._lookup, seq, recognized)))
+
+    def _recognize(self, seq, audio):
+        try:
+            transcript = self.recognizer(audio)
+        except Exception as e:
+            logger.warning(f"Recognition failed: {e}")
+            return None
+        if not transcript:
+            return None
+        if self.on_transcript:
+            self.on_transcript(transcript)
+        with self._lock:
+            self._latest_question = max(self._latest_question, seq)
+        if self.barge_in:
+            self.speech.cancel()
+        return transcript
+
+    def _lookup(self, seq, recognized):
+        transcript = recognized.result()
+        if not transcript:
+            return None
+        return self.answer(transcript)
+
+    def _speak_answers(self):
+        while True:
+            item = self._answers.get()
+            if item is None:
+                return
+            seq, pending = item
+            try:
+                text = pending.result()
+            except Exception as e:
+                logger.error(f"Voice lookup failed: {e}")
+                continue
+            with self._lock:
+                overtaken = seq < self._latest_question
+            if text and not overtaken:
+                self.speech.say(text)
+
+    def listen(self, microphone=None, pause_threshold=0.6, phrase_time_limit=10):
+        """Start capturing from the microphone in the background."""
+        listener = sr.Recognizer()
+        listener.dynamic_energy_threshold = True
+        listener.pause_threshold = pause_threshold
+        microphone = microphone or sr.Microphone()
+        with microphone as source:
+            listener.adjust_for_ambient_noise(source, duration=1)
+        self._stop_listening = listener.listen_in_background(
+            microphone, lambda _, audio: self.submit(audio), phrase_time_limit=phrase_time_limit
+        )
+
+    def close(self):
+        if self._stop_listening:
+            self._stop_listening(wait_for_stop=False)
+        self._recognize_pool.shutdown(wait=True)
+        self._lookup_pool.shutdown(wait=True)
+        self._answers.put(None)
+        self._speaker.join()